@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from scipaper.api.endpoints import papers, users, ingest, analysis, search, collaborators, files
+from scipaper.api.endpoints import papers, users, ingest, analysis, search, collaborators, files, jobs, grants, trends, proposals
 
 api_router = APIRouter()
 api_router.include_router(users.router, prefix="/users", tags=["users"])
@@ -9,3 +9,7 @@ api_router.include_router(analysis.router, prefix="/analyze", tags=["analysis"])
 api_router.include_router(search.router, prefix="/search", tags=["search"])
 api_router.include_router(collaborators.router, prefix="/collaborators", tags=["collaborators"])
 api_router.include_router(files.router, prefix="/files", tags=["files"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(grants.router, prefix="/grants", tags=["grants"])
+api_router.include_router(trends.router, prefix="/trends", tags=["trends"])
+api_router.include_router(proposals.router, prefix="/proposals", tags=["proposals"])
@@ -1,20 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import uuid
 import time
 import logging
 
-from scipaper import crud, schemas
-from scipaper.database import get_db
-from scipaper.services import openai_analyzer
+from scipaper import crud_async, schemas
+from scipaper.database import get_async_db
+from scipaper.services import jobs, openai_analyzer
 
 router = APIRouter()
 
+@router.post("/batch", response_model=schemas.Job)
+async def analyze_batch_endpoint(batch: schemas.AnalysisBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Queues the analysis of many papers, given by id or by a search query, and returns the job at once."""
+    from scipaper.tasks.analysis_tasks import analyze_batch_task
+    if not batch.paper_ids and not batch.query:
+        raise HTTPException(status_code=400, detail="Provide either paper_ids or a query.")
+
+    job_in = schemas.JobCreate(
+        kind="analysis_batch",
+        status=jobs.QUEUED,
+        payload={
+            "paper_ids": [str(paper_id) for paper_id in batch.paper_ids or []],
+            "query": batch.query,
+            "limit": batch.limit,
+        },
+    )
+    db_job = await crud_async.create_job(db, job=job_in)
+    db_job = await jobs.enqueue(db, db_job, analyze_batch_task)
+    logging.info(f"Queued batch analysis job {db_job.id}")
+    return db_job
+
 @router.post("/{paper_id}", response_model=schemas.Analysis)
-async def analyze_paper_endpoint(paper_id: uuid.UUID, db: Session = Depends(get_db)):
+async def analyze_paper_endpoint(paper_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
     """Triggers the analysis of a single paper by its ID."""
-    db_paper = crud.get_paper(db, paper_id=paper_id)
+    from scipaper.services import dedup
+    db_paper = await crud_async.get_paper(db, paper_id=paper_id)
     if db_paper is None:
         logging.error(f"Analysis failed: Paper with id {paper_id} not found.")
         raise HTTPException(status_code=404, detail="Paper not found")
@@ -31,14 +53,21 @@ async def analyze_paper_endpoint(paper_id: uuid.UUID, db: Session = Depends(get_
         logging.error(f"OpenAI analysis failed for paper {paper_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to analyze paper with OpenAI: {e}")
 
+    plagiarism = await dedup.plagiarism_report(db, paper_id, db_paper.abstract)
     duration_ms = int((time.time() - start_time) * 1000)
 
     analysis_in = schemas.AnalysisCreate(
         paper_id=paper_id,
         status="completed",
         duration_ms=duration_ms,
+        plagiarism=plagiarism,
         **analysis_data
     )
 
-    created_analysis = crud.create_analysis(db=db, analysis=analysis_in)
+    created_analysis = await crud_async.create_analysis(db=db, analysis=analysis_in)
     return created_analysis
+
+@router.get("/cache/stats")
+async def analysis_cache_stats():
+    """Returns hit/miss counters for the analysis result cache."""
+    return openai_analyzer.analysis_cache.describe()
@@ -1,12 +1,15 @@
-from fastapi import APIRouter
-from typing import List
-
-from scipaper.services import neo4j
+from fastapi import APIRouter, Query
 
 router = APIRouter()
 
 @router.get("/")
-def get_collaboration_suggestions_endpoint(topic: str):
-    """Gets collaboration suggestions from Neo4j."""
-    neo4j_service = neo4j.get_neo4j_service()
-    return neo4j_service.get_collaboration_suggestions(topic)
+async def get_collaboration_suggestions_endpoint(topic: str, limit: int = Query(10, ge=1, le=100)):
+    """Gets collaboration suggestions for a topic from the Neo4j co-authorship graph."""
+    from scipaper.services import collaborators
+    return await collaborators.suggest_collaborators(topic, limit)
+
+@router.get("/cache/stats")
+async def collaborator_cache_stats():
+    """Returns hit/miss counters for the per-topic suggestion cache."""
+    from scipaper.services import collaborators
+    return collaborators.collaborator_cache.describe()
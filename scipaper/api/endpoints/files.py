@@ -1,42 +1,64 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
 import uuid
 
-from scipaper import crud, schemas
-from scipaper.database import get_db
-from scipaper.tasks.analysis_tasks import analyze_pdf_task
-from supabase import create_client, Client
+from scipaper import crud_async, schemas
 from scipaper.config import settings
+from scipaper.database import get_async_db
+from scipaper.services import storage
 
 router = APIRouter()
-supabase: Client = create_client(settings.supabase_url, settings.supabase_service_key)
 
 @router.post("/{paper_id}/upload-pdf")
-async def upload_pdf(paper_id: uuid.UUID, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Uploads a PDF, saves it to Supabase Storage, and triggers an analysis task."""
-    db_paper = crud.get_paper(db, paper_id=paper_id)
+async def upload_pdf(paper_id: uuid.UUID, file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db)):
+    """Streams a PDF to file storage, records it, and triggers an analysis task.
+
+    The upload is read in chunks from the request's disk-spooled temporary file. Each chunk is
+    hashed and scanned for page objects on its way to storage, so the whole file is never held
+    in memory. When the page objects are compressed and the scan finds none, the pages are
+    counted by parsing the spooled file instead.
+    """
+    from scipaper.services import pdf_extraction
+    from scipaper.tasks.analysis_tasks import analyze_pdf_task
+    db_paper = await crud_async.get_paper(db, paper_id=paper_id)
     if not db_paper:
         raise HTTPException(status_code=404, detail="Paper not found")
 
     try:
         # Define a unique path for the file in storage
         file_path = f"{paper_id}/{uuid.uuid4()}.pdf"
-        
-        # Upload the file to Supabase Storage
-        supabase.storage.from_("paper_files").upload(file_path, file.file.read())
+        inspector = storage.PdfStreamInspector()
+
+        async def chunks():
+            while chunk := await file.read(settings.upload_read_size):
+                inspector.feed(chunk)
+                yield chunk
+
+        size = file.size
+        if size is None:
+            size = file.file.seek(0, 2)
+            await file.seek(0)
+        await storage.get_storage().upload(file_path, chunks(), size=size, content_type=file.content_type)
+        pages = inspector.pages
+        if pages is None:
+            pages = await asyncio.to_thread(pdf_extraction.count_pages, file.file)
 
         # Create a record in the paper_files table
         paper_file_in = schemas.PaperFileCreate(
             paper_id=paper_id,
             storage_path=file_path,
             mime=file.content_type,
-            pages=0  # You could use PyPDF2 here to get the page count if needed
+            pages=pages,
+            sha256=inspector.sha256,
         )
-        crud.create_paper_file(db=db, paper_file=paper_file_in)
+        await crud_async.create_paper_file(db=db, paper_file=paper_file_in)
+        logging.info(f"Uploaded {file_path}: {inspector.size} bytes, {pages or 'unknown'} pages")
 
         # Trigger the background analysis task
         analyze_pdf_task.delay(str(paper_id), file_path)
 
-        return {"message": "File uploaded and analysis started.", "storage_path": file_path}
+        return {"message": "File uploaded and analysis started.", "storage_path": file_path, "pages": pages}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
@@ -0,0 +1,58 @@
+from dataclasses import asdict
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import logging
+
+from scipaper import crud_async, schemas
+from scipaper.database import get_async_db
+from scipaper.services import grants, jobs
+
+router = APIRouter()
+
+@router.get("/", response_model=schemas.GrantPage, response_model_exclude_unset=True)
+async def read_grants(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), fields: Optional[str] = None,
+                      db: AsyncSession = Depends(get_async_db)):
+    """Lists grant calls, newest first, one keyset page at a time; see `GET /papers/`."""
+    try:
+        return await crud_async.get_grants(db, cursor=cursor, limit=limit, fields=fields.split(",") if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/open", response_model=schemas.GrantPage)
+async def read_open_grants(tags: Optional[List[str]] = Query(None), match: str = "any", before: Optional[date] = None,
+                           cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000),
+                           db: AsyncSession = Depends(get_async_db)):
+    """Lists open calls, soonest deadline first: calls whose deadline has not passed (and falls on
+    or before `before`) followed by rolling calls without one, tagged with any of `tags`, or all of
+    them with `match=all`. Tags may be repeated (`tags=a&tags=b`) or comma-separated (`tags=a,b`)."""
+    if match not in ("any", "all"):
+        raise HTTPException(status_code=400, detail="match must be 'any' or 'all'")
+    try:
+        return await crud_async.get_open_grant_calls(db, date.today(), tags=grants.parse_tags(",".join(tags or [])), match_all=match == "all",
+                                                     before=before, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/harvest")
+async def harvest_grants_endpoint(path: str, source: str = "local", name: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    """Harvests grant calls from a source; the `local` source reads `path` from the grant feed directory."""
+    try:
+        grant_source = grants.get_grant_source(source, path=path, name=name)
+        return asdict(await grants.harvest_grants(db, grant_source))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/matches/refresh", response_model=schemas.Job)
+async def refresh_grant_matches(rebuild: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """Queues an incremental update of the paper-to-grant matches: new and changed calls against
+    the papers matched before, and new papers against every open call. `rebuild` matches every paper again."""
+    from scipaper.tasks.grant_tasks import match_grants_task
+    job_in = schemas.JobCreate(kind="grant_matches", status=jobs.QUEUED, payload={"rebuild": rebuild})
+    db_job = await crud_async.create_job(db, job=job_in)
+    db_job = await jobs.enqueue(db, db_job, match_grants_task)
+    logging.info(f"Queued grant matching job {db_job.id}")
+    return db_job
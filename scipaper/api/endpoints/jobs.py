@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import logging
+import uuid
+
+from scipaper import crud_async, schemas
+from scipaper.database import get_async_db
+from scipaper.services import ingestion, jobs
+
+router = APIRouter()
+
+async def _get_job_or_404(db: AsyncSession, job_id: uuid.UUID):
+    db_job = await crud_async.get_job(db, job_id=job_id)
+    if db_job is None:
+        logging.warning(f"Job lookup failed: Job with id {job_id} not found.")
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+async def _enqueue(db: AsyncSession, db_job):
+    # Celery and the task modules are imported when the first job is queued, not at startup
+    from scipaper.tasks.harvest_tasks import harvest_task
+    return await jobs.enqueue(db, db_job, harvest_task)
+
+@router.post("/harvest", response_model=schemas.Job)
+async def create_harvest_job(query: str, source: str, max_results: Optional[int] = None, page_size: Optional[int] = None,
+                             chunk_size: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    """Starts a long-running, resumable harvest of a source as a background job."""
+    source = source.lower()
+    if source not in ingestion.SOURCES:
+        raise HTTPException(status_code=400, detail="Invalid source. Choose from 'pubmed' or 'arxiv'.")
+
+    job_in = schemas.JobCreate(
+        kind="harvest",
+        status=jobs.QUEUED,
+        payload={
+            "source": source,
+            "query": query,
+            "max_results": max_results,
+            "page_size": page_size,
+            "chunk_size": chunk_size,
+            "cursor": {},
+            "ingested": 0,
+        },
+    )
+    db_job = await crud_async.create_job(db, job=job_in)
+    logging.info(f"Queued harvest job {db_job.id} for query='{query}' from source='{source}'")
+    return await _enqueue(db, db_job)
+
+@router.get("/", response_model=List[schemas.Job])
+async def read_jobs(kind: Optional[str] = None, status: Optional[str] = None, skip: int = 0, limit: int = 100,
+                    db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.get_jobs(db, kind=kind, status=status, skip=skip, limit=limit)
+
+@router.get("/{job_id}", response_model=schemas.Job)
+async def read_job(job_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+    return await _get_job_or_404(db, job_id)
+
+@router.post("/{job_id}/cancel", response_model=schemas.Job)
+async def cancel_job(job_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+    """Cancels a job. A running job stops at its next checkpoint."""
+    db_job = await _get_job_or_404(db, job_id)
+    if db_job.status not in jobs.ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job is already {db_job.status}.")
+
+    task_id = (db_job.payload or {}).get("task_id")
+    if task_id:
+        from scipaper.celery_worker import celery_app
+        # Keeps a job that has not started yet from ever running
+        celery_app.control.revoke(task_id)
+    return await crud_async.update_job(db, db_job, status=jobs.CANCELLED)
+
+@router.post("/{job_id}/resume", response_model=schemas.Job)
+async def resume_job(job_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+    """Re-queues a failed or cancelled harvest job; it continues from its last checkpoint."""
+    db_job = await _get_job_or_404(db, job_id)
+    if db_job.kind != "harvest" or db_job.status not in jobs.RESUMABLE_STATUSES:
+        raise HTTPException(status_code=409, detail=f"A {db_job.kind} job that is {db_job.status} cannot be resumed.")
+
+    db_job = await crud_async.update_job(db, db_job, status=jobs.QUEUED, finished_at=None, error=None)
+    return await _enqueue(db, db_job)
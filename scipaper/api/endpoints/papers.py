@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import date
+from typing import List, Optional
 import logging
 import uuid
 
-from scipaper import crud, schemas
-from scipaper.database import get_db
+from scipaper import crud, crud_async, schemas
+from scipaper.database import get_async_db, get_db
 
 router = APIRouter()
 
@@ -13,10 +15,15 @@ router = APIRouter()
 def create_paper(paper: schemas.PaperCreate, db: Session = Depends(get_db)):
     return crud.create_paper(db=db, paper=paper)
 
-@router.get("/", response_model=List[schemas.Paper])
-def read_papers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    papers = crud.get_papers(db, skip=skip, limit=limit)
-    return papers
+@router.get("/", response_model=schemas.PaperPage, response_model_exclude_unset=True)
+def read_papers(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), fields: Optional[str] = None,
+                db: Session = Depends(get_db)):
+    """Lists papers, newest first. Pass `next_cursor` back as `cursor` for the next page, and
+    `fields` (comma-separated, e.g. `id,title,year`) to return only those columns."""
+    try:
+        return crud.get_papers(db, cursor=cursor, limit=limit, fields=fields.split(",") if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{paper_id}", response_model=schemas.Paper)
 def read_paper(paper_id: uuid.UUID, db: Session = Depends(get_db)):
@@ -25,3 +32,21 @@ def read_paper(paper_id: uuid.UUID, db: Session = Depends(get_db)):
         logging.warning(f"Paper lookup failed: Paper with id {paper_id} not found.")
         raise HTTPException(status_code=404, detail="Paper not found")
     return db_paper
+
+@router.get("/{paper_id}/similar", response_model=List[schemas.SimilarPaper])
+async def read_similar_papers(paper_id: uuid.UUID, threshold: Optional[float] = Query(None, ge=0, le=1), kind: str = "abstract",
+                              db: AsyncSession = Depends(get_async_db)):
+    """Lists near-duplicates of a paper from the LSH index, by abstract or by extracted full text."""
+    from scipaper.services import dedup
+    if kind not in (dedup.ABSTRACT, dedup.FULL_TEXT):
+        raise HTTPException(status_code=400, detail=f"kind must be '{dedup.ABSTRACT}' or '{dedup.FULL_TEXT}'")
+    stored = await crud_async.get_paper_signatures(db, kind, [paper_id])
+    if not stored:
+        raise HTTPException(status_code=404, detail="Paper has no indexed text of this kind")
+    signature = dedup.signature_from_bytes(stored[0].signature)
+    return (await dedup.find_similar(db, kind, {paper_id: signature}, threshold))[paper_id]
+
+@router.get("/{paper_id}/grants", response_model=List[schemas.GrantMatch])
+async def read_paper_grants(paper_id: uuid.UUID, limit: int = Query(10, ge=1, le=100), db: AsyncSession = Depends(get_async_db)):
+    """Lists the open grant calls that best match a paper, from the precomputed matches."""
+    return await crud_async.get_paper_grant_matches(db, paper_id, date.today(), limit=limit)
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import uuid
+
+from scipaper import crud_async, schemas
+from scipaper.database import get_async_db
+from scipaper.services.llm import LLMClient, get_llm_client
+
+router = APIRouter()
+
+@router.post("/generate")
+async def generate_proposal(request: schemas.ProposalRequest, db: AsyncSession = Depends(get_async_db),
+                            llm: LLMClient = Depends(get_llm_client)):
+    """Drafts a proposal from the user's papers, their analyses and matching grant calls, streaming
+    the model's output as server-sent events (`context`, `token`..., then `done` or `error`).
+    The finished proposal is stored, and its id sent in the `done` event."""
+    from scipaper.services import proposals
+    try:
+        context = await proposals.build_context(db, request)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        proposals.stream_proposal(context, llm),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream, which would hold back the first tokens
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{proposal_id}", response_model=schemas.Proposal)
+async def read_proposal(proposal_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+    db_proposal = await crud_async.get_proposal(db, proposal_id)
+    if db_proposal is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return db_proposal
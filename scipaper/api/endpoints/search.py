@@ -1,11 +1,28 @@
-from fastapi import APIRouter
-from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
 
+from scipaper import schemas
 from scipaper.services import elasticsearch
 
 router = APIRouter()
 
-@router.get("/")
-def search_papers_endpoint(query: str):
-    """Searches for papers in Elasticsearch."""
-    return elasticsearch.search_papers(query)
+@router.get("/", response_model=schemas.SearchResponse)
+async def search_papers_endpoint(query: str, size: int = Query(20, ge=1, le=100), cursor: Optional[str] = None,
+                                 year: Optional[int] = None, year_from: Optional[int] = None, year_to: Optional[int] = None,
+                                 journal: Optional[str] = None, language: Optional[str] = None,
+                                 author: Optional[str] = None, mode: str = "lexical"):
+    """Searches for papers in Elasticsearch. Pass `next_cursor` back as `cursor` for the next page.
+
+    `mode` is `lexical` (default), `semantic` or `hybrid` (both fused by reciprocal rank).
+    """
+    try:
+        return await elasticsearch.search_papers(query, size=size, cursor=cursor, year=year, year_from=year_from,
+                                                 year_to=year_to, journal=journal, language=language, author=author,
+                                                 mode=mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats")
+def search_stats_endpoint():
+    """Reports recent search latency and the query-result cache hit rate."""
+    return elasticsearch.search_stats()
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+import logging
+
+from scipaper import crud_async, schemas
+from scipaper.database import get_async_db
+from scipaper.services import jobs
+
+router = APIRouter()
+
+@router.get("/", response_model=List[schemas.Domain])
+async def read_domains(db: AsyncSession = Depends(get_async_db)):
+    """Lists the domains whose trends are tracked."""
+    return await crud_async.get_domains(db)
+
+@router.get("/cache/stats")
+async def trend_cache_stats():
+    """Returns hit/miss counters for the per-domain trend cache."""
+    from scipaper.services import trends
+    return trends.trend_cache.describe()
+
+@router.get("/{domain}", response_model=schemas.DomainTrend)
+async def read_domain_trends(domain: str, db: AsyncSession = Depends(get_async_db)):
+    """Returns the latest trends of a domain: top terms per year, bursting and emerging terms,
+    their time series, representative papers and matching open grant calls."""
+    from scipaper.services import trends
+    result = await trends.get_domain_trends(db, domain)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No trends computed for this domain yet. POST to /trends/{domain}/refresh first.")
+    return result
+
+@router.post("/{domain}/refresh", response_model=schemas.Job)
+async def refresh_domain_trends(domain: str, db: AsyncSession = Depends(get_async_db)):
+    """Queues an incremental update of a domain's trends from the papers ingested since its last run."""
+    from scipaper.services import trends
+    from scipaper.tasks.trend_tasks import compute_trends_task
+    name = trends.normalize_domain(domain)
+    if not name:
+        raise HTTPException(status_code=400, detail="Domain name is empty.")
+
+    job_in = schemas.JobCreate(kind="trends", status=jobs.QUEUED, payload={"domain": name})
+    db_job = await crud_async.create_job(db, job=job_in)
+    db_job = await jobs.enqueue(db, db_job, compute_trends_task)
+    logging.info(f"Queued trend job {db_job.id} for domain '{name}'")
+    return db_job
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional
 import logging
 import uuid
 
@@ -17,10 +17,14 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Email already registered")
     return crud.create_user(db=db, user=user)
 
-@router.get("/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+@router.get("/", response_model=schemas.UserPage, response_model_exclude_unset=True)
+def read_users(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), fields: Optional[str] = None,
+               db: Session = Depends(get_db)):
+    """Lists users, newest first, one keyset page at a time; see `GET /papers/`."""
+    try:
+        return crud.get_users(db, cursor=cursor, limit=limit, fields=fields.split(",") if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{user_id}", response_model=schemas.User)
 def read_user(user_id: uuid.UUID, db: Session = Depends(get_db)):
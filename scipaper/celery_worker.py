@@ -6,9 +6,13 @@ celery_app = Celery(
     "tasks",
     broker=settings.redis_url,
     backend=settings.redis_url,
-    include=["scipaper.tasks.analysis_tasks"]
+    include=["scipaper.tasks.analysis_tasks", "scipaper.tasks.harvest_tasks", "scipaper.tasks.trend_tasks",
+             "scipaper.tasks.grant_tasks"]
 )
 
 celery_app.conf.update(
     task_track_started=True,
+    # Tasks are long-running (harvests, full-text analyses): take one at a time so a busy
+    # worker does not hoard queued tasks another worker could start
+    worker_prefetch_multiplier=1,
 )
@@ -1,27 +1,157 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import List
 
 class Settings(BaseSettings):
     # OpenAI
     openai_api_key: str
 
+    # OpenAI fan-out limits for batch analysis
+    openai_max_concurrency: int = 8
+    openai_requests_per_minute: int = 500
+    openai_tokens_per_minute: int = 40000
+    analysis_batch_flush_size: int = 50
+    # Size of each full-text chunk sent to the analyzer
+    analysis_chunk_tokens: int = 3000
+
+    # Analysis result cache ("memory" or "redis")
+    analysis_cache_backend: str = "memory"
+    analysis_cache_ttl: int = 30 * 24 * 3600
+    analysis_cache_max_entries: int = 1024
+
     # Supabase
     supabase_url: str
     supabase_anon_key: str
     supabase_service_key: str
     supabase_db_url: str
 
+    # File storage ("supabase", or "local" to keep uploads on disk)
+    storage_backend: str = "supabase"
+    storage_bucket: str = "paper_files"
+    local_storage_dir: str = "storage"
+    upload_read_size: int = 1024 * 1024
+
+    # Database connection pool
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800
+    db_pool_timeout: int = 30
+    # Set to 0 when connecting through a transaction-mode pooler (pgbouncer)
+    db_statement_cache_size: int = 100
+
     # Elasticsearch
     elasticsearch_url: str
     elasticsearch_api_key: str
+    es_number_of_shards: int = 1
+    es_number_of_replicas: int = 1
+    es_refresh_interval: str = "1s"
+    search_cache_ttl: int = 60
+    search_cache_max_entries: int = 512
+
+    # Semantic search: embeddings ("openai", or "hashing" for offline use) and the vector index
+    # ("elasticsearch" dense_vector kNN, or "local" memory-mapped NumPy file)
+    embedding_backend: str = "openai"
+    embedding_model: str = "text-embedding-3-small"
+    embedding_dimensions: int = 384
+    embedding_batch_size: int = 100
+    vector_index_backend: str = "elasticsearch"
+    local_vector_index_dir: str = "vector_index"
+    # Candidates taken from each ranking before reciprocal-rank fusion
+    hybrid_rank_window: int = 100
+
+    # Near-duplicate detection: MinHash signatures split into LSH bands. Changing the
+    # permutations, bands or shingle size invalidates stored signatures.
+    dedup_num_perm: int = 128
+    dedup_bands: int = 16
+    dedup_shingle_size: int = 5
+    dedup_threshold: float = 0.8
 
     # Neo4j
     neo4j_uri: str
     neo4j_username: str
     neo4j_password: str
+    neo4j_batch_size: int = 1000
+    neo4j_max_connection_pool_size: int = 50
+    neo4j_max_connection_lifetime: int = 3600
+    neo4j_connection_acquisition_timeout: float = 60.0
+    # Records pulled per round trip when streaming query results
+    neo4j_fetch_size: int = 1000
+
+    # Collaborator recommendation
+    coauthor_max_authors: int = 50
+    collaborator_topic_papers: int = 200
+    collaborator_seed_authors: int = 100
+    collaborator_edge_limit: int = 20000
+    collaborator_cache_backend: str = "memory"
+    collaborator_cache_ttl: int = 3600
+
+    # Trend analysis per domain
+    trend_batch_size: int = 5000
+    # Terms found in fewer papers than this are ignored
+    trend_min_papers: int = 5
+    trend_recent_years: int = 5
+    trend_baseline_years: int = 5
+    trend_burst_z: float = 2.0
+    trend_top_terms: int = 20
+    trend_top_papers: int = 20
+    # Papers younger than this are left for the next run, so rows an ingest has not committed yet are never skipped
+    trend_ingest_lag_seconds: int = 60
+    trend_cache_backend: str = "memory"
+    trend_cache_ttl: int = 300
+
+    # Grant harvesting: local JSON/CSV feeds are read from this directory only
+    grant_feed_dir: str = "grant_feeds"
+    grant_batch_size: int = 1000
+
+    # Paper-to-grant matching: hashed word and bigram vectors; changing the feature count starts over
+    grant_match_features: int = 2 ** 18
+    grant_match_top_k: int = 10
+    grant_match_min_score: float = 0.1
+    grant_match_batch_size: int = 2000
+    # Grants changed more recently than this are left for the next run, as with trend_ingest_lag_seconds
+    grant_match_lag_seconds: int = 60
+
+    # Proposal drafting: streamed chat completions ("openai", or "scripted" to replay a canned
+    # draft without network access)
+    llm_backend: str = "openai"
+    proposal_model: str = "gpt-4"
+    proposal_temperature: float = 0.4
+    proposal_max_tokens: int = 2000
+    proposal_max_papers: int = 10
+    proposal_max_grants: int = 5
+    # Abstracts are cut to this many characters in the prompt
+    proposal_abstract_chars: int = 1500
 
     # Celery
     redis_url: str = ""
 
+    # Paper sources (base URLs can point at a local stub server)
+    pubmed_base_url: str = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+    ncbi_api_key: str = ""
+    # 0 uses NCBI's quota: 3 requests/s, or 10 requests/s with an API key
+    pubmed_requests_per_second: float = 0.0
+    arxiv_base_url: str = "https://export.arxiv.org/api/"
+    arxiv_requests_per_second: float = 1 / 3
+
+    # Outgoing HTTP
+    http_max_connections: int = 10
+    http_max_retries: int = 5
+    http_backoff_base: float = 1.0
+    http_timeout: float = 30.0
+    http2_enabled: bool = True
+
+    # PDF text extraction (0 workers = one per CPU)
+    pdf_extraction_workers: int = 0
+    pdf_parallel_min_pages: int = 40
+
+    # API startup: clients connected in the background at startup (see services/clients.py)
+    client_warm_up: List[str] = ["database", "elasticsearch", "neo4j"]
+    health_check_timeout: float = 2.0
+
+    # Ingestion
+    ingest_chunk_size: int = 200
+    harvest_page_size: int = 200
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
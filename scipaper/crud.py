@@ -1,7 +1,63 @@
+from sqlalchemy import Text, cast, delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from . import models, schemas
+import base64
+import json
 import uuid
 
+# Keyset pagination. List endpoints page through (created_at, id), newest first, and resume
+# after the last row of the previous page. Each page is an index range scan on
+# (created_at, id), so page 10,000 costs the same as page 1, unlike OFFSET, which reads and
+# discards every earlier row.
+def encode_page_cursor(position: Optional[Union[date, datetime]], row_id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(json.dumps([position.isoformat() if position is not None else None, str(row_id)]).encode()).decode()
+
+def decode_page_cursor(cursor: str, parse: Callable[[str], Any] = datetime.fromisoformat) -> Tuple[Any, uuid.UUID]:
+    """Returns the (position, id) of the last row of the previous page; `parse` reads the position."""
+    try:
+        position, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return parse(position) if position is not None else None, uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid page cursor")
+
+def _page_columns(model, fields: Optional[List[str]]):
+    """The requested columns, plus created_at and id which the cursor is built from."""
+    table = model.__table__
+    if not fields:
+        return list(table.c)
+    unknown = [field for field in fields if field not in table.c]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(table.c.keys())}.")
+    return [table.c[name] for name in dict.fromkeys([*fields, "created_at", "id"])]
+
+def _page_query(model, fields: Optional[List[str]], cursor: Optional[str], limit: int):
+    table = model.__table__
+    # One extra row tells whether another page follows
+    query = select(*_page_columns(model, fields)).order_by(table.c.created_at.desc(), table.c.id.desc()).limit(limit + 1)
+    if cursor:
+        query = query.where(tuple_(table.c.created_at, table.c.id) < tuple_(*decode_page_cursor(cursor)))
+    return query
+
+def _page(rows, fields: Optional[List[str]], limit: int) -> dict:
+    rows = list(rows)
+    last = rows[limit - 1] if len(rows) > limit else None
+    items = [dict(row._mapping) for row in rows[:limit]]
+    if fields:
+        items = [{field: item[field] for field in fields} for item in items]
+    return {"items": items, "next_cursor": encode_page_cursor(last.created_at, last.id) if last is not None else None}
+
+def get_page(db: Session, model, cursor: Optional[str] = None, limit: int = 100, fields: Optional[List[str]] = None) -> dict:
+    """Returns one page of a table, newest first, as {"items": [...], "next_cursor": ...}.
+
+    Only the columns in `fields` are read (all when omitted). Pass `next_cursor` back as
+    `cursor` for the following page; it is None on the last page.
+    """
+    return _page(db.execute(_page_query(model, fields, cursor, limit)), fields, limit)
+
 # User CRUD operations
 def get_user(db: Session, user_id: uuid.UUID):
     return db.query(models.User).filter(models.User.id == user_id).first()
@@ -9,8 +65,8 @@ def get_user(db: Session, user_id: uuid.UUID):
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, cursor: Optional[str] = None, limit: int = 100, fields: Optional[List[str]] = None):
+    return get_page(db, models.User, cursor=cursor, limit=limit, fields=fields)
 
 def create_user(db: Session, user: schemas.UserCreate):
     db_user = models.User(email=user.email, name=user.name, affiliation=user.affiliation)
@@ -23,8 +79,23 @@ def create_user(db: Session, user: schemas.UserCreate):
 def get_paper(db: Session, paper_id: uuid.UUID):
     return db.query(models.Paper).filter(models.Paper.id == paper_id).first()
 
-def get_papers(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Paper).offset(skip).limit(limit).all()
+def get_papers(db: Session, cursor: Optional[str] = None, limit: int = 100, fields: Optional[List[str]] = None):
+    return get_page(db, models.Paper, cursor=cursor, limit=limit, fields=fields)
+
+def get_papers_by_ids(db: Session, paper_ids: List[uuid.UUID]):
+    return db.query(models.Paper).filter(models.Paper.id.in_(paper_ids)).all()
+
+def _author_papers_query(name: str, limit: int):
+    """Papers listing an author of this exact name, newest first."""
+    return (
+        select(models.Paper)
+        .where(cast(models.Paper.authors, JSONB).contains([{"name": name}]))
+        .order_by(models.Paper.created_at.desc(), models.Paper.id.desc())
+        .limit(limit)
+    )
+
+def get_author_papers(db: Session, name: str, limit: int = 100):
+    return db.scalars(_author_papers_query(name, limit)).all()
 
 def create_paper(db: Session, paper: schemas.PaperCreate):
     db_paper = models.Paper(**paper.dict())
@@ -33,7 +104,195 @@ def create_paper(db: Session, paper: schemas.PaperCreate):
     db.refresh(db_paper)
     return db_paper
 
+# Columns an upsert may overwrite; the natural key (source, source_id) never changes.
+PAPER_UPSERT_COLUMNS = ["title", "authors", "year", "journal", "url", "doi", "language", "abstract", "mesh_terms"]
+
+def _dedupe_paper_rows(papers: List[schemas.PaperCreate], doi_owners: Dict[str, Tuple[str, str]]):
+    """Collapses a chunk to one row per natural key and drops rows whose DOI belongs to another paper.
+
+    Returns the rows to upsert and the natural keys of every paper the chunk resolves to.
+    """
+    rows = {}
+    for paper in papers:
+        rows[(paper.source, paper.source_id)] = paper.dict()
+
+    doi_owners = dict(doi_owners)
+    values, keys = [], set()
+    for key, row in rows.items():
+        owner = doi_owners.setdefault(row["doi"], key) if row["doi"] else key
+        keys.add(owner)
+        if owner == key:
+            values.append({"id": uuid.uuid4(), **row})
+    return values, keys
+
+def _paper_doi_owners_query(papers: List[schemas.PaperCreate]):
+    table = models.Paper.__table__
+    dois = {paper.doi for paper in papers if paper.doi}
+    return select(table.c.doi, table.c.source, table.c.source_id).where(table.c.doi.in_(dois)) if dois else None
+
+def _paper_upsert_statement(values: List[dict]):
+    """INSERT ... ON CONFLICT (source, source_id) DO UPDATE that only touches rows whose content changed."""
+    table = models.Paper.__table__
+    stmt = pg_insert(table).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=["source", "source_id"],
+        set_={column: stmt.excluded[column] for column in PAPER_UPSERT_COLUMNS},
+        where=or_(*[table.c[column].is_distinct_from(stmt.excluded[column]) for column in PAPER_UPSERT_COLUMNS]),
+    ).returning(*table.c)
+
+def _papers_by_key_query(keys):
+    table = models.Paper.__table__
+    return select(table).where(tuple_(table.c.source, table.c.source_id).in_(list(keys)))
+
+def upsert_papers(db: Session, papers: List[schemas.PaperCreate]):
+    """Upserts a chunk of papers keyed on (source, source_id) in one statement and one commit.
+
+    Returns (papers, changed): every paper the chunk resolves to, and only the rows that were
+    inserted or actually updated. Re-ingesting unchanged papers writes nothing.
+    """
+    if not papers:
+        return [], []
+    owners_query = _paper_doi_owners_query(papers)
+    owners = {doi: (source, source_id) for doi, source, source_id in db.execute(owners_query)} if owners_query is not None else {}
+    values, keys = _dedupe_paper_rows(papers, owners)
+    changed = db.execute(_paper_upsert_statement(values)).all() if values else []
+    db_papers = db.execute(_papers_by_key_query(keys)).all()
+    db.commit()
+    return db_papers, changed
+
+# Paper file CRUD operations
+def create_paper_file(db: Session, paper_file: schemas.PaperFileCreate):
+    db_paper_file = models.PaperFile(**paper_file.dict())
+    db.add(db_paper_file)
+    db.commit()
+    db.refresh(db_paper_file)
+    return db_paper_file
+
+def get_paper_file_by_path(db: Session, storage_path: str):
+    return db.query(models.PaperFile).filter(models.PaperFile.storage_path == storage_path).first()
+
+def update_paper_file(db: Session, db_paper_file: models.PaperFile, **fields):
+    for name, value in fields.items():
+        setattr(db_paper_file, name, value)
+    db.commit()
+    db.refresh(db_paper_file)
+    return db_paper_file
+
+def get_paper_file_text(db: Session, sha256: str):
+    return db.get(models.PaperFileText, sha256)
+
+def create_paper_file_text(db: Session, sha256: str, extractor: str, pages: int, text_gz: bytes):
+    """Stores extracted text for a file hash; a concurrent insert of the same hash is ignored."""
+    db.execute(pg_insert(models.PaperFileText.__table__).values(
+        sha256=sha256, extractor=extractor, pages=pages, text_gz=text_gz
+    ).on_conflict_do_nothing(index_elements=["sha256"]))
+    db.commit()
+
+def get_paper_embeddings(db: Session, paper_ids: List[uuid.UUID]):
+    if not paper_ids:
+        return []
+    return db.scalars(select(models.PaperEmbedding).where(models.PaperEmbedding.paper_id.in_(paper_ids))).all()
+
+def upsert_paper_embeddings(db: Session, rows: List[dict]):
+    """Stores (paper_id, model, content_hash, vector) rows, replacing each paper's previous embedding."""
+    if not rows:
+        return
+    stmt = pg_insert(models.PaperEmbedding.__table__).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["paper_id"],
+        set_={name: stmt.excluded[name] for name in ("model", "content_hash", "vector", "created_at")}
+    ))
+    db.commit()
+
+def _papers_to_embed_query(model: str, after: Optional[Tuple[datetime, uuid.UUID]], limit: int, include_embedded: bool = False):
+    query = (
+        select(models.Paper)
+        .outerjoin(models.PaperEmbedding, models.PaperEmbedding.paper_id == models.Paper.id)
+        .order_by(models.Paper.created_at, models.Paper.id)
+        .limit(limit)
+    )
+    if not include_embedded:
+        query = query.where(or_(models.PaperEmbedding.paper_id.is_(None), models.PaperEmbedding.model != model))
+    if after is not None:
+        query = query.where(tuple_(models.Paper.created_at, models.Paper.id) > tuple_(*after))
+    return query
+
+def get_papers_to_embed(db: Session, model: str, after: Optional[Tuple[datetime, uuid.UUID]], limit: int,
+                        include_embedded: bool = False):
+    """Returns the next `limit` papers after the (created_at, id) keyset `after` that have no embedding
+    from `model`, oldest first; with `include_embedded`, every paper."""
+    return db.scalars(_papers_to_embed_query(model, after, limit, include_embedded)).all()
+
+# Near-duplicate signatures and LSH band index
+def get_paper_signatures(db: Session, kind: str, paper_ids: List[uuid.UUID]):
+    """Returns (paper_id, signature, source, title) rows for the given papers."""
+    if not paper_ids:
+        return []
+    result = db.execute(
+        select(models.PaperSignature.paper_id, models.PaperSignature.signature, models.Paper.source, models.Paper.title)
+        .join(models.Paper, models.Paper.id == models.PaperSignature.paper_id)
+        .where(models.PaperSignature.kind == kind, models.PaperSignature.paper_id.in_(paper_ids))
+    )
+    return result.all()
+
+def replace_paper_signatures(db: Session, kind: str, signatures: Dict[uuid.UUID, bytes], bands: List[Tuple[uuid.UUID, int, int]]):
+    """Stores the papers' signatures and replaces their (paper_id, band, bucket) LSH entries in one transaction."""
+    if not signatures:
+        return
+    stmt = pg_insert(models.PaperSignature.__table__).values([
+        {"paper_id": paper_id, "kind": kind, "signature": signature} for paper_id, signature in signatures.items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["paper_id", "kind"],
+        set_={"signature": stmt.excluded.signature, "created_at": stmt.excluded.created_at}
+    ))
+    db.execute(delete(models.PaperLshBand.__table__).where(
+        models.PaperLshBand.kind == kind, models.PaperLshBand.paper_id.in_(list(signatures))
+    ))
+    if bands:
+        db.execute(pg_insert(models.PaperLshBand.__table__).values([
+            {"kind": kind, "paper_id": paper_id, "band": band, "bucket": bucket} for paper_id, band, bucket in bands
+        ]).on_conflict_do_nothing())
+    db.commit()
+
+def get_lsh_candidates(db: Session, kind: str, keys: List[Tuple[int, int]]):
+    """Returns (band, bucket, paper_id) rows sharing any of the given (band, bucket) keys."""
+    if not keys:
+        return []
+    result = db.execute(
+        select(models.PaperLshBand.band, models.PaperLshBand.bucket, models.PaperLshBand.paper_id)
+        .where(models.PaperLshBand.kind == kind, tuple_(models.PaperLshBand.band, models.PaperLshBand.bucket).in_(keys))
+    )
+    return result.all()
+
+def flag_duplicates(db: Session, kind: str, duplicates: Dict[uuid.UUID, Tuple[uuid.UUID, float]]):
+    """Records, per paper, the paper it duplicates and their estimated similarity."""
+    for paper_id, (duplicate_of, similarity) in duplicates.items():
+        db.execute(
+            update(models.PaperSignature.__table__)
+            .where(models.PaperSignature.paper_id == paper_id, models.PaperSignature.kind == kind)
+            .values(duplicate_of=duplicate_of, similarity=similarity)
+        )
+    db.commit()
+
 # Analysis CRUD operations
+# Completed analyses, from the abstract or (preferred) the full text
+ANALYSIS_DONE_STATUSES = ("completed", "completed_full_text")
+
+def _latest_analyses_query(paper_ids: List[uuid.UUID]):
+    """Each paper's latest completed analysis, preferring one of the full text."""
+    table = models.Analysis.__table__
+    return (
+        select(table).distinct(table.c.paper_id)
+        .where(table.c.paper_id.in_(paper_ids), table.c.status.in_(ANALYSIS_DONE_STATUSES))
+        .order_by(table.c.paper_id, (table.c.status == "completed_full_text").desc(), table.c.created_at.desc())
+    )
+
+def get_latest_analyses(db: Session, paper_ids: List[uuid.UUID]):
+    if not paper_ids:
+        return []
+    return db.execute(_latest_analyses_query(paper_ids)).all()
+
 def create_analysis(db: Session, analysis: schemas.AnalysisCreate):
     db_analysis = models.Analysis(**analysis.dict())
     db.add(db_analysis)
@@ -41,9 +300,376 @@ def create_analysis(db: Session, analysis: schemas.AnalysisCreate):
     db.refresh(db_analysis)
     return db_analysis
 
+def bulk_create_analyses(db: Session, analyses: List[schemas.AnalysisCreate], commit: bool = True):
+    """Inserts many analyses with one multi-row INSERT. With `commit=False` the caller commits
+    them, e.g. together with the job checkpoint recording them."""
+    if not analyses:
+        return
+    db.execute(insert(models.Analysis.__table__).values([{"id": uuid.uuid4(), **a.dict()} for a in analyses]))
+    if commit:
+        db.commit()
+
+# Job CRUD operations
+def get_job(db: Session, job_id: uuid.UUID):
+    return db.query(models.Job).filter(models.Job.id == job_id).first()
+
+def get_jobs(db: Session, kind: Optional[str] = None, status: Optional[str] = None, skip: int = 0, limit: int = 100):
+    query = db.query(models.Job)
+    if kind:
+        query = query.filter(models.Job.kind == kind)
+    if status:
+        query = query.filter(models.Job.status == status)
+    return query.order_by(models.Job.started_at.desc().nulls_first()).offset(skip).limit(limit).all()
+
+def create_job(db: Session, job: schemas.JobCreate):
+    db_job = models.Job(**job.dict())
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def update_job(db: Session, db_job: models.Job, **fields):
+    """Sets the given columns on a job and commits. Pass a new dict for `payload`, never a mutated one."""
+    for name, value in fields.items():
+        setattr(db_job, name, value)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+# Domain and trend CRUD operations
+# domain_term_counts row counting all of a domain's papers in a year, next to the per-term rows
+TERM_TOTAL = "*"
+# Rows per INSERT, keeping statements under the 32,767 bind parameters asyncpg allows
+TERM_COUNT_INSERT_SIZE = 5000
+
+def _domain_match(name: str):
+    """Papers whose title, abstract or MeSH terms match the domain name as a web-style search query."""
+    document = func.to_tsvector("english", func.concat_ws(
+        " ", models.Paper.title, models.Paper.abstract, func.array_to_string(models.Paper.mesh_terms, " ")
+    ))
+    return document.op("@@")(func.websearch_to_tsquery("english", name))
+
+def _domain_papers_query(name: str, after: Optional[Tuple[datetime, uuid.UUID]], until: datetime, limit: int):
+    table = models.Paper.__table__
+    query = (
+        select(table.c.id, table.c.title, table.c.abstract, table.c.mesh_terms, table.c.year, table.c.journal, table.c.created_at)
+        .where(_domain_match(name), table.c.created_at <= until)
+        .order_by(table.c.created_at, table.c.id)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(tuple_(table.c.created_at, table.c.id) > tuple_(*after))
+    return query
+
+def _advance_domain_statement(domain_id: uuid.UUID, previous: Tuple[Optional[datetime], Optional[uuid.UUID]],
+                              through: Tuple[datetime, uuid.UUID]):
+    """Moves the domain's watermark, but only from `previous`: a concurrent run that already moved it matches no row."""
+    table = models.Domain.__table__
+    return (
+        update(table)
+        .where(table.c.id == domain_id,
+               table.c.last_paper_created_at.is_not_distinct_from(previous[0]),
+               table.c.last_paper_id.is_not_distinct_from(previous[1]))
+        .values(last_paper_created_at=through[0], last_paper_id=through[1])
+    )
+
+def _term_counts_upserts(rows: List[dict]):
+    table = models.DomainTermCount.__table__
+    for start in range(0, len(rows), TERM_COUNT_INSERT_SIZE):
+        stmt = pg_insert(table).values(rows[start:start + TERM_COUNT_INSERT_SIZE])
+        yield stmt.on_conflict_do_update(
+            index_elements=["domain_id", "term", "year"],
+            set_={"papers": table.c.papers + stmt.excluded.papers},
+        )
+
+def _term_counts_query(domain_id: uuid.UUID, min_papers: int):
+    table = models.DomainTermCount.__table__
+    frequent = (
+        select(table.c.term).where(table.c.domain_id == domain_id)
+        .group_by(table.c.term).having(func.sum(table.c.papers) >= min_papers)
+    )
+    return select(table.c.term, table.c.year, table.c.papers).where(
+        table.c.domain_id == domain_id, or_(table.c.term.in_(frequent), table.c.term == TERM_TOTAL)
+    )
+
+def get_domains(db: Session):
+    return db.query(models.Domain).order_by(models.Domain.name).all()
+
+def get_domain_by_name(db: Session, name: str):
+    return db.query(models.Domain).filter(models.Domain.name == name).first()
+
+def get_or_create_domain(db: Session, name: str):
+    db.execute(pg_insert(models.Domain.__table__).values(id=uuid.uuid4(), name=name).on_conflict_do_nothing(index_elements=["name"]))
+    db.commit()
+    return get_domain_by_name(db, name)
+
+def get_domain_papers(db: Session, name: str, after: Optional[Tuple[datetime, uuid.UUID]], until: datetime, limit: int):
+    """Returns the next `limit` papers of a domain after the (created_at, id) keyset `after`, oldest first."""
+    return db.execute(_domain_papers_query(name, after, until, limit)).all()
+
+def add_domain_term_counts(db: Session, domain_id: uuid.UUID, rows: List[dict],
+                           previous: Tuple[Optional[datetime], Optional[uuid.UUID]], through: Tuple[datetime, uuid.UUID]) -> bool:
+    """Adds (term, year, papers) counts and moves the domain's watermark to `through` in one transaction.
+
+    Returns False, writing nothing, when another run has moved the watermark since `previous`.
+    """
+    if db.execute(_advance_domain_statement(domain_id, previous, through)).rowcount != 1:
+        db.rollback()
+        return False
+    for statement in _term_counts_upserts(rows):
+        db.execute(statement)
+    db.commit()
+    return True
+
+def get_domain_term_counts(db: Session, domain_id: uuid.UUID, min_papers: int):
+    """Returns (term, year, papers) rows for terms found in at least `min_papers` papers, plus the yearly totals."""
+    return db.execute(_term_counts_query(domain_id, min_papers)).all()
+
+def create_domain_trend(db: Session, trend: schemas.DomainTrendCreate):
+    db_trend = models.DomainTrend(**trend.dict())
+    db.add(db_trend)
+    db.commit()
+    db.refresh(db_trend)
+    return db_trend
+
+def get_latest_domain_trend(db: Session, domain_id: uuid.UUID):
+    return (
+        db.query(models.DomainTrend).filter(models.DomainTrend.domain_id == domain_id)
+        .order_by(models.DomainTrend.created_at.desc()).first()
+    )
+
+def _latest_domain_trend_time_query(name: str):
+    return (
+        select(func.max(models.DomainTrend.created_at))
+        .join(models.Domain, models.Domain.id == models.DomainTrend.domain_id)
+        .where(models.Domain.name == name)
+    )
+
+def get_latest_domain_trend_time(db: Session, name: str) -> Optional[datetime]:
+    """When the named domain's latest trends were computed, without loading them."""
+    return db.scalar(_latest_domain_trend_time_query(name))
+
 # Grant CRUD operations
-def get_grants(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Grant).offset(skip).limit(limit).all()
+# Columns a grant upsert may overwrite; the natural key (source, call_id) never changes.
+GRANT_UPSERT_COLUMNS = ["title", "deadline", "url", "agency", "tags"]
+
+def _grant_upsert_statement(grants: List[schemas.GrantCreate]):
+    """INSERT ... ON CONFLICT (source, call_id) DO UPDATE that only touches rows whose content changed.
+
+    A feed may list a call twice; the last copy wins, as one statement cannot update a row twice.
+    """
+    rows = {(grant.source, grant.call_id): grant.dict() for grant in grants}
+    table = models.Grant.__table__
+    stmt = pg_insert(table).values([{"id": uuid.uuid4(), **row} for row in rows.values()])
+    return stmt.on_conflict_do_update(
+        index_elements=["source", "call_id"],
+        set_={**{column: stmt.excluded[column] for column in GRANT_UPSERT_COLUMNS}, "updated_at": func.now()},
+        where=or_(*[table.c[column].is_distinct_from(stmt.excluded[column]) for column in GRANT_UPSERT_COLUMNS]),
+    ).returning(table.c.id)
+
+def upsert_grants(db: Session, grants: List[schemas.GrantCreate]) -> int:
+    """Upserts a batch of grants in one statement and one commit; returns how many were inserted or changed."""
+    if not grants:
+        return 0
+    changed = db.execute(_grant_upsert_statement(grants)).all()
+    db.commit()
+    return len(changed)
+
+def open_grant_condition(today: date, table=models.Grant.__table__):
+    """A call is open when its deadline has not passed, or when it has none (a rolling call)."""
+    return or_(table.c.deadline.is_(None), table.c.deadline >= today)
+
+def _open_grants_query(today: date, tags: Optional[List[str]], match_all: bool, before: Optional[date],
+                       cursor: Optional[str], limit: int):
+    """Open calls (with a deadline up to `before`), soonest deadline first and rolling calls last,
+    keyset-paginated on (deadline, id)."""
+    table = models.Grant.__table__
+    query = (
+        select(table).where(open_grant_condition(today, table))
+        .order_by(table.c.deadline.asc().nulls_last(), table.c.id)
+        .limit(limit + 1)
+    )
+    if before is not None:
+        query = query.where(table.c.deadline <= before)
+    if tags:
+        # && and @> are answered by the GIN index on tags
+        wanted = cast(tags, ARRAY(Text))
+        query = query.where(table.c.tags.op("@>" if match_all else "&&")(wanted))
+    if cursor:
+        deadline, grant_id = decode_page_cursor(cursor, date.fromisoformat)
+        if deadline is None:
+            query = query.where(table.c.deadline.is_(None), table.c.id > grant_id)
+        else:
+            query = query.where(or_(tuple_(table.c.deadline, table.c.id) > tuple_(deadline, grant_id), table.c.deadline.is_(None)))
+    return query
+
+def _open_grants_page(rows, limit: int) -> dict:
+    rows = list(rows)
+    last = rows[limit - 1] if len(rows) > limit else None
+    return {
+        "items": [dict(row._mapping) for row in rows[:limit]],
+        "next_cursor": encode_page_cursor(last.deadline, last.id) if last is not None else None,
+    }
+
+def get_open_grant_calls(db: Session, today: date, tags: Optional[List[str]] = None, match_all: bool = False,
+                         before: Optional[date] = None, cursor: Optional[str] = None, limit: int = 100) -> dict:
+    """Returns one page of open calls matching any (or, with `match_all`, every) tag, as {"items", "next_cursor"}."""
+    return _open_grants_page(db.execute(_open_grants_query(today, tags, match_all, before, cursor, limit)), limit)
+
+def get_open_grants(db: Session, today: date):
+    """Grant calls whose deadline has not passed, or that have none."""
+    return db.query(models.Grant).filter(open_grant_condition(today)).all()
+
+def get_grant(db: Session, grant_id: uuid.UUID):
+    return db.query(models.Grant).filter(models.Grant.id == grant_id).first()
+
+def get_grants(db: Session, cursor: Optional[str] = None, limit: int = 100, fields: Optional[List[str]] = None):
+    return get_page(db, models.Grant, cursor=cursor, limit=limit, fields=fields)
+
+# Paper-to-grant matching
+# Rows per INSERT, keeping statements under the 32,767 bind parameters asyncpg allows
+GRANT_MATCH_INSERT_SIZE = 5000
+MATCHER_PAPER_COLUMNS = ("last_paper_created_at", "last_paper_id")
+MATCHER_GRANT_COLUMNS = ("last_grant_updated_at", "last_grant_id")
+
+def _advance_matcher_statement(method: str, columns: Tuple[str, str], previous: Tuple[Optional[datetime], Optional[uuid.UUID]],
+                               through: Tuple[datetime, uuid.UUID]):
+    """Moves one of the matcher's watermarks, but only from `previous`; see _advance_domain_statement."""
+    table = models.GrantMatcher.__table__
+    return (
+        update(table)
+        .where(table.c.method == method,
+               table.c[columns[0]].is_not_distinct_from(previous[0]),
+               table.c[columns[1]].is_not_distinct_from(previous[1]))
+        .values({columns[0]: through[0], columns[1]: through[1]})
+    )
+
+def _matching_papers_query(after: Optional[Tuple[datetime, uuid.UUID]], limit: int, until: Optional[datetime] = None,
+                           through: Optional[Tuple[datetime, uuid.UUID]] = None):
+    table = models.Paper.__table__
+    query = (
+        select(table.c.id, table.c.title, table.c.abstract, table.c.mesh_terms, table.c.created_at)
+        .order_by(table.c.created_at, table.c.id)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(tuple_(table.c.created_at, table.c.id) > tuple_(*after))
+    if until is not None:
+        query = query.where(table.c.created_at <= until)
+    if through is not None:
+        query = query.where(tuple_(table.c.created_at, table.c.id) <= tuple_(*through))
+    return query
+
+def _changed_grants_query(after: Optional[Tuple[datetime, uuid.UUID]], until: datetime):
+    table = models.Grant.__table__
+    query = select(table.c.id, table.c.updated_at).where(table.c.updated_at <= until).order_by(table.c.updated_at, table.c.id)
+    if after is not None:
+        query = query.where(tuple_(table.c.updated_at, table.c.id) > tuple_(*after))
+    return query
+
+def _grant_match_statements(paper_ids: List[uuid.UUID], rows: List[dict]):
+    table = models.PaperGrantMatch.__table__
+    yield delete(table).where(table.c.paper_id.in_(paper_ids))
+    for start in range(0, len(rows), GRANT_MATCH_INSERT_SIZE):
+        yield insert(table).values(rows[start:start + GRANT_MATCH_INSERT_SIZE])
+
+def _paper_grant_matches_query(paper_id: uuid.UUID, today: date, limit: int):
+    """A paper's stored matches to calls that are still open, best first."""
+    matches, grants = models.PaperGrantMatch.__table__, models.Grant.__table__
+    return (
+        select(grants.c.id.label("grant_id"), grants.c.title, grants.c.agency, grants.c.url, grants.c.deadline, grants.c.tags, matches.c.score)
+        .join(grants, grants.c.id == matches.c.grant_id)
+        .where(matches.c.paper_id == paper_id, open_grant_condition(today, grants))
+        .order_by(matches.c.score.desc())
+        .limit(limit)
+    )
+
+def get_or_create_grant_matcher(db: Session, method: str):
+    db.execute(pg_insert(models.GrantMatcher.__table__).values(method=method).on_conflict_do_nothing(index_elements=["method"]))
+    db.commit()
+    return db.get(models.GrantMatcher, method, populate_existing=True)
+
+def reset_grant_matcher(db: Session, method: str):
+    """Forgets the matcher's progress, so its next run matches every paper again."""
+    db.execute(delete(models.GrantMatcher.__table__).where(models.GrantMatcher.method == method))
+    db.commit()
+
+def get_matching_papers(db: Session, after: Optional[Tuple[datetime, uuid.UUID]], limit: int, until: Optional[datetime] = None,
+                        through: Optional[Tuple[datetime, uuid.UUID]] = None):
+    """Returns the next `limit` papers after the (created_at, id) keyset `after`, oldest first, up to
+    `until` (a creation time) or `through` (a keyset)."""
+    return db.execute(_matching_papers_query(after, limit, until, through)).all()
+
+def get_changed_grants(db: Session, after: Optional[Tuple[datetime, uuid.UUID]], until: datetime):
+    """Returns (id, updated_at) of the grants inserted or changed after the (updated_at, id) keyset `after`."""
+    return db.execute(_changed_grants_query(after, until)).all()
+
+def _papers_matched_to_closed_grants_query(today: date, limit: int):
+    matches, grants = models.PaperGrantMatch.__table__, models.Grant.__table__
+    return (
+        select(matches.c.paper_id)
+        .join(grants, grants.c.id == matches.c.grant_id)
+        .where(~open_grant_condition(today, grants))
+        .group_by(matches.c.paper_id)
+        .order_by(matches.c.paper_id)
+        .limit(limit)
+    )
+
+def get_papers_matched_to_closed_grants(db: Session, today: date, limit: int) -> List[uuid.UUID]:
+    """Returns up to `limit` ids of papers whose stored matches include a call that has closed."""
+    return db.scalars(_papers_matched_to_closed_grants_query(today, limit)).all()
+
+def get_grant_matches_for_papers(db: Session, paper_ids: List[uuid.UUID]):
+    """Returns the stored (paper_id, grant_id, score) rows of the given papers."""
+    if not paper_ids:
+        return []
+    table = models.PaperGrantMatch.__table__
+    return db.execute(select(table.c.paper_id, table.c.grant_id, table.c.score).where(table.c.paper_id.in_(paper_ids))).all()
+
+def replace_paper_grant_matches(db: Session, method: str, paper_ids: List[uuid.UUID], rows: List[dict],
+                                previous: Optional[Tuple[Optional[datetime], Optional[uuid.UUID]]] = None,
+                                through: Optional[Tuple[datetime, uuid.UUID]] = None) -> bool:
+    """Replaces the papers' (paper_id, grant_id, score) matches in one transaction.
+
+    With `through`, also moves the matcher's paper watermark there from `previous`; returns
+    False, writing nothing, when another run has moved it first.
+    """
+    if through is not None and db.execute(_advance_matcher_statement(method, MATCHER_PAPER_COLUMNS, previous, through)).rowcount != 1:
+        db.rollback()
+        return False
+    if paper_ids:
+        for statement in _grant_match_statements(paper_ids, rows):
+            db.execute(statement)
+    db.commit()
+    return True
+
+def advance_grant_matcher(db: Session, method: str, previous: Tuple[Optional[datetime], Optional[uuid.UUID]],
+                          through: Tuple[datetime, uuid.UUID]) -> bool:
+    """Moves the matcher's grant watermark to `through`; False if another run moved it since `previous`."""
+    advanced = db.execute(_advance_matcher_statement(method, MATCHER_GRANT_COLUMNS, previous, through)).rowcount == 1
+    db.commit()
+    return advanced
+
+def get_paper_grant_matches(db: Session, paper_id: uuid.UUID, today: date, limit: int = 10):
+    return db.execute(_paper_grant_matches_query(paper_id, today, limit)).all()
+
+def _papers_grant_matches_query(paper_ids: List[uuid.UUID], today: date, limit: int):
+    """Open calls matching any of the papers, by their best score against one of them."""
+    matches, grants = models.PaperGrantMatch.__table__, models.Grant.__table__
+    score = func.max(matches.c.score).label("score")
+    return (
+        select(grants.c.id.label("grant_id"), grants.c.title, grants.c.agency, grants.c.url, grants.c.deadline, grants.c.tags, score)
+        .join(grants, grants.c.id == matches.c.grant_id)
+        .where(matches.c.paper_id.in_(paper_ids), open_grant_condition(today, grants))
+        .group_by(grants.c.id)
+        .order_by(score.desc())
+        .limit(limit)
+    )
+
+def get_papers_grant_matches(db: Session, paper_ids: List[uuid.UUID], today: date, limit: int = 10):
+    if not paper_ids:
+        return []
+    return db.execute(_papers_grant_matches_query(paper_ids, today, limit)).all()
 
 # Proposal CRUD operations
 def create_proposal(db: Session, proposal: schemas.ProposalCreate):
@@ -52,3 +678,6 @@ def create_proposal(db: Session, proposal: schemas.ProposalCreate):
     db.commit()
     db.refresh(db_proposal)
     return db_proposal
+
+def get_proposal(db: Session, proposal_id: uuid.UUID):
+    return db.query(models.Proposal).filter(models.Proposal.id == proposal_id).first()
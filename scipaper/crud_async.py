@@ -0,0 +1,363 @@
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from . import crud, models, schemas
+import uuid
+
+# Async counterparts of the functions in crud.py, for use from async endpoints.
+
+async def get_page(db: AsyncSession, model, cursor: Optional[str] = None, limit: int = 100, fields: Optional[List[str]] = None) -> dict:
+    """One keyset page of a table, newest first; see crud.get_page."""
+    return crud._page(await db.execute(crud._page_query(model, fields, cursor, limit)), fields, limit)
+
+# User CRUD operations
+async def get_user(db: AsyncSession, user_id: uuid.UUID):
+    return await db.scalar(select(models.User).where(models.User.id == user_id))
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+async def get_users(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, fields: Optional[List[str]] = None):
+    return await get_page(db, models.User, cursor=cursor, limit=limit, fields=fields)
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    db_user = models.User(email=user.email, name=user.name, affiliation=user.affiliation)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+# Paper CRUD operations
+async def get_paper(db: AsyncSession, paper_id: uuid.UUID):
+    return await db.scalar(select(models.Paper).where(models.Paper.id == paper_id))
+
+async def get_papers(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, fields: Optional[List[str]] = None):
+    return await get_page(db, models.Paper, cursor=cursor, limit=limit, fields=fields)
+
+async def get_papers_by_ids(db: AsyncSession, paper_ids: List[uuid.UUID]):
+    result = await db.scalars(select(models.Paper).where(models.Paper.id.in_(paper_ids)))
+    return result.all()
+
+async def get_author_papers(db: AsyncSession, name: str, limit: int = 100):
+    """Papers listing an author of this exact name, newest first."""
+    return (await db.scalars(crud._author_papers_query(name, limit))).all()
+
+async def create_paper(db: AsyncSession, paper: schemas.PaperCreate):
+    db_paper = models.Paper(**paper.dict())
+    db.add(db_paper)
+    await db.commit()
+    await db.refresh(db_paper)
+    return db_paper
+
+async def upsert_papers(db: AsyncSession, papers: List[schemas.PaperCreate]):
+    """Upserts a chunk of papers keyed on (source, source_id); see crud.upsert_papers."""
+    if not papers:
+        return [], []
+    owners_query = crud._paper_doi_owners_query(papers)
+    owners = {doi: (source, source_id) for doi, source, source_id in await db.execute(owners_query)} if owners_query is not None else {}
+    values, keys = crud._dedupe_paper_rows(papers, owners)
+    changed = (await db.execute(crud._paper_upsert_statement(values))).all() if values else []
+    db_papers = (await db.execute(crud._papers_by_key_query(keys))).all()
+    await db.commit()
+    return db_papers, changed
+
+# Paper file CRUD operations
+async def create_paper_file(db: AsyncSession, paper_file: schemas.PaperFileCreate):
+    db_paper_file = models.PaperFile(**paper_file.dict())
+    db.add(db_paper_file)
+    await db.commit()
+    await db.refresh(db_paper_file)
+    return db_paper_file
+
+async def get_paper_file_by_path(db: AsyncSession, storage_path: str):
+    return await db.scalar(select(models.PaperFile).where(models.PaperFile.storage_path == storage_path))
+
+async def update_paper_file(db: AsyncSession, db_paper_file: models.PaperFile, **fields):
+    for name, value in fields.items():
+        setattr(db_paper_file, name, value)
+    await db.commit()
+    await db.refresh(db_paper_file)
+    return db_paper_file
+
+async def get_paper_file_text(db: AsyncSession, sha256: str):
+    return await db.get(models.PaperFileText, sha256)
+
+async def create_paper_file_text(db: AsyncSession, sha256: str, extractor: str, pages: int, text_gz: bytes):
+    """Stores extracted text for a file hash; a concurrent insert of the same hash is ignored."""
+    await db.execute(pg_insert(models.PaperFileText.__table__).values(
+        sha256=sha256, extractor=extractor, pages=pages, text_gz=text_gz
+    ).on_conflict_do_nothing(index_elements=["sha256"]))
+    await db.commit()
+
+async def get_paper_embeddings(db: AsyncSession, paper_ids: List[uuid.UUID]):
+    if not paper_ids:
+        return []
+    return (await db.scalars(select(models.PaperEmbedding).where(models.PaperEmbedding.paper_id.in_(paper_ids)))).all()
+
+async def upsert_paper_embeddings(db: AsyncSession, rows: List[dict]):
+    """Stores (paper_id, model, content_hash, vector) rows, replacing each paper's previous embedding."""
+    if not rows:
+        return
+    stmt = pg_insert(models.PaperEmbedding.__table__).values(rows)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["paper_id"],
+        set_={name: stmt.excluded[name] for name in ("model", "content_hash", "vector", "created_at")}
+    ))
+    await db.commit()
+
+async def get_papers_to_embed(db: AsyncSession, model: str, after: Optional[Tuple[datetime, uuid.UUID]], limit: int,
+                              include_embedded: bool = False):
+    """Returns the next `limit` papers without an embedding from `model`; see crud.get_papers_to_embed."""
+    return (await db.scalars(crud._papers_to_embed_query(model, after, limit, include_embedded))).all()
+
+# Near-duplicate signatures and LSH band index
+async def get_paper_signatures(db: AsyncSession, kind: str, paper_ids: List[uuid.UUID]):
+    """Returns (paper_id, signature, source, title) rows for the given papers."""
+    if not paper_ids:
+        return []
+    result = await db.execute(
+        select(models.PaperSignature.paper_id, models.PaperSignature.signature, models.Paper.source, models.Paper.title)
+        .join(models.Paper, models.Paper.id == models.PaperSignature.paper_id)
+        .where(models.PaperSignature.kind == kind, models.PaperSignature.paper_id.in_(paper_ids))
+    )
+    return result.all()
+
+async def replace_paper_signatures(db: AsyncSession, kind: str, signatures: Dict[uuid.UUID, bytes], bands: List[Tuple[uuid.UUID, int, int]]):
+    """Stores the papers' signatures and replaces their (paper_id, band, bucket) LSH entries in one transaction."""
+    if not signatures:
+        return
+    stmt = pg_insert(models.PaperSignature.__table__).values([
+        {"paper_id": paper_id, "kind": kind, "signature": signature} for paper_id, signature in signatures.items()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["paper_id", "kind"],
+        set_={"signature": stmt.excluded.signature, "created_at": stmt.excluded.created_at}
+    ))
+    await db.execute(delete(models.PaperLshBand.__table__).where(
+        models.PaperLshBand.kind == kind, models.PaperLshBand.paper_id.in_(list(signatures))
+    ))
+    if bands:
+        await db.execute(pg_insert(models.PaperLshBand.__table__).values([
+            {"kind": kind, "paper_id": paper_id, "band": band, "bucket": bucket} for paper_id, band, bucket in bands
+        ]).on_conflict_do_nothing())
+    await db.commit()
+
+async def get_lsh_candidates(db: AsyncSession, kind: str, keys: List[Tuple[int, int]]):
+    """Returns (band, bucket, paper_id) rows sharing any of the given (band, bucket) keys."""
+    if not keys:
+        return []
+    result = await db.execute(
+        select(models.PaperLshBand.band, models.PaperLshBand.bucket, models.PaperLshBand.paper_id)
+        .where(models.PaperLshBand.kind == kind, tuple_(models.PaperLshBand.band, models.PaperLshBand.bucket).in_(keys))
+    )
+    return result.all()
+
+async def flag_duplicates(db: AsyncSession, kind: str, duplicates: Dict[uuid.UUID, Tuple[uuid.UUID, float]]):
+    """Records, per paper, the paper it duplicates and their estimated similarity."""
+    for paper_id, (duplicate_of, similarity) in duplicates.items():
+        await db.execute(
+            update(models.PaperSignature.__table__)
+            .where(models.PaperSignature.paper_id == paper_id, models.PaperSignature.kind == kind)
+            .values(duplicate_of=duplicate_of, similarity=similarity)
+        )
+    await db.commit()
+
+# Analysis CRUD operations
+async def get_latest_analyses(db: AsyncSession, paper_ids: List[uuid.UUID]):
+    """Each paper's latest completed analysis, preferring one of the full text."""
+    if not paper_ids:
+        return []
+    return (await db.execute(crud._latest_analyses_query(paper_ids))).all()
+
+async def create_analysis(db: AsyncSession, analysis: schemas.AnalysisCreate):
+    db_analysis = models.Analysis(**analysis.dict())
+    db.add(db_analysis)
+    await db.commit()
+    await db.refresh(db_analysis)
+    return db_analysis
+
+async def bulk_create_analyses(db: AsyncSession, analyses: List[schemas.AnalysisCreate], commit: bool = True):
+    """Inserts many analyses with one multi-row INSERT. With `commit=False` the caller commits
+    them, e.g. together with the job checkpoint recording them."""
+    if not analyses:
+        return
+    await db.execute(insert(models.Analysis.__table__).values([{"id": uuid.uuid4(), **a.dict()} for a in analyses]))
+    if commit:
+        await db.commit()
+
+# Job CRUD operations
+async def get_job(db: AsyncSession, job_id: uuid.UUID):
+    return await db.scalar(select(models.Job).where(models.Job.id == job_id))
+
+async def get_jobs(db: AsyncSession, kind: Optional[str] = None, status: Optional[str] = None, skip: int = 0, limit: int = 100):
+    query = select(models.Job)
+    if kind:
+        query = query.where(models.Job.kind == kind)
+    if status:
+        query = query.where(models.Job.status == status)
+    result = await db.scalars(query.order_by(models.Job.started_at.desc().nulls_first()).offset(skip).limit(limit))
+    return result.all()
+
+async def create_job(db: AsyncSession, job: schemas.JobCreate):
+    db_job = models.Job(**job.dict())
+    db.add(db_job)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
+
+async def update_job(db: AsyncSession, db_job: models.Job, **fields):
+    """Sets the given columns on a job and commits. Pass a new dict for `payload`, never a mutated one."""
+    for name, value in fields.items():
+        setattr(db_job, name, value)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
+
+# Domain and trend CRUD operations
+async def get_domains(db: AsyncSession):
+    result = await db.scalars(select(models.Domain).order_by(models.Domain.name))
+    return result.all()
+
+async def get_domain_by_name(db: AsyncSession, name: str):
+    return await db.scalar(select(models.Domain).where(models.Domain.name == name))
+
+async def get_or_create_domain(db: AsyncSession, name: str):
+    await db.execute(pg_insert(models.Domain.__table__).values(id=uuid.uuid4(), name=name).on_conflict_do_nothing(index_elements=["name"]))
+    await db.commit()
+    return await get_domain_by_name(db, name)
+
+async def get_domain_papers(db: AsyncSession, name: str, after: Optional[Tuple[datetime, uuid.UUID]], until: datetime, limit: int):
+    """Returns the next `limit` papers of a domain after the (created_at, id) keyset `after`, oldest first."""
+    return (await db.execute(crud._domain_papers_query(name, after, until, limit))).all()
+
+async def add_domain_term_counts(db: AsyncSession, domain_id: uuid.UUID, rows: List[dict],
+                                 previous: Tuple[Optional[datetime], Optional[uuid.UUID]], through: Tuple[datetime, uuid.UUID]) -> bool:
+    """Adds term counts and moves the domain's watermark in one transaction; see crud.add_domain_term_counts."""
+    if (await db.execute(crud._advance_domain_statement(domain_id, previous, through))).rowcount != 1:
+        await db.rollback()
+        return False
+    for statement in crud._term_counts_upserts(rows):
+        await db.execute(statement)
+    await db.commit()
+    return True
+
+async def get_domain_term_counts(db: AsyncSession, domain_id: uuid.UUID, min_papers: int):
+    """Returns (term, year, papers) rows for terms found in at least `min_papers` papers, plus the yearly totals."""
+    return (await db.execute(crud._term_counts_query(domain_id, min_papers))).all()
+
+async def create_domain_trend(db: AsyncSession, trend: schemas.DomainTrendCreate):
+    db_trend = models.DomainTrend(**trend.dict())
+    db.add(db_trend)
+    await db.commit()
+    await db.refresh(db_trend)
+    return db_trend
+
+async def get_latest_domain_trend(db: AsyncSession, domain_id: uuid.UUID):
+    return await db.scalar(
+        select(models.DomainTrend).where(models.DomainTrend.domain_id == domain_id)
+        .order_by(models.DomainTrend.created_at.desc()).limit(1)
+    )
+
+async def get_latest_domain_trend_time(db: AsyncSession, name: str) -> Optional[datetime]:
+    """When the named domain's latest trends were computed, without loading them."""
+    return await db.scalar(crud._latest_domain_trend_time_query(name))
+
+# Grant CRUD operations
+async def upsert_grants(db: AsyncSession, grants: List[schemas.GrantCreate]) -> int:
+    """Upserts a batch of grants keyed on (source, call_id); see crud.upsert_grants."""
+    if not grants:
+        return 0
+    changed = (await db.execute(crud._grant_upsert_statement(grants))).all()
+    await db.commit()
+    return len(changed)
+
+async def get_open_grant_calls(db: AsyncSession, today: date, tags: Optional[List[str]] = None, match_all: bool = False,
+                               before: Optional[date] = None, cursor: Optional[str] = None, limit: int = 100) -> dict:
+    """Returns one page of open calls matching the tags; see crud.get_open_grant_calls."""
+    return crud._open_grants_page(await db.execute(crud._open_grants_query(today, tags, match_all, before, cursor, limit)), limit)
+
+async def get_open_grants(db: AsyncSession, today: date):
+    """Grant calls whose deadline has not passed, or that have none."""
+    result = await db.scalars(select(models.Grant).where(crud.open_grant_condition(today)))
+    return result.all()
+
+async def get_grant(db: AsyncSession, grant_id: uuid.UUID):
+    return await db.scalar(select(models.Grant).where(models.Grant.id == grant_id))
+
+async def get_grants(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, fields: Optional[List[str]] = None):
+    return await get_page(db, models.Grant, cursor=cursor, limit=limit, fields=fields)
+
+# Paper-to-grant matching
+async def get_or_create_grant_matcher(db: AsyncSession, method: str):
+    await db.execute(pg_insert(models.GrantMatcher.__table__).values(method=method).on_conflict_do_nothing(index_elements=["method"]))
+    await db.commit()
+    return await db.get(models.GrantMatcher, method, populate_existing=True)
+
+async def reset_grant_matcher(db: AsyncSession, method: str):
+    """Forgets the matcher's progress, so its next run matches every paper again."""
+    await db.execute(delete(models.GrantMatcher.__table__).where(models.GrantMatcher.method == method))
+    await db.commit()
+
+async def get_matching_papers(db: AsyncSession, after: Optional[Tuple[datetime, uuid.UUID]], limit: int, until: Optional[datetime] = None,
+                              through: Optional[Tuple[datetime, uuid.UUID]] = None):
+    """Returns the next `limit` papers after the keyset `after`; see crud.get_matching_papers."""
+    return (await db.execute(crud._matching_papers_query(after, limit, until, through))).all()
+
+async def get_changed_grants(db: AsyncSession, after: Optional[Tuple[datetime, uuid.UUID]], until: datetime):
+    """Returns (id, updated_at) of the grants inserted or changed after the (updated_at, id) keyset `after`."""
+    return (await db.execute(crud._changed_grants_query(after, until))).all()
+
+async def get_papers_matched_to_closed_grants(db: AsyncSession, today: date, limit: int) -> List[uuid.UUID]:
+    """Returns up to `limit` ids of papers whose stored matches include a call that has closed."""
+    return (await db.scalars(crud._papers_matched_to_closed_grants_query(today, limit))).all()
+
+async def get_grant_matches_for_papers(db: AsyncSession, paper_ids: List[uuid.UUID]):
+    """Returns the stored (paper_id, grant_id, score) rows of the given papers."""
+    if not paper_ids:
+        return []
+    table = models.PaperGrantMatch.__table__
+    return (await db.execute(select(table.c.paper_id, table.c.grant_id, table.c.score).where(table.c.paper_id.in_(paper_ids)))).all()
+
+async def replace_paper_grant_matches(db: AsyncSession, method: str, paper_ids: List[uuid.UUID], rows: List[dict],
+                                      previous: Optional[Tuple[Optional[datetime], Optional[uuid.UUID]]] = None,
+                                      through: Optional[Tuple[datetime, uuid.UUID]] = None) -> bool:
+    """Replaces the papers' matches, optionally moving the paper watermark; see crud.replace_paper_grant_matches."""
+    if through is not None:
+        advance = crud._advance_matcher_statement(method, crud.MATCHER_PAPER_COLUMNS, previous, through)
+        if (await db.execute(advance)).rowcount != 1:
+            await db.rollback()
+            return False
+    if paper_ids:
+        for statement in crud._grant_match_statements(paper_ids, rows):
+            await db.execute(statement)
+    await db.commit()
+    return True
+
+async def advance_grant_matcher(db: AsyncSession, method: str, previous: Tuple[Optional[datetime], Optional[uuid.UUID]],
+                                through: Tuple[datetime, uuid.UUID]) -> bool:
+    """Moves the matcher's grant watermark to `through`; False if another run moved it since `previous`."""
+    advanced = (await db.execute(crud._advance_matcher_statement(method, crud.MATCHER_GRANT_COLUMNS, previous, through))).rowcount == 1
+    await db.commit()
+    return advanced
+
+async def get_paper_grant_matches(db: AsyncSession, paper_id: uuid.UUID, today: date, limit: int = 10):
+    return (await db.execute(crud._paper_grant_matches_query(paper_id, today, limit))).all()
+
+async def get_papers_grant_matches(db: AsyncSession, paper_ids: List[uuid.UUID], today: date, limit: int = 10):
+    """Open calls matching any of the papers, by their best score against one of them."""
+    if not paper_ids:
+        return []
+    return (await db.execute(crud._papers_grant_matches_query(paper_ids, today, limit))).all()
+
+# Proposal CRUD operations
+async def create_proposal(db: AsyncSession, proposal: schemas.ProposalCreate):
+    db_proposal = models.Proposal(**proposal.dict())
+    db.add(db_proposal)
+    await db.commit()
+    await db.refresh(db_proposal)
+    return db_proposal
+
+async def get_proposal(db: AsyncSession, proposal_id: uuid.UUID):
+    return await db.scalar(select(models.Proposal).where(models.Proposal.id == proposal_id))
@@ -1,14 +1,49 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
-engine = create_engine(settings.supabase_db_url)
+POOL_OPTIONS = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    pool_recycle=settings.db_pool_recycle,
+    pool_timeout=settings.db_pool_timeout,
+)
+
+engine = create_engine(settings.supabase_db_url, **POOL_OPTIONS)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _async_engine_args(db_url: str):
+    """Converts the configured database URL into an asyncpg URL plus connect args."""
+    url = make_url(db_url)
+    query = dict(url.query)
+    connect_args = {"statement_cache_size": settings.db_statement_cache_size}
+    # asyncpg does not understand libpq's sslmode parameter
+    sslmode = query.pop("sslmode", None)
+    if sslmode and sslmode != "disable":
+        connect_args["ssl"] = "require"
+    return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+
+_async_url, _async_connect_args = _async_engine_args(settings.supabase_db_url)
+async_engine = create_async_engine(_async_url, connect_args=_async_connect_args, **POOL_OPTIONS)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+async def check_async_engine():
+    """Health probe: checks out a pooled connection and runs a trivial query."""
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,16 +1,31 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from fastapi.templating import Jinja2Templates
 from scipaper.api.api_router import api_router
 from scipaper.logging_config import setup_logging
+from scipaper.config import settings
+from scipaper.services import clients
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 import time
 
 # Call this at the very beginning
 setup_logging()
 
-app = FastAPI(title="SciPaper")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect in the background: the app accepts requests at once, and the first requests
+    # usually find their clients already connected
+    warm_up = asyncio.create_task(clients.warm_up()) if settings.client_warm_up else None
+    yield
+    if warm_up is not None:
+        warm_up.cancel()
+    await clients.close_all()
+
+app = FastAPI(title="SciPaper", lifespan=lifespan)
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -30,6 +45,12 @@ templates = Jinja2Templates(directory=BASE_DIR / "templates")
 
 app.include_router(api_router, prefix="/api/v1")
 
+@app.get("/health")
+async def health():
+    """Probes the database, Elasticsearch and Neo4j; answers 503 when any of them is unreachable."""
+    report = await clients.health()
+    return JSONResponse(report, status_code=200 if report["status"] == "ok" else 503)
+
 @app.get("/")
 def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, String, Integer, JSON, DateTime, Date, ARRAY, Uuid
+from sqlalchemy import create_engine, Column, String, Integer, BigInteger, Float, JSON, DateTime, Date, ARRAY, Uuid, Index, LargeBinary, text
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
@@ -6,6 +6,10 @@ import uuid
 
 Base = declarative_base()
 
+def paper_key(source: str, source_id: str) -> str:
+    """Returns the natural key that identifies a paper across repeated ingests."""
+    return f"{source}:{source_id}"
+
 class User(Base):
     __tablename__ = 'users'
     id = Column(Uuid, primary_key=True, default=uuid.uuid4)
@@ -14,6 +18,10 @@ class User(Base):
     affiliation = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
+
 class Paper(Base):
     __tablename__ = 'papers'
     id = Column(Uuid, primary_key=True, default=uuid.uuid4)
@@ -27,8 +35,15 @@ class Paper(Base):
     doi = Column(String)
     language = Column(String)
     abstract = Column(String)
+    mesh_terms = Column(ARRAY(String))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('papers_source_source_id_key', 'source', 'source_id', unique=True),
+        Index('papers_doi_key', 'doi', unique=True, postgresql_where=text('doi IS NOT NULL')),
+        Index('ix_papers_created_at_id', 'created_at', 'id'),
+    )
+
 class PaperFile(Base):
     __tablename__ = 'paper_files'
     id = Column(Uuid, primary_key=True, default=uuid.uuid4)
@@ -36,8 +51,45 @@ class PaperFile(Base):
     storage_path = Column(String)
     mime = Column(String)
     pages = Column(Integer)
+    sha256 = Column(String, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PaperFileText(Base):
+    __tablename__ = 'paper_file_texts'
+    sha256 = Column(String, primary_key=True)
+    extractor = Column(String)
+    pages = Column(Integer)
+    text_gz = Column(LargeBinary)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PaperEmbedding(Base):
+    __tablename__ = 'paper_embeddings'
+    paper_id = Column(Uuid, primary_key=True)
+    model = Column(String)
+    content_hash = Column(String)
+    vector = Column(LargeBinary)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PaperSignature(Base):
+    __tablename__ = 'paper_signatures'
+    paper_id = Column(Uuid, primary_key=True)
+    kind = Column(String, primary_key=True)
+    signature = Column(LargeBinary)
+    duplicate_of = Column(Uuid)
+    similarity = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class PaperLshBand(Base):
+    __tablename__ = 'paper_lsh_bands'
+    kind = Column(String, primary_key=True)
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    paper_id = Column(Uuid, primary_key=True)
+
+    __table_args__ = (
+        Index('ix_paper_lsh_bands_paper_id', 'paper_id'),
+    )
+
 class Analysis(Base):
     __tablename__ = 'analyses'
     id = Column(Uuid, primary_key=True, default=uuid.uuid4)
@@ -57,6 +109,16 @@ class Domain(Base):
     __tablename__ = 'domains'
     id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String, unique=True)
+    # The last paper, in (created_at, id) order, whose terms are counted in domain_term_counts
+    last_paper_created_at = Column(DateTime(timezone=True))
+    last_paper_id = Column(Uuid)
+
+class DomainTermCount(Base):
+    __tablename__ = 'domain_term_counts'
+    domain_id = Column(Uuid, primary_key=True)
+    term = Column(String, primary_key=True)
+    year = Column(Integer, primary_key=True)
+    papers = Column(Integer)
 
 class DomainTrend(Base):
     __tablename__ = 'domain_trends'
@@ -69,6 +131,10 @@ class DomainTrend(Base):
     funding = Column(JSON)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('ix_domain_trends_domain_id_created_at', 'domain_id', 'created_at'),
+    )
+
 class Job(Base):
     __tablename__ = 'jobs'
     id = Column(Uuid, primary_key=True, default=uuid.uuid4)
@@ -90,6 +156,38 @@ class Grant(Base):
     agency = Column(String)
     tags = Column(ARRAY(String))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set when an upsert changes the call, so the grant matcher can pick up changed calls
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_grants_created_at_id', 'created_at', 'id'),
+        Index('ix_grants_updated_at_id', 'updated_at', 'id'),
+        Index('grants_source_call_id_key', 'source', 'call_id', unique=True),
+        Index('ix_grants_tags', 'tags', postgresql_using='gin'),
+        Index('ix_grants_deadline_id', 'deadline', 'id'),
+    )
+
+class GrantMatcher(Base):
+    __tablename__ = 'grant_matchers'
+    # Identifies the vector space; changing it starts the matching over
+    method = Column(String, primary_key=True)
+    # The last paper, in (created_at, id) order, matched against the open grants
+    last_paper_created_at = Column(DateTime(timezone=True))
+    last_paper_id = Column(Uuid)
+    # The last grant, in (updated_at, id) order, matched against those papers
+    last_grant_updated_at = Column(DateTime(timezone=True))
+    last_grant_id = Column(Uuid)
+
+class PaperGrantMatch(Base):
+    __tablename__ = 'paper_grant_matches'
+    paper_id = Column(Uuid, primary_key=True)
+    grant_id = Column(Uuid, primary_key=True)
+    score = Column(Float)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_paper_grant_matches_grant_id', 'grant_id'),
+    )
 
 class Proposal(Base):
     __tablename__ = 'proposals'
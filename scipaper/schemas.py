@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 import uuid
 from datetime import datetime, date
 
@@ -18,6 +18,18 @@ class User(UserBase):
     class Config:
         orm_mode = True
 
+class UserFields(BaseModel):
+    """A user in a list page; only the columns requested with `fields` are present."""
+    id: Optional[uuid.UUID] = None
+    email: Optional[str] = None
+    name: Optional[str] = None
+    affiliation: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class UserPage(BaseModel):
+    items: List[UserFields]
+    next_cursor: Optional[str] = None
+
 class PaperBase(BaseModel):
     source: str
     source_id: str
@@ -29,6 +41,7 @@ class PaperBase(BaseModel):
     doi: Optional[str] = None
     language: Optional[str] = None
     abstract: Optional[str] = None
+    mesh_terms: Optional[List[str]] = None
 
 class PaperCreate(PaperBase):
     pass
@@ -40,17 +53,79 @@ class Paper(PaperBase):
     class Config:
         orm_mode = True
 
+class PaperFields(BaseModel):
+    """A paper in a list page; only the columns requested with `fields` are present."""
+    id: Optional[uuid.UUID] = None
+    source: Optional[str] = None
+    source_id: Optional[str] = None
+    title: Optional[str] = None
+    authors: Optional[List[dict]] = None
+    year: Optional[int] = None
+    journal: Optional[str] = None
+    url: Optional[str] = None
+    doi: Optional[str] = None
+    language: Optional[str] = None
+    abstract: Optional[str] = None
+    mesh_terms: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+
+class PaperPage(BaseModel):
+    items: List[PaperFields]
+    next_cursor: Optional[str] = None
+
+class SearchHit(BaseModel):
+    id: Optional[str] = None
+    score: Optional[float] = None
+    title: Optional[str] = None
+    authors: Optional[List[dict]] = None
+    journal: Optional[str] = None
+    year: Optional[int] = None
+    doi: Optional[str] = None
+    url: Optional[str] = None
+    language: Optional[str] = None
+    highlight: dict = {}
+
+class SearchResponse(BaseModel):
+    hits: List[SearchHit]
+    total: int
+    next_cursor: Optional[str] = None
+    took_ms: float
+    cached: bool = False
+
+class PaperFileBase(BaseModel):
+    paper_id: uuid.UUID
+    storage_path: str
+    mime: Optional[str] = None
+    pages: Optional[int] = None
+    sha256: Optional[str] = None
+
+class PaperFileCreate(PaperFileBase):
+    pass
+
+class PaperFile(PaperFileBase):
+    id: uuid.UUID
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class SimilarPaper(BaseModel):
+    paper_id: uuid.UUID
+    title: Optional[str] = None
+    source: Optional[str] = None
+    similarity: float
+
 class AnalysisBase(BaseModel):
     paper_id: uuid.UUID
     status: str
     duration_ms: Optional[int] = None
-    findings: Optional[dict] = None
-    methods: Optional[dict] = None
-    datasets: Optional[dict] = None
-    gaps: Optional[dict] = None
-    limitations: Optional[dict] = None
-    plagiarism: Optional[dict] = None
-    citations: Optional[dict] = None
+    findings: Optional[Union[list, dict]] = None
+    methods: Optional[Union[list, dict]] = None
+    datasets: Optional[Union[list, dict]] = None
+    gaps: Optional[Union[list, dict]] = None
+    limitations: Optional[Union[list, dict]] = None
+    plagiarism: Optional[Union[list, dict]] = None
+    citations: Optional[Union[list, dict]] = None
 
 class AnalysisCreate(AnalysisBase):
     pass
@@ -62,6 +137,54 @@ class Analysis(AnalysisBase):
     class Config:
         orm_mode = True
 
+class JobBase(BaseModel):
+    kind: str
+    payload: Optional[dict] = None
+    status: str
+
+class JobCreate(JobBase):
+    pass
+
+class Job(JobBase):
+    id: uuid.UUID
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class Domain(BaseModel):
+    id: uuid.UUID
+    name: str
+    last_paper_created_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class DomainTrendBase(BaseModel):
+    domain_id: uuid.UUID
+    status: str
+    duration_ms: Optional[int] = None
+    trends: Optional[dict] = None
+    top_papers: Optional[List[dict]] = None
+    funding: Optional[dict] = None
+
+class DomainTrendCreate(DomainTrendBase):
+    pass
+
+class DomainTrend(DomainTrendBase):
+    id: uuid.UUID
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class AnalysisBatchRequest(BaseModel):
+    paper_ids: Optional[List[uuid.UUID]] = None
+    query: Optional[str] = None
+    limit: int = 100
+
 class GrantBase(BaseModel):
     source: str
     call_id: str
@@ -77,10 +200,37 @@ class GrantCreate(GrantBase):
 class Grant(GrantBase):
     id: uuid.UUID
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
 
+class GrantFields(BaseModel):
+    """A grant in a list page; only the columns requested with `fields` are present."""
+    id: Optional[uuid.UUID] = None
+    source: Optional[str] = None
+    call_id: Optional[str] = None
+    title: Optional[str] = None
+    deadline: Optional[date] = None
+    url: Optional[str] = None
+    agency: Optional[str] = None
+    tags: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class GrantPage(BaseModel):
+    items: List[GrantFields]
+    next_cursor: Optional[str] = None
+
+class GrantMatch(BaseModel):
+    grant_id: uuid.UUID
+    title: Optional[str] = None
+    agency: Optional[str] = None
+    url: Optional[str] = None
+    deadline: Optional[date] = None
+    tags: Optional[List[str]] = None
+    score: float
+
 class ProposalBase(BaseModel):
     user_id: uuid.UUID
     domain: str
@@ -89,6 +239,15 @@ class ProposalBase(BaseModel):
 class ProposalCreate(ProposalBase):
     pass
 
+class ProposalRequest(BaseModel):
+    user_id: uuid.UUID
+    domain: str
+    # The user's papers to draw on; by default, the latest papers listing the user's name as an author
+    paper_ids: Optional[List[uuid.UUID]] = None
+    # The call to write for; by default, the open calls that best match the papers
+    grant_id: Optional[uuid.UUID] = None
+    instructions: Optional[str] = None
+
 class Proposal(ProposalBase):
     id: uuid.UUID
     created_at: datetime
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Optional
+
+from scipaper import schemas
+from scipaper.config import settings
+from scipaper.services import openai_analyzer
+from scipaper.services.http_client import TokenBucket
+
+# Rough output budget per analysis; prompt tokens are estimated from the input length
+COMPLETION_TOKENS_ESTIMATE = 800
+CHARS_PER_TOKEN = 4
+PROMPT_OVERHEAD_TOKENS = 250
+
+
+def estimate_tokens(title: str, text: str) -> int:
+    """Estimates the tokens one analysis request will consume against the TPM budget."""
+    return PROMPT_OVERHEAD_TOKENS + (len(title or "") + len(text or "")) // CHARS_PER_TOKEN + COMPLETION_TOKENS_ESTIMATE
+
+
+class RateBudget:
+    """Requests-per-minute and tokens-per-minute budgets shared by every concurrent call."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        # Allow bursts of up to six seconds' worth of each budget
+        self.requests = TokenBucket(requests_per_minute / 60, capacity=max(1.0, requests_per_minute / 10))
+        self.tokens = TokenBucket(tokens_per_minute / 60, capacity=max(1.0, tokens_per_minute / 10))
+
+    async def acquire(self, tokens: int):
+        await self.requests.acquire()
+        await self.tokens.acquire(tokens)
+
+
+@dataclass
+class BatchProgress:
+    completed: int = 0
+    cached: int = 0
+    failed: int = 0
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+async def analyze_papers(papers: List[Any],
+                         on_flush: Callable[[List[schemas.AnalysisCreate], BatchProgress], Awaitable[None]],
+                         concurrency: Optional[int] = None, budget: Optional[RateBudget] = None,
+                         flush_size: Optional[int] = None) -> BatchProgress:
+    """Analyses papers concurrently under a semaphore and the RPM/TPM budget.
+
+    Finished analyses are handed to `on_flush` in groups of `flush_size`, so they can be
+    persisted with one bulk insert each. Cache hits bypass the rate budget entirely.
+    """
+    concurrency = concurrency or settings.openai_max_concurrency
+    budget = budget or RateBudget(settings.openai_requests_per_minute, settings.openai_tokens_per_minute)
+    flush_size = flush_size or settings.analysis_batch_flush_size
+    semaphore = asyncio.Semaphore(concurrency)
+    progress = BatchProgress()
+
+    async def analyze(paper):
+        async with semaphore:
+            start = time.perf_counter()
+            cached = await openai_analyzer.get_cached_analysis(paper.title, paper.abstract)
+            if cached is None:
+                await budget.acquire(estimate_tokens(paper.title, paper.abstract))
+            try:
+                data = cached if cached is not None else await openai_analyzer.analyze_paper(paper.title, paper.abstract, use_cache=False)
+            except Exception as e:
+                return paper, None, e, cached is not None, 0
+            return paper, data, None, cached is not None, int((time.perf_counter() - start) * 1000)
+
+    pending: List[schemas.AnalysisCreate] = []
+    tasks = []
+    for paper in papers:
+        if not paper.abstract:
+            progress.skipped += 1
+            continue
+        tasks.append(asyncio.create_task(analyze(paper)))
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            paper, data, error, cached, duration_ms = await next_done
+            if error is not None:
+                progress.failed += 1
+                progress.errors.append(f"{paper.id}: {error}")
+                logging.error(f"Batch analysis failed for paper {paper.id}: {error}")
+                continue
+
+            progress.completed += 1
+            progress.cached += int(cached)
+            pending.append(schemas.AnalysisCreate(paper_id=paper.id, status="completed", duration_ms=duration_ms, **data))
+            if len(pending) >= flush_size:
+                await on_flush(pending, progress)
+                pending = []
+
+        await on_flush(pending, progress)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return progress
@@ -1,39 +1,63 @@
-import httpx
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional
 import xml.etree.ElementTree as ET
 
-BASE_URL = "https://export.arxiv.org/api/"
+from scipaper.config import settings
+from scipaper.services.harvest import HarvestPage, iter_xml_elements
+from scipaper.services.http_client import get_client
 
-async def search_arxiv(query: str, max_results: int = 10) -> List[Dict[str, Any]]:
-    """Search arXiv for a given query and return a list of articles."""
-    async with httpx.AsyncClient(follow_redirects=True) as client:
+ATOM = '{http://www.w3.org/2005/Atom}'
+OPENSEARCH = '{http://a9.com/-/spec/opensearch/1.1/}'
+
+def _parse_entry(entry: ET.Element) -> Dict[str, Any]:
+    """Converts one Atom <entry> into an article dict."""
+    title_element = entry.find(f'{ATOM}title')
+    title = title_element.text.strip() if title_element is not None else "No title found"
+
+    arxiv_id_element = entry.find(f'{ATOM}id')
+    arxiv_id = arxiv_id_element.text.split('/abs/')[-1] if arxiv_id_element is not None else ""
+
+    summary_element = entry.find(f'{ATOM}summary')
+    summary = summary_element.text.strip() if summary_element is not None else ""
+
+    authors = [author.find(f'{ATOM}name').text for author in entry.findall(f'{ATOM}author')]
+
+    return {
+        "source": "arxiv",
+        "source_id": arxiv_id,
+        "title": title,
+        "abstract": summary,
+        "authors": [{"name": author} for author in authors]
+    }
+
+async def harvest_arxiv(query: str, max_results: Optional[int] = None, page_size: Optional[int] = None, start: int = 0) -> AsyncIterator[HarvestPage]:
+    """Pages through arXiv results for a query, yielding one parsed page at a time.
+
+    `start` is the absolute result offset to resume from; `max_results` caps that offset.
+    """
+    page_size = page_size or settings.harvest_page_size
+    total = None
+    while (max_results is None or start < max_results) and (total is None or start < total):
         params = {
             "search_query": query,
-            "start": 0,
-            "max_results": max_results
+            "start": start,
+            "max_results": page_size if max_results is None else min(page_size, max_results - start)
         }
-        response = await client.get(f"{BASE_URL}query", params=params)
-        response.raise_for_status()
-
-        root = ET.fromstring(response.content)
         articles = []
-        for entry in root.findall('{http://www.w3.org/2005/Atom}entry'):
-            title_element = entry.find('{http://www.w3.org/2005/Atom}title')
-            title = title_element.text.strip() if title_element is not None else "No title found"
-
-            arxiv_id_element = entry.find('{http://www.w3.org/2005/Atom}id')
-            arxiv_id = arxiv_id_element.text.split('/abs/')[-1] if arxiv_id_element is not None else ""
-
-            summary_element = entry.find('{http://www.w3.org/2005/Atom}summary')
-            summary = summary_element.text.strip() if summary_element is not None else ""
-
-            authors = [author.find('{http://www.w3.org/2005/Atom}name').text for author in entry.findall('{http://www.w3.org/2005/Atom}author')]
-
-            articles.append({
-                "source": "arxiv",
-                "source_id": arxiv_id,
-                "title": title,
-                "abstract": summary,
-                "authors": [{"name": author} for author in authors]
-            })
-        return articles
+        async with get_client("arxiv").stream("GET", "query", params=params) as response:
+            async for element in iter_xml_elements(response, f'{ATOM}entry', f'{OPENSEARCH}totalResults'):
+                if element.tag == f'{OPENSEARCH}totalResults':
+                    total = int(element.text or 0)
+                else:
+                    articles.append(_parse_entry(element))
+
+        if not articles:
+            return
+        yield HarvestPage(articles=articles, start=start, next_start=start + len(articles), total=total)
+        start += len(articles)
+
+async def search_arxiv(query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+    """Search arXiv for a given query and return a list of articles."""
+    articles = []
+    async for page in harvest_arxiv(query, max_results):
+        articles.extend(page.articles)
+    return articles
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from scipaper.config import settings
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for one cache, as seen by this process."""
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hit_rate, 4)}
+
+
+class LatencyTracker:
+    """Keeps the most recent latencies and reports percentiles over them."""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+
+    def record(self, milliseconds: float):
+        self._samples.append(milliseconds)
+
+    def summary(self) -> dict:
+        if not self._samples:
+            return {"count": 0}
+        samples = sorted(self._samples)
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2)
+        return {"count": len(samples), "p50": percentile(0.5), "p95": percentile(0.95), "max": round(samples[-1], 2)}
+
+
+class CacheBackend(ABC):
+    """Async key/value cache for JSON-serializable values with per-entry TTL."""
+
+    def __init__(self, namespace: str, ttl: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[str]:
+        """Returns the raw value stored under `key`, or None when it is missing or expired."""
+
+    @abstractmethod
+    async def _set(self, key: str, value: str, ttl: int):
+        """Stores a raw value under `key` for `ttl` seconds."""
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._get(key)
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        await self._set(key, json.dumps(value), ttl or self.ttl)
+
+    def describe(self) -> dict:
+        return {"backend": type(self).__name__, "namespace": self.namespace, "ttl": self.ttl, **self.stats.as_dict()}
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache bounded by entry count, with TTL expiry."""
+
+    def __init__(self, namespace: str, ttl: int, max_entries: int):
+        super().__init__(namespace, ttl)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def _set(self, key: str, value: str, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def describe(self) -> dict:
+        return {**super().describe(), "entries": len(self._entries), "max_entries": self.max_entries}
+
+
+class RedisCache(CacheBackend):
+    """Cache shared between processes, stored in Redis under `scipaper:<namespace>:`."""
+
+    def __init__(self, namespace: str, ttl: int, url: str):
+        super().__init__(namespace, ttl)
+        self.url = url
+        self._client = None
+        self._loop = None
+
+    def _redis(self):
+        # redis.asyncio connections belong to the loop that opened them; Celery tasks run each
+        # job on a fresh loop, so reconnect whenever the loop changes.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url)
+            self._loop = loop
+        return self._client
+
+    def _key(self, key: str) -> str:
+        return f"scipaper:{self.namespace}:{key}"
+
+    async def _get(self, key: str) -> Optional[str]:
+        try:
+            return await self._redis().get(self._key(key))
+        except Exception as e:
+            logging.warning(f"Redis cache '{self.namespace}' read failed: {e}")
+            return None
+
+    async def _set(self, key: str, value: str, ttl: int):
+        try:
+            await self._redis().set(self._key(key), value, ex=ttl)
+        except Exception as e:
+            logging.warning(f"Redis cache '{self.namespace}' write failed: {e}")
+
+
+def build_cache(namespace: str, backend: str, ttl: int, max_entries: int) -> CacheBackend:
+    """Creates a cache from settings. Falls back to memory when Redis is not configured."""
+    if backend == "redis" and settings.redis_url:
+        return RedisCache(namespace, ttl, settings.redis_url)
+    if backend not in ("memory", "redis"):
+        raise ValueError(f"Unknown cache backend '{backend}'. Choose from 'memory' or 'redis'.")
+    return MemoryCache(namespace, ttl, max_entries)
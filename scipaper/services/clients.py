@@ -0,0 +1,100 @@
+import asyncio
+import importlib
+import inspect
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+from scipaper.config import settings
+
+
+@dataclass
+class ManagedClient:
+    """A network client owned by a service module, referred to by name so that the module (and
+    the driver package behind it) is only imported once the client is actually needed."""
+    module: str
+    close: str
+    get: Optional[str] = None
+    check: Optional[str] = None
+
+
+# Every pooled client the app creates. Each is built lazily by its module's getter, on the
+# running event loop.
+CLIENTS: Dict[str, ManagedClient] = {
+    "database": ManagedClient("scipaper.database", close="async_engine.dispose", check="check_async_engine"),
+    "elasticsearch": ManagedClient("scipaper.services.elasticsearch", close="close_clients", get="get_async_client", check="ping"),
+    "neo4j": ManagedClient("scipaper.services.neo4j", close="close_neo4j_service", get="get_neo4j_service", check="ping"),
+    "openai": ManagedClient("scipaper.services.openai_analyzer", close="close_client", get="get_client"),
+    "http": ManagedClient("scipaper.services.http_client", close="close_clients"),
+}
+
+
+def _resolve(module: Any, path: str):
+    target = module
+    for name in path.split("."):
+        target = getattr(target, name)
+    return target
+
+
+async def _call(module: Any, path: str):
+    result = _resolve(module, path)()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def _warm_up_one(name: str):
+    spec = CLIENTS[name]
+    start = time.perf_counter()
+    # Importing a driver package is blocking work; keep it off the event loop
+    module = await asyncio.to_thread(importlib.import_module, spec.module)
+    if spec.get:
+        _resolve(module, spec.get)()
+    if spec.check:
+        await asyncio.wait_for(_call(module, spec.check), settings.health_check_timeout)
+    logging.info(f"Warmed up {name} client in {int((time.perf_counter() - start) * 1000)}ms")
+
+
+async def warm_up(names: Optional[Iterable[str]] = None):
+    """Imports, creates and connects the given clients concurrently; failures are only logged so a
+    dependency that is down does not keep the app from starting."""
+    names = list(settings.client_warm_up if names is None else names)
+    results = await asyncio.gather(*(_warm_up_one(name) for name in names), return_exceptions=True)
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            logging.warning(f"Warm-up of {name} client failed: {result!r}")
+
+
+async def _check_one(name: str) -> dict:
+    spec = CLIENTS[name]
+    start = time.perf_counter()
+    try:
+        module = await asyncio.to_thread(importlib.import_module, spec.module)
+        await asyncio.wait_for(_call(module, spec.check), settings.health_check_timeout)
+        status = {"status": "ok"}
+    except Exception as e:
+        status = {"status": "error", "error": repr(e)}
+    return {**status, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+async def health() -> dict:
+    """Probes every client that has a health check, concurrently."""
+    names = [name for name, spec in CLIENTS.items() if spec.check]
+    checks = dict(zip(names, await asyncio.gather(*(_check_one(name) for name in names))))
+    healthy = all(check["status"] == "ok" for check in checks.values())
+    return {"status": "ok" if healthy else "degraded", "clients": checks}
+
+
+async def close_all():
+    """Drains and closes the pools of every client that was created. Modules that were never
+    imported have nothing to close and are not imported now."""
+    for name, spec in CLIENTS.items():
+        module = sys.modules.get(spec.module)
+        if module is None:
+            continue
+        try:
+            await _call(module, spec.close)
+        except Exception as e:
+            logging.warning(f"Closing {name} client failed: {e!r}")
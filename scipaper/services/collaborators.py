@@ -0,0 +1,63 @@
+import heapq
+import logging
+import time
+from collections import defaultdict
+from operator import itemgetter
+from typing import List
+
+from scipaper.config import settings
+from scipaper.services import neo4j
+from scipaper.services.cache import build_cache
+
+# Share of a seed's score kept by the seed itself; the rest spreads to its co-authors
+DAMPING = 0.85
+
+collaborator_cache = build_cache("collaborators", settings.collaborator_cache_backend, settings.collaborator_cache_ttl, 1024)
+
+
+def rank_collaborators(seeds: List[dict], edges: List[tuple], limit: int) -> List[dict]:
+    """Ranks the topic's authors and their co-authors by proximity to the topic.
+
+    Each seed starts with its share of the topic relevance and spreads DAMPING of it over its
+    co-authors in proportion to the edges' precomputed proximity (see
+    Neo4jService.score_collaborations), like one step of a personalized PageRank.
+    """
+    total = sum(seed["relevance"] for seed in seeds) or 1
+    shares = {seed["author"]: seed["relevance"] / total for seed in seeds}
+    # Edges between two seeds are returned once from each end
+    edges = {tuple(sorted(edge[:2])): float(edge[2] or 0) for edge in edges}
+    out_proximity = defaultdict(float)
+    for (a, b), proximity in edges.items():
+        out_proximity[a] += proximity
+        out_proximity[b] += proximity
+
+    scores = {author: (1 - DAMPING) * share for author, share in shares.items()}
+    for (a, b), proximity in edges.items():
+        for source, target in ((a, b), (b, a)):
+            if source in shares and out_proximity[source]:
+                spread = DAMPING * shares[source] * proximity / out_proximity[source]
+                scores[target] = scores.get(target, 0.0) + spread
+    papers = {seed["author"]: seed["papers"] for seed in seeds}
+    ranked = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+    return [{"author": author, "papers": papers.get(author, 0), "score": round(score, 6)} for author, score in ranked]
+
+
+async def suggest_collaborators(topic: str, limit: int = 10) -> List[dict]:
+    """Recommends authors to collaborate with on a topic, cached per topic.
+
+    Authors of the topic's papers are found through the Neo4j full-text index; they and their
+    co-authors are then ranked by the proximity scores precomputed on the co-authorship graph
+    by scripts/rebuild_coauthor_graph.py.
+    """
+    key = f"{' '.join(topic.lower().split())}:{limit}"
+    cached = await collaborator_cache.get(key)
+    if cached is not None:
+        return cached
+
+    start = time.perf_counter()
+    seeds, edges = await neo4j.get_neo4j_service().get_topic_graph(topic)
+    suggestions = rank_collaborators(seeds, edges, limit) if seeds else []
+    await collaborator_cache.set(key, suggestions)
+    logging.info(f"Ranked collaborators for '{topic}' over {len(seeds)} authors and {len(edges)} edges "
+                 f"in {int((time.perf_counter() - start) * 1000)}ms")
+    return suggestions
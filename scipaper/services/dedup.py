@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import re
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scipaper import crud_async
+from scipaper.config import settings
+
+ABSTRACT = "abstract"
+FULL_TEXT = "full_text"
+METHOD = "minhash-lsh"
+
+# Texts shorter than this many words give unreliable similarity estimates and are not indexed
+MIN_TOKENS = 20
+MAX_MATCHES = 20
+
+_TOKEN = re.compile(r"\w+")
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_SHINGLE_BASE = np.uint64(1_000_003)
+# Shingles hashed per block, bounding the (block x permutations) matrix to a few MB
+_BLOCK = 4096
+
+if settings.dedup_num_perm % settings.dedup_bands:
+    raise ValueError("dedup_num_perm must be a multiple of dedup_bands")
+ROWS_PER_BAND = settings.dedup_num_perm // settings.dedup_bands
+
+# Fixed seed: signatures computed in different processes must use the same permutations
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 32, size=settings.dedup_num_perm, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=settings.dedup_num_perm, dtype=np.uint64)
+
+
+def shingle_hashes(text: str, size: int = settings.dedup_shingle_size) -> np.ndarray:
+    """Distinct 32-bit hashes of every run of `size` consecutive words in the text."""
+    tokens = _TOKEN.findall((text or "").lower())
+    hashes = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint64, count=len(tokens))
+    if len(hashes) < size:
+        return np.unique(hashes)
+    # Polynomial hash of all windows at once (uint64 arithmetic wraps, which is intended)
+    windows = np.lib.stride_tricks.sliding_window_view(hashes, size)
+    powers = _SHINGLE_BASE ** np.arange(size - 1, -1, -1, dtype=np.uint64)
+    return np.unique((windows * powers).sum(axis=1) & _MAX_HASH)
+
+
+def minhash(shingles: np.ndarray) -> np.ndarray:
+    """MinHash signature of a shingle set under `dedup_num_perm` universal hash permutations."""
+    signature = np.full(settings.dedup_num_perm, _MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(shingles), _BLOCK):
+        block = shingles[start:start + _BLOCK, None]
+        hashed = ((block * _PERM_A + _PERM_B) % _MERSENNE_PRIME) & _MAX_HASH
+        np.minimum(signature, hashed.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def signature_for_text(text: str) -> Optional[np.ndarray]:
+    """Returns the text's signature, or None when it is too short to compare meaningfully."""
+    if len(_TOKEN.findall(text or "")) < MIN_TOKENS:
+        return None
+    return minhash(shingle_hashes(text))
+
+
+def band_keys(signature: np.ndarray) -> List[Tuple[int, int]]:
+    """(band, bucket) keys; two signatures share a key when one band of rows matches exactly."""
+    bands = signature.reshape(settings.dedup_bands, ROWS_PER_BAND)
+    return [
+        (band, int.from_bytes(hashlib.blake2b(rows.tobytes(), digest_size=8).digest(), "big", signed=True))
+        for band, rows in enumerate(bands)
+    ]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return float(np.mean(a == b))
+
+
+def signature_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint32)
+
+
+async def index_signatures(db: AsyncSession, kind: str, signatures: Dict[uuid.UUID, np.ndarray]):
+    """Adds or replaces papers in the persistent LSH index."""
+    bands = [(paper_id, band, bucket) for paper_id, signature in signatures.items() for band, bucket in band_keys(signature)]
+    await crud_async.replace_paper_signatures(
+        db, kind, {paper_id: signature.tobytes() for paper_id, signature in signatures.items()}, bands
+    )
+
+
+async def find_similar(db: AsyncSession, kind: str, signatures: Dict[uuid.UUID, np.ndarray],
+                       threshold: Optional[float] = None) -> Dict[uuid.UUID, List[Dict[str, Any]]]:
+    """Finds indexed papers similar to each signature at or above `threshold`, most similar first.
+
+    Candidates come from LSH bucket lookups on the (kind, band, bucket) primary key, so the
+    cost depends on the number of near matches, not on the size of the collection. Only the
+    candidates' signatures are compared.
+    """
+    threshold = settings.dedup_threshold if threshold is None else threshold
+    keys = {paper_id: band_keys(signature) for paper_id, signature in signatures.items()}
+    rows = await crud_async.get_lsh_candidates(db, kind, list({key for paper_keys in keys.values() for key in paper_keys}))
+    buckets: Dict[Tuple[int, int], set] = {}
+    for band, bucket, candidate_id in rows:
+        buckets.setdefault((band, bucket), set()).add(candidate_id)
+
+    candidates = {
+        paper_id: set().union(*(buckets.get(key, set()) for key in paper_keys)) - {paper_id}
+        for paper_id, paper_keys in keys.items()
+    }
+    stored = {
+        row.paper_id: row
+        for row in await crud_async.get_paper_signatures(db, kind, list(set().union(*candidates.values())))
+    }
+
+    results = {}
+    for paper_id, candidate_ids in candidates.items():
+        matches = []
+        for candidate_id in candidate_ids:
+            row = stored.get(candidate_id)
+            if row is None:
+                continue
+            score = similarity(signatures[paper_id], signature_from_bytes(row.signature))
+            if score >= threshold:
+                matches.append({"paper_id": str(candidate_id), "title": row.title, "source": row.source, "similarity": round(score, 4)})
+        results[paper_id] = sorted(matches, key=lambda match: -match["similarity"])[:MAX_MATCHES]
+    return results
+
+
+async def index_papers(db: AsyncSession, papers: List[Any]) -> Dict[uuid.UUID, Tuple[uuid.UUID, float]]:
+    """Indexes freshly ingested abstracts and flags papers that duplicate one from another source.
+
+    The chunk is indexed before it is queried, so duplicates within the chunk are caught too.
+    Returns {paper_id: (duplicate_of, similarity)} for the flagged papers.
+    """
+    signatures = {}
+    for paper in papers:
+        signature = signature_for_text(paper.abstract)
+        if signature is not None:
+            signatures[paper.id] = signature
+    if not signatures:
+        return {}
+    await index_signatures(db, ABSTRACT, signatures)
+
+    sources = {paper.id: paper.source for paper in papers}
+    duplicates = {}
+    for paper_id, matches in (await find_similar(db, ABSTRACT, signatures)).items():
+        cross_source = [match for match in matches if match["source"] != sources[paper_id]]
+        if cross_source:
+            best = cross_source[0]
+            duplicates[paper_id] = (uuid.UUID(best["paper_id"]), best["similarity"])
+    if duplicates:
+        await crud_async.flag_duplicates(db, ABSTRACT, duplicates)
+        for paper_id, (duplicate_of, score) in duplicates.items():
+            logging.info(f"Paper {paper_id} ({sources[paper_id]}) duplicates {duplicate_of} (similarity {score:.2f})")
+    return duplicates
+
+
+async def plagiarism_reports(db: AsyncSession, kind: str, texts: Dict[uuid.UUID, str]) -> Dict[uuid.UUID, dict]:
+    """Builds the `analyses.plagiarism` report for each paper's text, indexing the text as well."""
+    signatures, reports = {}, {}
+    for paper_id, text in texts.items():
+        signature = signature_for_text(text)
+        if signature is None:
+            reports[paper_id] = {"method": METHOD, "kind": kind, "checked": False, "reason": "text too short", "matches": []}
+        else:
+            signatures[paper_id] = signature
+    if signatures:
+        await index_signatures(db, kind, signatures)
+        for paper_id, matches in (await find_similar(db, kind, signatures)).items():
+            reports[paper_id] = {
+                "method": METHOD,
+                "kind": kind,
+                "checked": True,
+                "threshold": settings.dedup_threshold,
+                "max_similarity": matches[0]["similarity"] if matches else 0.0,
+                "matches": matches,
+            }
+    return reports
+
+
+async def plagiarism_report(db: AsyncSession, paper_id: uuid.UUID, text: str, kind: str = ABSTRACT) -> dict:
+    return (await plagiarism_reports(db, kind, {paper_id: text}))[paper_id]
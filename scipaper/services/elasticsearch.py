@@ -1,41 +1,288 @@
-from elasticsearch import Elasticsearch
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
 from scipaper.config import settings
+from scipaper.models import paper_key
 from scipaper.schemas import Paper
+from scipaper.services.cache import LatencyTracker, MemoryCache
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
 
+# Searches read through INDEX_NAME and writes go through WRITE_ALIAS. Both are aliases of the
+# current versioned index (scipaper-papers-v<N>), so a reindex can swap them without downtime.
 INDEX_NAME = "scipaper-papers"
+WRITE_ALIAS = "scipaper-papers-write"
+INDEX_TEMPLATE_NAME = "scipaper-papers"
+INDEX_VERSION = 3
 
-client = Elasticsearch(
-    hosts=[settings.elasticsearch_url],
-    api_key=settings.elasticsearch_api_key
-)
+# Boosted fields searched by free-text queries
+SEARCH_FIELDS = ["title^3", "title.scientific^2", "abstract", "abstract.scientific"]
+SEARCH_MODES = ("lexical", "semantic", "hybrid")
+# Rank constant of reciprocal-rank fusion; 60 is the value from the original RRF paper
+RRF_K = 60
+# Fields returned with each hit; the abstract is represented by its highlighted fragments
+SEARCH_SOURCE_FIELDS = ["paper_id", "title", "authors", "journal", "year", "doi", "url", "language"]
 
-def create_index_if_not_exists():
-    """Creates the 'scipaper-papers' index if it doesn't already exist."""
-    if not client.indices.exists(index=INDEX_NAME):
-        client.indices.create(
-            index=INDEX_NAME,
-            body={
-                "mappings": {
+search_cache = MemoryCache("search", settings.search_cache_ttl, settings.search_cache_max_entries)
+search_latency = LatencyTracker()
+
+# Clients are created on first use so that importing this module does not import (or connect)
+# the Elasticsearch driver
+_client = None
+_async_client = None
+_async_client_loop = None
+
+def get_client():
+    """Returns the synchronous client used for indexing and index management."""
+    global _client
+    if _client is None:
+        from elasticsearch import Elasticsearch
+        _client = Elasticsearch(
+            hosts=[settings.elasticsearch_url],
+            api_key=settings.elasticsearch_api_key
+        )
+    return _client
+
+def get_async_client():
+    """Returns the async client for the running event loop, creating it on first use."""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        from elasticsearch import AsyncElasticsearch
+        _async_client = AsyncElasticsearch(
+            hosts=[settings.elasticsearch_url],
+            api_key=settings.elasticsearch_api_key
+        )
+        _async_client_loop = loop
+    return _async_client
+
+async def close_async_client():
+    global _async_client, _async_client_loop
+    if _async_client is not None:
+        await _async_client.close()
+    _async_client, _async_client_loop = None, None
+
+async def close_clients():
+    """Closes the async client and the synchronous client's connection pool."""
+    global _client
+    await close_async_client()
+    if _client is not None:
+        _client.close()
+        _client = None
+
+async def ping():
+    if not await get_async_client().ping():
+        raise ConnectionError(f"Elasticsearch at {settings.elasticsearch_url} did not answer")
+
+def versioned_index(version: int) -> str:
+    return f"{INDEX_NAME}-v{version}"
+
+def _text_field() -> dict:
+    """Full-text field stemmed for English, with a subfield that keeps scientific tokens intact."""
+    return {
+        "type": "text",
+        "analyzer": "english_text",
+        "fields": {"scientific": {"type": "text", "analyzer": "scientific_text"}}
+    }
+
+def index_template() -> dict:
+    """Settings and mappings applied to every versioned papers index."""
+    return {
+        "settings": {
+            "number_of_shards": settings.es_number_of_shards,
+            "number_of_replicas": settings.es_number_of_replicas,
+            "refresh_interval": settings.es_refresh_interval,
+            "analysis": {
+                "filter": {
+                    "english_stop": {"type": "stop", "stopwords": "_english_"},
+                    "english_stemmer": {"type": "stemmer", "language": "english"},
+                    "english_possessive_stemmer": {"type": "stemmer", "language": "possessive_english"},
+                    # Keeps terms such as "IL-6", "COVID-19" or "Na+/K+" whole while also indexing their parts
+                    "scientific_word_delimiter": {
+                        "type": "word_delimiter_graph",
+                        "preserve_original": True,
+                        "split_on_numerics": False,
+                        "split_on_case_change": False
+                    }
+                },
+                "analyzer": {
+                    "english_text": {
+                        "type": "custom",
+                        "tokenizer": "standard",
+                        "filter": ["english_possessive_stemmer", "lowercase", "english_stop", "english_stemmer"]
+                    },
+                    "scientific_text": {
+                        "type": "custom",
+                        "tokenizer": "whitespace",
+                        "filter": ["scientific_word_delimiter", "flatten_graph", "lowercase", "asciifolding"]
+                    }
+                }
+            }
+        },
+        "mappings": {
+            "dynamic": "false",
+            "properties": {
+                "paper_id": {"type": "keyword"},
+                "title": _text_field(),
+                "abstract": _text_field(),
+                # A plain object (not nested): author matches are ordinary term/match queries
+                "authors": {
                     "properties": {
-                        "title": {"type": "text"},
-                        "abstract": {"type": "text"},
-                        "authors": {"type": "nested", "properties": {"name": {"type": "text"}}},
-                        "journal": {"type": "keyword"},
-                        "year": {"type": "integer"},
-                        "doi": {"type": "keyword"},
-                        "url": {"type": "keyword"},
-                        "language": {"type": "keyword"}
+                        "name": {"type": "text", "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}}
                     }
+                },
+                "journal": {"type": "keyword"},
+                "year": {"type": "integer"},
+                "doi": {"type": "keyword"},
+                "url": {"type": "keyword", "index": False},
+                "language": {"type": "keyword"},
+                "indexed_at": {"type": "date"},
+                # Unit-length paper embeddings, searched approximately through an HNSW graph
+                "embedding": {
+                    "type": "dense_vector",
+                    "dims": settings.embedding_dimensions,
+                    "index": True,
+                    "similarity": "dot_product"
                 }
             }
-        )
-        print(f"Index '{INDEX_NAME}' created.")
+        }
+    }
+
+def put_index_template():
+    """Installs (or updates) the template that versioned papers indices are created from."""
+    get_client().indices.put_index_template(
+        name=INDEX_TEMPLATE_NAME,
+        index_patterns=[f"{INDEX_NAME}-v*"],
+        template=index_template(),
+        meta={"version": INDEX_VERSION}
+    )
+
+def create_index_if_not_exists():
+    """Creates the current versioned index and its read and write aliases if there is no index yet.
+
+    An index created before aliases existed is left in place and given the write alias; run
+    scripts/reindex_elasticsearch.py to move it onto the template.
+    """
+    put_index_template()
+    if get_client().indices.exists_alias(name=INDEX_NAME):
+        print(f"Alias '{INDEX_NAME}' already exists.")
+    elif get_client().indices.exists(index=INDEX_NAME):
+        if not get_client().indices.exists_alias(name=WRITE_ALIAS):
+            get_client().indices.put_alias(index=INDEX_NAME, name=WRITE_ALIAS)
+        print(f"Legacy index '{INDEX_NAME}' found; reindex it to apply the index template.")
     else:
-        print(f"Index '{INDEX_NAME}' already exists.")
+        index = versioned_index(INDEX_VERSION)
+        get_client().indices.create(index=index, aliases={INDEX_NAME: {}, WRITE_ALIAS: {"is_write_index": True}})
+        print(f"Index '{index}' created with aliases '{INDEX_NAME}' and '{WRITE_ALIAS}'.")
 
-def index_paper(paper: Paper):
-    """Indexes a single paper document in Elasticsearch."""
-    doc = {
+_index_ready = False
+
+def _ensure_index():
+    global _index_ready
+    if not _index_ready:
+        create_index_if_not_exists()
+        _index_ready = True
+
+@contextmanager
+def bulk_load_settings(index: str = WRITE_ALIAS):
+    """Turns off refreshes and replicas on `index` for the duration of a bulk load.
+
+    Segments are then written once instead of every second, and documents are not copied to
+    replicas while loading; the normal settings are restored (and a refresh run) afterwards.
+    """
+    get_client().indices.put_settings(index=index, settings={"index": {"refresh_interval": "-1", "number_of_replicas": 0}})
+    try:
+        yield
+    finally:
+        get_client().indices.put_settings(index=index, settings={"index": {
+            "refresh_interval": settings.es_refresh_interval,
+            "number_of_replicas": settings.es_number_of_replicas
+        }})
+        get_client().indices.refresh(index=index)
+
+def _alias_indices(alias: str) -> list:
+    if not get_client().indices.exists_alias(name=alias):
+        return []
+    return list(get_client().indices.get_alias(name=alias).keys())
+
+def next_index_version() -> int:
+    """The version a reindex creates by default: one past the highest versioned index, whether it
+    is behind the aliases or was kept from an earlier reindex, and at least INDEX_VERSION."""
+    names = set(_alias_indices(INDEX_NAME)) | set(get_client().indices.get_alias(index=f"{INDEX_NAME}-v*"))
+    pattern = re.compile(rf"{re.escape(INDEX_NAME)}-v(\d+)")
+    versions = [int(match.group(1)) for match in map(pattern.fullmatch, names) if match]
+    return max(max(versions, default=0) + 1, INDEX_VERSION)
+
+def _wait_for_task(task_id: str, poll_interval: float) -> dict:
+    while True:
+        task = get_client().tasks.get(task_id=task_id)
+        status = task["task"]["status"]
+        if task.get("completed"):
+            if task.get("error") or task.get("response", {}).get("failures"):
+                raise RuntimeError(f"Reindex task {task_id} failed: {task.get('error') or task['response']['failures'][:5]}")
+            return task["response"]
+        print(f"Reindexed {status.get('created', 0)}/{status.get('total', 0)} documents...")
+        time.sleep(poll_interval)
+
+def reindex(version: int, delete_old: bool = False, poll_interval: float = 5.0) -> str:
+    """Copies the live index into a new versioned index and atomically repoints the aliases to it.
+
+    The write alias moves to the new index first, so papers ingested during the copy land there
+    and are not overwritten by their older copies. Searches keep reading the old index until
+    the copy is complete. Returns the name of the new index.
+    """
+    new_index = versioned_index(version)
+    if get_client().indices.exists(index=new_index):
+        raise ValueError(f"Index '{new_index}' already exists")
+    put_index_template()
+
+    old_indices = _alias_indices(INDEX_NAME)
+    legacy = not old_indices and get_client().indices.exists(index=INDEX_NAME)
+    if legacy:
+        # A concrete index holds the alias name and has to be dropped in the same swap
+        old_indices = [INDEX_NAME]
+        delete_old = True
+    old_write_indices = _alias_indices(WRITE_ALIAS)
+
+    get_client().indices.create(index=new_index)
+    get_client().indices.update_aliases(actions=[
+        *({"remove": {"index": index, "alias": WRITE_ALIAS}} for index in old_write_indices),
+        {"add": {"index": new_index, "alias": WRITE_ALIAS, "is_write_index": True}},
+    ])
+    try:
+        if old_indices:
+            with bulk_load_settings(new_index):
+                task = get_client().reindex(
+                    source={"index": INDEX_NAME},
+                    dest={"index": new_index, "op_type": "create"},
+                    conflicts="proceed",
+                    slices="auto",
+                    wait_for_completion=False,
+                )
+                response = _wait_for_task(task["task"], poll_interval)
+            print(f"Copied {response.get('created', 0)} documents into '{new_index}' in {response.get('took', 0)}ms.")
+    except BaseException:
+        get_client().indices.update_aliases(actions=[
+            {"remove": {"index": new_index, "alias": WRITE_ALIAS}},
+            *({"add": {"index": index, "alias": WRITE_ALIAS}} for index in old_write_indices),
+        ])
+        get_client().indices.delete(index=new_index)
+        raise
+
+    remove_old = ({"remove_index": {"index": index}} if delete_old else {"remove": {"index": index, "alias": INDEX_NAME}}
+                  for index in old_indices)
+    get_client().indices.update_aliases(actions=[*remove_old, {"add": {"index": new_index, "alias": INDEX_NAME}}])
+    print(f"Alias '{INDEX_NAME}' now points to '{new_index}'.")
+    return new_index
+
+def _paper_document(paper: Paper, vector=None) -> dict:
+    """Builds the Elasticsearch document body for a paper."""
+    document = {
+        "paper_id": str(paper.id),
         "title": paper.title,
         "abstract": paper.abstract,
         "authors": paper.authors,
@@ -43,21 +290,241 @@ def index_paper(paper: Paper):
         "year": paper.year,
         "doi": paper.doi,
         "url": paper.url,
-        "language": paper.language
+        "language": paper.language,
+        "indexed_at": datetime.now(timezone.utc).isoformat()
     }
-    client.index(index=INDEX_NAME, id=str(paper.id), document=doc)
+    if vector is not None:
+        document["embedding"] = vector.tolist()
+    return document
+
+def document_id(paper: Paper) -> str:
+    """Deterministic document _id derived from the paper's natural key, so re-ingests overwrite."""
+    return paper_key(paper.source, paper.source_id)
+
+def index_paper(paper: Paper):
+    """Indexes a single paper document in Elasticsearch."""
+    _ensure_index()
+    get_client().index(index=WRITE_ALIAS, id=document_id(paper), document=_paper_document(paper))
+
+def bulk_index_papers(papers: Iterable[Paper], vectors: Optional[dict] = None, chunk_size: int = 500):
+    """Indexes many papers through the streaming bulk API and returns (indexed, errors).
+
+    `vectors` maps paper ids to embeddings stored in the documents for kNN search.
+    """
+    from elasticsearch import helpers
+    from scipaper.services import vector_index
+    _ensure_index()
+    if settings.vector_index_backend != vector_index.ELASTICSEARCH:
+        vectors = None
+    actions = (
+        {"_index": WRITE_ALIAS, "_id": document_id(paper), "_source": _paper_document(paper, (vectors or {}).get(paper.id))}
+        for paper in papers
+    )
+    indexed, errors = 0, []
+    for ok, item in helpers.streaming_bulk(get_client(), actions, chunk_size=chunk_size, raise_on_error=False):
+        if ok:
+            indexed += 1
+        else:
+            errors.append(item)
+    return indexed, errors
+
+def _encode_cursor(sort_values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(sort_values).encode()).decode()
 
-def search_papers(query: str):
-    """Searches for papers in Elasticsearch."""
-    response = client.search(
+def _decode_cursor(cursor: str, *types: type) -> list:
+    """The values of a cursor, which must be a list with one value of each of `types`."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid search cursor")
+    if (not isinstance(values, list) or len(values) != len(types)
+            or not all(isinstance(value, kind) and not isinstance(value, bool) for value, kind in zip(values, types))):
+        raise ValueError("Invalid search cursor")
+    return values
+
+def _search_filters(year: Optional[int], year_from: Optional[int], year_to: Optional[int], journal: Optional[str],
+                    language: Optional[str], author: Optional[str]) -> list:
+    # Filters go in the non-scoring filter context so Elasticsearch can cache them
+    filters = []
+    if year is not None:
+        filters.append({"term": {"year": year}})
+    if year_from is not None or year_to is not None:
+        filters.append({"range": {"year": {k: v for k, v in (("gte", year_from), ("lte", year_to)) if v is not None}}})
+    if journal:
+        filters.append({"term": {"journal": journal}})
+    if language:
+        filters.append({"term": {"language": language}})
+    if author:
+        filters.append({"term": {"authors.name.keyword": author}})
+    return filters
+
+def _search_body(query: str, size: int, cursor: Optional[str], filters: list) -> dict:
+    body = {
+        "size": size,
+        "_source": SEARCH_SOURCE_FIELDS,
+        "track_total_hits": True,
+        "query": {
+            "bool": {
+                "must": {
+                    "multi_match": {
+                        "query": query,
+                        "fields": SEARCH_FIELDS
+                    }
+                },
+                "filter": filters
+            }
+        },
+        # paper_id breaks score ties so search_after pages are stable
+        "sort": [{"_score": "desc"}, {"paper_id": "asc"}],
+        "highlight": {
+            "fields": {
+                "title": {"number_of_fragments": 0},
+                "abstract": {"fragment_size": 160, "number_of_fragments": 3}
+            }
+        }
+    }
+    if cursor:
+        # The sort values of the last hit: its score and paper_id
+        body["search_after"] = _decode_cursor(cursor, (int, float), str)
+    return body
+
+def _hit_result(hit: dict, score: Optional[float]) -> dict:
+    return {
+        "id": hit["_source"].get("paper_id"),
+        "score": score,
+        **{field: hit["_source"].get(field) for field in SEARCH_SOURCE_FIELDS if field != "paper_id"},
+        "highlight": hit.get("highlight", {}),
+    }
+
+async def _lexical_page(body: dict, size: int) -> dict:
+    response = await get_async_client().search(index=INDEX_NAME, body=body)
+    hits = response["hits"]["hits"]
+    return {
+        "hits": [_hit_result(hit, hit.get("_score")) for hit in hits],
+        "total": response["hits"]["total"]["value"],
+        "next_cursor": _encode_cursor(hits[-1]["sort"]) if len(hits) == size else None,
+    }
+
+async def _vector_ranking(query: str, filters: list, window: int) -> list:
+    """The `window` papers nearest to the query embedding that pass the filters, nearest first."""
+    from scipaper.services import embeddings, vector_index
+    query_vector = (await embeddings.embed_texts([query]))[0]
+    es = get_async_client()
+    if settings.vector_index_backend == vector_index.LOCAL:
+        # Over-fetch from the local index, then let Elasticsearch apply the filters
+        matches = await asyncio.to_thread(vector_index.get_local_index().search, query_vector, window * 4)
+        if not matches:
+            return []
+        response = await es.search(index=INDEX_NAME, body={
+            "size": len(matches),
+            "_source": SEARCH_SOURCE_FIELDS,
+            "query": {"bool": {"filter": [{"terms": {"paper_id": [paper_id for paper_id, _ in matches]}}, *filters]}}
+        })
+        hits = {hit["_source"]["paper_id"]: hit for hit in response["hits"]["hits"]}
+        return [{**hits[paper_id], "_score": score} for paper_id, score in matches if paper_id in hits][:window]
+
+    response = await es.search(index=INDEX_NAME, body={
+        "size": window,
+        "_source": SEARCH_SOURCE_FIELDS,
+        "knn": {
+            "field": "embedding",
+            "query_vector": query_vector.tolist(),
+            "k": window,
+            "num_candidates": min(10000, window * 4),
+            "filter": filters
+        }
+    })
+    return response["hits"]["hits"]
+
+def reciprocal_rank_fusion(rankings: List[list], k: int = RRF_K) -> List[Tuple[dict, float]]:
+    """Merges ranked hit lists by summing 1 / (k + rank) per paper; scores need not be comparable."""
+    scores, hits = {}, {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            paper_id = hit["_source"]["paper_id"]
+            scores[paper_id] = scores.get(paper_id, 0.0) + 1.0 / (k + rank)
+            # Keep the first copy seen (the lexical one, which carries highlights)
+            hits.setdefault(paper_id, hit)
+    ordered = sorted(scores, key=lambda paper_id: (-scores[paper_id], paper_id))
+    return [(hits[paper_id], scores[paper_id]) for paper_id in ordered]
+
+async def _fused_page(query: str, filters: list, mode: str, size: int, offset: int) -> dict:
+    window = max(settings.hybrid_rank_window, size)
+    if mode == "semantic":
+        ranked = [(hit, hit.get("_score")) for hit in await _vector_ranking(query, filters, window)]
+    else:
+        lexical, semantic = await asyncio.gather(
+            get_async_client().search(index=INDEX_NAME, body=_search_body(query, window, None, filters)),
+            _vector_ranking(query, filters, window),
+        )
+        ranked = reciprocal_rank_fusion([lexical["hits"]["hits"], semantic])
+    page = ranked[offset:offset + size]
+    return {
+        "hits": [_hit_result(hit, round(score, 6) if score is not None else None) for hit, score in page],
+        "total": len(ranked),
+        "next_cursor": _encode_cursor([offset + size]) if offset + size < len(ranked) else None,
+    }
+
+def _decode_offset(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    offset, = _decode_cursor(cursor, int)
+    if offset < 0:
+        raise ValueError("Invalid search cursor")
+    return offset
+
+async def search_papers(query: str, size: int = 20, cursor: Optional[str] = None, year: Optional[int] = None,
+                        year_from: Optional[int] = None, year_to: Optional[int] = None,
+                        journal: Optional[str] = None, language: Optional[str] = None,
+                        author: Optional[str] = None, mode: str = "lexical") -> dict:
+    """Searches for papers in Elasticsearch, one page at a time.
+
+    `mode` is "lexical" (BM25), "semantic" (nearest embeddings) or "hybrid", which fuses the
+    top `hybrid_rank_window` results of both with reciprocal-rank fusion. Pass the returned
+    `next_cursor` back as `cursor` to get the following page. Identical requests within the
+    cache TTL are answered from the query-result cache.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}'. Choose from {', '.join(SEARCH_MODES)}.")
+    start = time.perf_counter()
+    filters = _search_filters(year, year_from, year_to, journal, language, author)
+    if mode == "lexical":
+        body = _search_body(query, size, cursor, filters)
+    else:
+        offset = _decode_offset(cursor)
+        body = {"mode": mode, "query": query, "filters": filters, "size": size, "offset": offset}
+    key = hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+    result = await search_cache.get(key)
+    cached = result is not None
+    if not cached:
+        if mode == "lexical":
+            result = await _lexical_page(body, size)
+        else:
+            result = await _fused_page(query, filters, mode, size, offset)
+        await search_cache.set(key, result)
+
+    took_ms = (time.perf_counter() - start) * 1000
+    search_latency.record(took_ms)
+    return {**result, "took_ms": round(took_ms, 2), "cached": cached}
+
+async def search_paper_ids(query: str, limit: int = 100):
+    """Returns the database ids of the papers that best match a query."""
+    response = await get_async_client().search(
         index=INDEX_NAME,
         body={
+            "size": limit,
+            "_source": ["paper_id"],
             "query": {
                 "multi_match": {
                     "query": query,
-                    "fields": ["title", "abstract"]
+                    "fields": SEARCH_FIELDS
                 }
             }
         }
     )
-    return [hit["_source"] for hit in response["hits"]["hits"]]
+    return [hit["_source"]["paper_id"] for hit in response["hits"]["hits"] if hit["_source"].get("paper_id")]
+
+def search_stats() -> dict:
+    """Latency percentiles and cache hit rate of recent searches."""
+    return {"latency_ms": search_latency.summary(), "cache": search_cache.describe()}
@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+from typing import Any, Dict, List
+
+import numpy as np
+
+from scipaper import crud_async
+from scipaper.config import settings
+from scipaper.database import AsyncSessionLocal
+
+OPENAI = "openai"
+HASHING = "hashing"
+
+
+def model_name() -> str:
+    """Identifies the embedding space; embeddings from different models are never mixed."""
+    model = settings.embedding_model if settings.embedding_backend == OPENAI else HASHING
+    return f"{model}@{settings.embedding_dimensions}"
+
+
+def paper_text(paper: Any) -> str:
+    return "\n\n".join(part for part in (paper.title, paper.abstract) if part)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(f"{model_name()}\n{text}".encode("utf-8")).hexdigest()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scales rows to unit length so a dot product is the cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.float32)
+
+
+async def _embed_openai(texts: List[str]) -> np.ndarray:
+    from scipaper.services.openai_analyzer import get_client
+    response = await get_client().embeddings.create(
+        model=settings.embedding_model,
+        input=texts,
+        dimensions=settings.embedding_dimensions,
+    )
+    return np.array([item.embedding for item in sorted(response.data, key=lambda item: item.index)])
+
+
+_vectorizer = None
+
+
+def _embed_hashing(texts: List[str]) -> np.ndarray:
+    """Hashed word and bigram counts: deterministic and offline, for development and tests."""
+    global _vectorizer
+    if _vectorizer is None:
+        from sklearn.feature_extraction.text import HashingVectorizer
+        _vectorizer = HashingVectorizer(
+            n_features=settings.embedding_dimensions,
+            ngram_range=(1, 2),
+            stop_words="english",
+            alternate_sign=False,
+            norm=None,
+        )
+    return _vectorizer.transform(texts).toarray()
+
+
+async def embed_texts(texts: List[str]) -> np.ndarray:
+    """Embeds texts in batches of `embedding_batch_size` and returns unit-length float32 rows."""
+    batches = []
+    for start in range(0, len(texts), settings.embedding_batch_size):
+        batch = texts[start:start + settings.embedding_batch_size]
+        if settings.embedding_backend == OPENAI:
+            batches.append(await _embed_openai(batch))
+        elif settings.embedding_backend == HASHING:
+            batches.append(await asyncio.to_thread(_embed_hashing, batch))
+        else:
+            raise ValueError(f"Unknown embedding backend '{settings.embedding_backend}'. Choose from '{OPENAI}' or '{HASHING}'.")
+    if not batches:
+        return np.empty((0, settings.embedding_dimensions), dtype=np.float32)
+    return _normalize(np.vstack(batches))
+
+
+async def embed_papers(papers: List[Any]) -> Dict[uuid.UUID, np.ndarray]:
+    """Returns an embedding for every paper with a title or abstract.
+
+    Embeddings are stored per paper with a hash of the embedded text and model, so only papers
+    that are new, changed, or were embedded by another model reach the embedding API. Uses its
+    own session so it can overlap with other work on the caller's.
+    """
+    texts = {paper.id: paper_text(paper) for paper in papers}
+    texts = {paper_id: text for paper_id, text in texts.items() if text.strip()}
+    hashes = {paper_id: content_hash(text) for paper_id, text in texts.items()}
+    if not texts:
+        return {}
+
+    async with AsyncSessionLocal() as session:
+        stored = await crud_async.get_paper_embeddings(session, list(texts))
+        vectors = {row.paper_id: from_bytes(row.vector) for row in stored if row.content_hash == hashes.get(row.paper_id)}
+        missing = [paper_id for paper_id in texts if paper_id not in vectors]
+        if missing:
+            computed = await embed_texts([texts[paper_id] for paper_id in missing])
+            vectors.update(zip(missing, computed))
+            await crud_async.upsert_paper_embeddings(session, [
+                {"paper_id": paper_id, "model": model_name(), "content_hash": hashes[paper_id], "vector": to_bytes(vectors[paper_id])}
+                for paper_id in missing
+            ])
+        logging.info(f"Embeddings: {len(texts) - len(missing)} reused, {len(missing)} computed")
+    return vectors
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scipaper import crud_async
+from scipaper.config import settings
+from scipaper.services.trends import NGRAM_RANGE, SCIENTIFIC_STOP_WORDS, TOKEN_PATTERN, paper_text
+
+MAX_FUNDING_CALLS = 10
+# Trending terms listed with each of a domain's funding calls
+MAX_MATCHED_TERMS = 5
+
+
+def method_name() -> str:
+    """Identifies the vector space; stored matches are only extended while it stays the same."""
+    return f"hashing@{settings.grant_match_features}"
+
+
+def grant_text(grant: Any) -> str:
+    return "\n".join([grant.title or "", *(grant.tags or [])])
+
+
+def _vectorizer(**options):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(n_features=settings.grant_match_features, alternate_sign=False, binary=True, **options)
+
+
+def _whole_term(term: str) -> List[str]:
+    return [term]
+
+
+def vectorize(texts: Sequence[str]):
+    """Unit-length binary word and bigram vectors, as a sparse (text x feature) matrix.
+
+    Hashing needs no fitted vocabulary, so vectors computed in different runs share one space
+    and stored scores stay comparable as papers and grants arrive. The tokens match the trend
+    engine's, so its terms hash to the same features.
+    """
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+    vectorizer = _vectorizer(
+        ngram_range=NGRAM_RANGE,
+        token_pattern=TOKEN_PATTERN,
+        stop_words=sorted(ENGLISH_STOP_WORDS | SCIENTIFIC_STOP_WORDS),
+    )
+    return vectorizer.transform(texts)
+
+
+def _term_vectorizer():
+    # The tokenizer options do not apply to whole terms, and sklearn warns when they are set
+    return _vectorizer(analyzer=_whole_term, norm=None)
+
+
+def vectorize_terms(terms: Sequence[str]):
+    """Hashes each already-tokenized trend term to the feature the same word or bigram gets in vectorize()."""
+    return _term_vectorizer().transform(terms)
+
+
+def top_matches(rows: np.ndarray, cols: np.ndarray, scores: np.ndarray, k: int):
+    """Keeps the `k` best-scoring (row, col) pairs of each row, best first, without a loop over rows."""
+    order = np.lexsort((-scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < k
+    return rows[keep], cols[keep], scores[keep]
+
+
+def score_papers(papers: Sequence[Any], grant_matrix, grant_ids: np.ndarray):
+    """Scores a batch of papers against grants with one sparse product.
+
+    Returns (paper index, grant id, score) arrays of the matches at or above `grant_match_min_score`.
+    """
+    if not len(papers) or not grant_matrix.shape[0]:
+        return np.empty(0, dtype=int), np.empty(0, dtype=object), np.empty(0)
+    scores = (vectorize([paper_text(paper) for paper in papers]) @ grant_matrix.T).tocoo()
+    good = scores.data >= settings.grant_match_min_score
+    return scores.row[good], grant_ids[scores.col[good]], scores.data[good]
+
+
+def _match_rows(papers: Sequence[Any], rows: np.ndarray, grant_ids: np.ndarray, scores: np.ndarray) -> List[dict]:
+    rows, grant_ids, scores = top_matches(rows, grant_ids, scores, settings.grant_match_top_k)
+    return [
+        {"paper_id": papers[row].id, "grant_id": grant_id, "score": round(float(score), 6)}
+        for row, grant_id, score in zip(rows, grant_ids, scores)
+    ]
+
+
+def match_domain(grants: Sequence[Any], terms: Sequence[str], profile: np.ndarray) -> dict:
+    """Ranks open grant calls by the cosine similarity of their vector to the domain's term profile.
+
+    Each term of the profile is hashed to its own feature, so the domain vector lives in the
+    grants' space. Each call lists the trending terms that contribute most to its score.
+    """
+    if not grants or not len(terms) or not profile.any():
+        return {"open_calls": 0, "calls": []}
+    from scipy.sparse import diags
+
+    grant_matrix = vectorize([grant_text(grant) for grant in grants])
+    weighted_terms = diags(profile) @ vectorize_terms(terms)
+    domain = np.asarray(weighted_terms.sum(axis=0)).ravel()
+    scores = grant_matrix @ (domain / np.linalg.norm(domain))
+    matching = np.flatnonzero(scores > 0)
+    best = matching[np.argsort(-scores[matching], kind="stable")][:MAX_FUNDING_CALLS]
+    contributions = (grant_matrix[best] @ weighted_terms.T).toarray()
+    calls = []
+    for grant_index, contribution in zip(best, contributions):
+        grant = grants[grant_index]
+        strongest = [i for i in np.argsort(-contribution)[:MAX_MATCHED_TERMS] if contribution[i] > 0]
+        calls.append({
+            "grant_id": str(grant.id), "title": grant.title, "agency": grant.agency, "url": grant.url,
+            "deadline": grant.deadline.isoformat() if grant.deadline else None,
+            "score": round(float(scores[grant_index]), 6), "matched_terms": [terms[i] for i in strongest],
+        })
+    return {"open_calls": len(matching), "calls": calls}
+
+
+@dataclass
+class GrantMatchResult:
+    """Papers and grants matched by one run of the grant matcher."""
+    method: str
+    new_papers: int = 0
+    changed_grants: int = 0
+    rescored_papers: int = 0
+    matches: int = 0
+    duration_ms: int = 0
+
+
+async def _rescore_changed_grants(db: AsyncSession, result: GrantMatchResult, grant_matrix, grant_ids: np.ndarray,
+                                  changed: set, through):
+    """Scores papers matched in earlier runs against new and changed calls, merging the scores into
+    their stored top matches. Stored scores of a changed call are dropped, as its text may differ."""
+    columns = np.flatnonzero([grant_id in changed for grant_id in grant_ids])
+    changed_matrix, changed_ids = grant_matrix[columns], grant_ids[columns]
+    after = None
+    while True:
+        papers = await crud_async.get_matching_papers(db, after, settings.grant_match_batch_size, through=through)
+        if not papers:
+            return
+        after = (papers[-1].created_at, papers[-1].id)
+        rows, matched_ids, scores = await asyncio.to_thread(score_papers, papers, changed_matrix, changed_ids)
+        stored = await crud_async.get_grant_matches_for_papers(db, [paper.id for paper in papers])
+        positions = {paper.id: i for i, paper in enumerate(papers)}
+        touched = set(rows.tolist()) | {positions[row.paper_id] for row in stored if row.grant_id in changed}
+        if not touched:
+            continue
+        kept = [row for row in stored if row.grant_id not in changed]
+        rows = np.concatenate([rows, np.array([positions[row.paper_id] for row in kept], dtype=int)])
+        matched_ids = np.concatenate([matched_ids, np.array([row.grant_id for row in kept], dtype=object)])
+        scores = np.concatenate([scores, np.array([row.score for row in kept], dtype=float)])
+        touched_ids = [papers[i].id for i in sorted(touched)]
+        matches = [match for match in _match_rows(papers, rows, matched_ids, scores) if positions[match["paper_id"]] in touched]
+        await crud_async.replace_paper_grant_matches(db, result.method, touched_ids, matches)
+        result.rescored_papers += len(touched_ids)
+
+
+async def _rescore_closed_grants(db: AsyncSession, result: GrantMatchResult, grant_matrix, grant_ids: np.ndarray, today: date):
+    """Scores papers whose stored matches include calls that have since closed against every open call,
+    so they keep `grant_match_top_k` open matches instead of fewer as deadlines pass."""
+    while True:
+        paper_ids = await crud_async.get_papers_matched_to_closed_grants(db, today, settings.grant_match_batch_size)
+        if not paper_ids:
+            return
+        papers = await crud_async.get_papers_by_ids(db, paper_ids)
+        matches = _match_rows(papers, *await asyncio.to_thread(score_papers, papers, grant_matrix, grant_ids))
+        # Replacing a paper's matches drops its closed ones, so the next query moves past it
+        await crud_async.replace_paper_grant_matches(db, result.method, list(paper_ids), matches)
+        result.rescored_papers += len(paper_ids)
+
+
+async def update_grant_matches(db: AsyncSession, rebuild: bool = False,
+                               on_batch: Optional[Callable[[GrantMatchResult], Awaitable[Any]]] = None) -> GrantMatchResult:
+    """Brings `paper_grant_matches` up to date with the papers and grants added since the last run.
+
+    New and changed calls are scored against the papers matched before, and papers matched to
+    calls that have since closed are scored again against every open call; then papers ingested
+    since the last run are scored against every open call, batch by batch, each batch committed
+    with the matcher's (created_at, id) watermark so an interrupted run resumes where it stopped.
+    Each paper keeps its `grant_match_top_k` best calls. A paper whose text changes keeps its
+    old matches until a rebuild, which matches every paper again.
+    """
+    start = time.perf_counter()
+    method = method_name()
+    result = GrantMatchResult(method=method)
+    if rebuild:
+        await crud_async.reset_grant_matcher(db, method)
+    matcher = await crud_async.get_or_create_grant_matcher(db, method)
+    paper_watermark = (matcher.last_paper_created_at, matcher.last_paper_id)
+    grant_watermark = (matcher.last_grant_updated_at, matcher.last_grant_id)
+    until = datetime.now(timezone.utc) - timedelta(seconds=settings.grant_match_lag_seconds)
+
+    today = date.today()
+    grants = await crud_async.get_open_grants(db, today)
+    grant_ids = np.array([grant.id for grant in grants], dtype=object)
+    grant_matrix = await asyncio.to_thread(vectorize, [grant_text(grant) for grant in grants])
+
+    # 1. Score the papers matched before against new and changed calls
+    changed = await crud_async.get_changed_grants(db, grant_watermark if grant_watermark[1] is not None else None, until)
+    if changed:
+        result.changed_grants = len(changed)
+        if paper_watermark[1] is not None:
+            await _rescore_changed_grants(db, result, grant_matrix, grant_ids, {row.id for row in changed}, paper_watermark)
+        through = (changed[-1].updated_at, changed[-1].id)
+        if not await crud_async.advance_grant_matcher(db, method, grant_watermark, through):
+            raise RuntimeError("Grant matches are being updated by another run.")
+
+    # 2. Refill the matches of papers that lost calls whose deadline has passed
+    if paper_watermark[1] is not None:
+        await _rescore_closed_grants(db, result, grant_matrix, grant_ids, today)
+
+    # 3. Score new papers against every open call
+    while True:
+        after = paper_watermark if paper_watermark[1] is not None else None
+        papers = await crud_async.get_matching_papers(db, after, settings.grant_match_batch_size, until=until)
+        if not papers:
+            break
+        matches = _match_rows(papers, *await asyncio.to_thread(score_papers, papers, grant_matrix, grant_ids))
+        through = (papers[-1].created_at, papers[-1].id)
+        if not await crud_async.replace_paper_grant_matches(db, method, [paper.id for paper in papers], matches, paper_watermark, through):
+            raise RuntimeError("Grant matches are being updated by another run.")
+        paper_watermark = through
+        result.new_papers += len(papers)
+        result.matches += len(matches)
+        if on_batch is not None:
+            await on_batch(result)
+
+    result.duration_ms = int((time.perf_counter() - start) * 1000)
+    logging.info(f"Matched {result.new_papers} new papers against {len(grants)} open grant calls in {result.duration_ms}ms "
+                 f"({result.changed_grants} new or changed calls, {result.rescored_papers} papers rescored)")
+    return result
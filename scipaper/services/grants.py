@@ -0,0 +1,166 @@
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import re
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scipaper import crud_async, schemas
+from scipaper.config import settings
+
+# Field names used by common grant feeds (grants.gov, NIH, CORDIS exports) for each column; first match wins
+FIELD_ALIASES = {
+    "call_id": ("call_id", "id", "opportunity_number", "opportunity_id", "identifier"),
+    "title": ("title", "opportunity_title", "name"),
+    "deadline": ("deadline", "close_date", "closing_date", "due_date"),
+    "url": ("url", "link"),
+    "agency": ("agency", "agency_name", "funder"),
+    "tags": ("tags", "keywords", "categories"),
+}
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%B %d, %Y", "%b %d, %Y", "%d %B %Y", "%d %b %Y")
+_TAG_SEPARATORS = re.compile(r"[,;|]")
+
+
+@dataclass
+class GrantHarvestResult:
+    """Grant calls read from a source, and how many were inserted or changed."""
+    source: str
+    fetched: int = 0
+    upserted: int = 0
+    skipped: int = 0
+    duration_ms: int = 0
+
+
+class GrantSource(ABC):
+    """A feed of grant calls. `name` is stored in grants.source and, with the call id, identifies a call."""
+    name: str
+
+    @abstractmethod
+    def batches(self, size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yields raw call records, `size` at a time."""
+
+
+class LocalFeedSource(GrantSource):
+    """A JSON, JSON Lines or CSV file under `grant_feed_dir`, for offline use and bulk imports.
+
+    CSV and JSON Lines files are read incrementally; a JSON file (a list, or an object with a
+    "grants", "data" or "results" list) is loaded whole, so prefer JSON Lines for large feeds.
+    """
+
+    def __init__(self, path: str, name: Optional[str] = None, root: Optional[str] = None):
+        root = Path(root or settings.grant_feed_dir).resolve()
+        self.path = (root / path).resolve()
+        if root not in self.path.parents:
+            raise ValueError(f"Grant feed '{path}' is outside the feed directory.")
+        if self.path.suffix.lower() not in (".csv", ".json", ".jsonl", ".ndjson"):
+            raise ValueError("Grant feeds must be .csv, .json, .jsonl or .ndjson files.")
+        self.name = name or self.path.stem
+
+    def _records(self) -> Iterator[Dict[str, Any]]:
+        suffix = self.path.suffix.lower()
+        with open(self.path, encoding="utf-8-sig", newline="") as handle:
+            if suffix == ".csv":
+                yield from csv.DictReader(handle)
+            elif suffix in (".jsonl", ".ndjson"):
+                yield from (json.loads(line) for line in handle if line.strip())
+            else:
+                data = json.load(handle)
+                if isinstance(data, dict):
+                    data = next((data[key] for key in ("grants", "data", "results") if isinstance(data.get(key), list)), [])
+                yield from data
+
+    async def batches(self, size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        if not self.path.is_file():
+            raise FileNotFoundError(f"Grant feed '{self.path.name}' not found.")
+        records = self._records()
+        while True:
+            # File reads and parsing are blocking; keep them off the event loop
+            batch = await asyncio.to_thread(lambda: list(itertools.islice(records, size)))
+            if not batch:
+                return
+            yield batch
+
+
+GRANT_SOURCES = {
+    "local": LocalFeedSource,
+}
+
+
+def get_grant_source(kind: str, **options) -> GrantSource:
+    if kind not in GRANT_SOURCES:
+        raise ValueError(f"Unknown grant source '{kind}'. Choose from {', '.join(GRANT_SOURCES)}.")
+    return GRANT_SOURCES[kind](**options)
+
+
+def _field(record: Dict[str, Any], name: str) -> Any:
+    lowered = {str(key).strip().lower(): value for key, value in record.items()}
+    return next((lowered[alias] for alias in FIELD_ALIASES[name] if lowered.get(alias) not in (None, "")), None)
+
+
+def parse_deadline(value: Any) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value.date() if isinstance(value, datetime) else value
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_tags(value: Any) -> List[str]:
+    """Lower-cased, de-duplicated tags from a list or a comma/semicolon/pipe-separated string."""
+    values = value if isinstance(value, list) else _TAG_SEPARATORS.split(str(value or ""))
+    return list(dict.fromkeys(tag for tag in (" ".join(str(tag).lower().split()) for tag in values) if tag))
+
+
+def normalize_grant(record: Dict[str, Any], source: str) -> Optional[schemas.GrantCreate]:
+    """Turns a raw feed record into a GrantCreate schema, or None when it has no call id or title."""
+    call_id, title = _field(record, "call_id"), _field(record, "title")
+    if call_id is None or title is None:
+        return None
+    raw_deadline = _field(record, "deadline")
+    deadline = parse_deadline(raw_deadline)
+    if raw_deadline is not None and deadline is None:
+        logging.warning(f"Grant {source}:{call_id} has an unreadable deadline '{raw_deadline}'; storing it without one.")
+    url, agency = _field(record, "url"), _field(record, "agency")
+    return schemas.GrantCreate(
+        source=source,
+        call_id=str(call_id).strip(),
+        title=" ".join(str(title).split()),
+        deadline=deadline,
+        url=str(url).strip() if url is not None else None,
+        agency=str(agency).strip() if agency is not None else None,
+        tags=parse_tags(_field(record, "tags")),
+    )
+
+
+async def harvest_grants(db: AsyncSession, source: GrantSource, batch_size: Optional[int] = None) -> GrantHarvestResult:
+    """Reads a grant source batch by batch and bulk-upserts each batch on (source, call_id).
+
+    Re-harvesting an unchanged feed writes nothing: only calls whose fields changed are updated.
+    """
+    start = time.perf_counter()
+    result = GrantHarvestResult(source=source.name)
+    async for batch in source.batches(batch_size or settings.grant_batch_size):
+        grants = [grant for grant in (normalize_grant(record, source.name) for record in batch) if grant is not None]
+        result.fetched += len(batch)
+        result.skipped += len(batch) - len(grants)
+        result.upserted += await crud_async.upsert_grants(db, grants)
+    result.duration_ms = int((time.perf_counter() - start) * 1000)
+    logging.info(f"Harvested {result.fetched} grant calls from '{source.name}' in {result.duration_ms}ms "
+                 f"({result.upserted} new or changed, {result.skipped} skipped)")
+    return result
@@ -0,0 +1,42 @@
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+import xml.etree.ElementTree as ET
+
+import httpx
+
+
+@dataclass
+class HarvestPage:
+    """One page of harvested articles plus the cursor needed to fetch the page after it."""
+    articles: List[Dict[str, Any]] = field(default_factory=list)
+    start: int = 0
+    next_start: int = 0
+    total: Optional[int] = None
+    # PubMed history server session, reused for every page of one search
+    webenv: Optional[str] = None
+    query_key: Optional[str] = None
+
+
+async def iter_xml_elements(response: httpx.Response, *tags: str) -> AsyncIterator[ET.Element]:
+    """Incrementally parses a streamed XML response and yields each complete element named in `tags`.
+
+    This is the non-blocking counterpart of ET.iterparse: the body is fed to a pull parser as
+    it arrives, and every yielded element is detached from the tree afterwards, so memory stays
+    bounded by one element rather than the whole document.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    async for chunk in response.aiter_bytes():
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = element
+                continue
+            if element.tag in tags:
+                yield element
+                if element in root:
+                    root.remove(element)
+                else:
+                    element.clear()
+    parser.close()
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from scipaper.config import settings
+
+# Responses worth retrying: throttling and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class TokenBucket:
+    """Async token bucket handing out `rate` tokens per second, bursting up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Waits until `tokens` are available and takes them. Waiters are served in order."""
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def block_for(self, seconds: float):
+        """Stops handing out tokens for `seconds`, e.g. after the server sent Retry-After."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parses a Retry-After header given either as seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedClient:
+    """A long-lived, pooled httpx client for one upstream source, with rate limiting and retries.
+
+    Tests pass `transport` (e.g. an httpx.MockTransport) to run it against a local stub.
+    """
+
+    def __init__(self, name: str, base_url: str, requests_per_second: float, burst: float = 1.0,
+                 max_connections: int = 10, max_retries: int = 5, backoff_base: float = 1.0,
+                 timeout: float = 30.0, http2: bool = True, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.name = name
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            http2=http2,
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        delay = self.backoff_base * (2 ** attempt)
+        return min(MAX_BACKOFF_SECONDS, delay + random.uniform(0, delay / 2))
+
+    async def _send(self, method: str, url: str, stream: bool, **kwargs) -> httpx.Response:
+        """Sends a request under the rate limit, retrying throttled and transient failures."""
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                request = self._client.build_request(method, url, **kwargs)
+                response = await self._client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logging.warning(f"{self.name}: {method} {url} failed ({e!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                if response.is_error:
+                    await response.aclose()
+                response.raise_for_status()
+                return response
+
+            retry_after = _retry_after_seconds(response)
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            if response.status_code == 429:
+                # Hold back every caller sharing this source, not just this request
+                self.bucket.block_for(delay)
+            logging.warning(f"{self.name}: {method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            await response.aclose()
+            await asyncio.sleep(delay)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Sends a request and returns the fully read response."""
+        return await self._send(method, url, stream=False, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Sends a request and yields the response before its body is read, for incremental parsing."""
+        response = await self._send(method, url, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+def _pubmed_client() -> RateLimitedClient:
+    # NCBI allows 3 requests/s without an API key and 10 requests/s with one
+    rate = settings.pubmed_requests_per_second or (10.0 if settings.ncbi_api_key else 3.0)
+    return RateLimitedClient("pubmed", settings.pubmed_base_url, rate, burst=rate,
+                             max_connections=settings.http_max_connections,
+                             max_retries=settings.http_max_retries,
+                             backoff_base=settings.http_backoff_base,
+                             timeout=settings.http_timeout, http2=settings.http2_enabled)
+
+
+def _arxiv_client() -> RateLimitedClient:
+    # arXiv asks for no more than one request every three seconds, on a single connection
+    return RateLimitedClient("arxiv", settings.arxiv_base_url, settings.arxiv_requests_per_second,
+                             max_connections=1,
+                             max_retries=settings.http_max_retries,
+                             backoff_base=max(settings.http_backoff_base, 3.0),
+                             timeout=settings.http_timeout, http2=settings.http2_enabled)
+
+
+CLIENT_FACTORIES = {
+    "pubmed": _pubmed_client,
+    "arxiv": _arxiv_client,
+}
+
+_clients: Dict[str, RateLimitedClient] = {}
+
+
+def get_client(source: str) -> RateLimitedClient:
+    """Returns the shared client for a source, creating it on first use."""
+    if source not in _clients:
+        _clients[source] = CLIENT_FACTORIES[source]()
+    return _clients[source]
+
+
+async def close_clients():
+    """Closes every shared client. Clients are recreated on next use."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scipaper import crud_async, schemas
+from scipaper.config import settings
+from scipaper.database import AsyncSessionLocal
+from scipaper.services import arxiv, elasticsearch, neo4j, pubmed
+from scipaper.services.harvest import HarvestPage
+
+
+@dataclass
+class ChunkStats:
+    """Timings for one chunk of the ingestion pipeline."""
+    index: int
+    papers: int
+    changed: int = 0
+    insert_ms: int = 0
+    embed_ms: int = 0
+    duplicates: int = 0
+    search_index_ms: int = 0
+    graph_ms: int = 0
+    total_ms: int = 0
+
+    @property
+    def papers_per_second(self) -> float:
+        return self.papers / (self.total_ms / 1000) if self.total_ms else 0.0
+
+
+@dataclass
+class IngestionResult:
+    """Papers created by an ingestion run and the per-chunk throughput."""
+    papers: List[Any] = field(default_factory=list)
+    chunks: List[ChunkStats] = field(default_factory=list)
+
+
+def normalize_article(article: Dict[str, Any]) -> schemas.PaperCreate:
+    """Turns a raw article dict from a source service into a PaperCreate schema."""
+    authors = article.get('authors') or []
+    # Ensure authors is a list of dicts
+    if all(isinstance(a, str) for a in authors):
+        authors = [{'name': author} for author in authors]
+
+    # DOIs are case-insensitive and sometimes arrive as resolver URLs
+    doi = (article.get('doi') or '').strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "doi:"):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+
+    return schemas.PaperCreate(
+        source=article.get('source'),
+        source_id=article.get('source_id'),
+        title=article.get('title'),
+        authors=authors,
+        year=article.get('year'),
+        journal=article.get('journal'),
+        url=article.get('url'),
+        doi=doi or None,
+        language=article.get('language'),
+        abstract=article.get('abstract'),
+        mesh_terms=article.get('mesh_terms') or None,
+    )
+
+
+async def _timed(func, *args) -> int:
+    """Awaits a coroutine function, or runs a blocking call in a worker thread, and returns its duration in ms."""
+    start = time.perf_counter()
+    if asyncio.iscoroutinefunction(func):
+        await func(*args)
+    else:
+        await asyncio.to_thread(func, *args)
+    return int((time.perf_counter() - start) * 1000)
+
+
+async def _embed_and_index(stats: ChunkStats, papers: List[Any]):
+    """Embeds a chunk in batches, then writes it to the search index and the vector index."""
+    # NumPy-backed modules are imported on first ingest rather than at app startup
+    from scipaper.services import embeddings, vector_index
+    start = time.perf_counter()
+    try:
+        vectors = await embeddings.embed_papers(papers)
+    except Exception as e:
+        # Keep lexical search current even when the embedding API is unavailable
+        logging.warning(f"Embedding chunk {stats.index} failed, indexing it without vectors: {e}")
+        vectors = {}
+    stats.embed_ms = int((time.perf_counter() - start) * 1000)
+    stats.search_index_ms = await _timed(elasticsearch.bulk_index_papers, papers, vectors)
+    if vectors:
+        await asyncio.to_thread(vector_index.add_embeddings, vectors)
+
+
+async def _flag_duplicates(stats: ChunkStats, papers: List[Any]):
+    """Adds the chunk's abstracts to the near-duplicate index and flags cross-source duplicates."""
+    from scipaper.services import dedup
+    try:
+        async with AsyncSessionLocal() as db:
+            stats.duplicates = len(await dedup.index_papers(db, papers))
+    except Exception as e:
+        logging.warning(f"Duplicate detection failed for chunk {stats.index}: {e}")
+
+
+async def _write_sinks(stats: ChunkStats, papers: List[Any], started: float):
+    """Writes one inserted chunk to Elasticsearch (with embeddings), Neo4j and the duplicate index concurrently."""
+    neo4j_service = neo4j.get_neo4j_service()
+    _, stats.graph_ms, _ = await asyncio.gather(
+        _embed_and_index(stats, papers),
+        _timed(neo4j_service.add_papers_and_authors, papers),
+        _flag_duplicates(stats, papers),
+    )
+    stats.total_ms = int((time.perf_counter() - started) * 1000)
+    logging.info(
+        f"Ingested chunk {stats.index}: {stats.papers} papers ({stats.changed} new or changed, {stats.duplicates} duplicates) in {stats.total_ms}ms "
+        f"(insert={stats.insert_ms}ms, embed={stats.embed_ms}ms, index={stats.search_index_ms}ms, graph={stats.graph_ms}ms, "
+        f"{stats.papers_per_second:.1f} papers/s)"
+    )
+
+
+SOURCES = ("pubmed", "arxiv")
+
+
+def harvest(source: str, query: str, max_results: Optional[int] = None, page_size: Optional[int] = None, **cursor) -> AsyncIterator[HarvestPage]:
+    """Returns the paginated harvest generator for a source. `cursor` resumes a previous harvest."""
+    if source == "pubmed":
+        return pubmed.harvest_pubmed(query, max_results, page_size, **cursor)
+    if source == "arxiv":
+        return arxiv.harvest_arxiv(query, max_results, page_size, start=cursor.get("start", 0))
+    raise ValueError(f"Unknown source '{source}'. Choose from {', '.join(SOURCES)}.")
+
+
+async def ingest_stream(db: AsyncSession, pages: AsyncIterable[HarvestPage], chunk_size: Optional[int] = None,
+                        collect_papers: bool = True,
+                        on_page: Optional[Callable[[HarvestPage], Awaitable[None]]] = None) -> IngestionResult:
+    """Ingests harvested pages in chunks: one bulk upsert, one batch of embeddings, one ES bulk request
+    and one Neo4j transaction per chunk.
+
+    Only rows the upsert actually inserted or changed are sent on to Elasticsearch and Neo4j,
+    so re-ingesting papers that are already stored costs a single database round trip.
+
+    The upsert goes through the async session; blocking search and graph client calls run in
+    worker threads. The Elasticsearch and Neo4j writes for a chunk overlap with fetching the
+    next page and upserting the next chunk, while memory stays bounded by one page. Pass
+    `collect_papers=False` for large harvests whose rows do not need to be returned.
+
+    `on_page` is awaited once every chunk of a page has been written to all three stores,
+    which makes it the place to checkpoint a resumable harvest.
+    """
+    chunk_size = chunk_size or settings.ingest_chunk_size
+    result = IngestionResult()
+    pending: Optional[asyncio.Task] = None
+    index = 0
+
+    try:
+        async for page in pages:
+            for start in range(0, len(page.articles), chunk_size):
+                chunk = [normalize_article(a) for a in page.articles[start:start + chunk_size]]
+                started = time.perf_counter()
+                stats = ChunkStats(index=index, papers=len(chunk))
+                index += 1
+
+                papers, changed = await crud_async.upsert_papers(db, chunk)
+                stats.insert_ms = int((time.perf_counter() - started) * 1000)
+                stats.changed = len(changed)
+                if collect_papers:
+                    result.papers.extend(papers)
+                result.chunks.append(stats)
+
+                if pending is not None:
+                    await pending
+                    pending = None
+                if changed:
+                    pending = asyncio.create_task(_write_sinks(stats, changed, started))
+                else:
+                    stats.total_ms = stats.insert_ms
+                    logging.info(f"Ingested chunk {stats.index}: {stats.papers} papers, all unchanged ({stats.insert_ms}ms)")
+
+            if on_page is not None:
+                if pending is not None:
+                    await pending
+                    pending = None
+                await on_page(page)
+
+        if pending is not None:
+            await pending
+            pending = None
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+    return result
+
+
+async def ingest_articles(db: AsyncSession, articles: List[Dict[str, Any]], chunk_size: Optional[int] = None) -> IngestionResult:
+    """Ingests an already fetched list of articles; see ingest_stream."""
+    async def single_page():
+        yield HarvestPage(articles=articles, next_start=len(articles))
+
+    return await ingest_stream(db, single_page(), chunk_size)
+
+
+@dataclass
+class EmbeddingBackfillResult:
+    """Papers embedded and written to the vector index by one backfill run."""
+    papers: int = 0
+    embedded: int = 0
+    index_errors: int = 0
+    duration_ms: int = 0
+
+
+async def backfill_embeddings(db: AsyncSession, batch_size: Optional[int] = None, include_embedded: bool = False,
+                              on_batch: Optional[Callable[[EmbeddingBackfillResult], Awaitable[Any]]] = None) -> EmbeddingBackfillResult:
+    """Embeds papers stored without an embedding from the current model and writes their vectors to
+    the active vector backend.
+
+    Papers ingested before semantic search existed, or while the embedding API was failing, are
+    otherwise never embedded, since re-ingesting an unchanged paper skips the sinks. Pass
+    `include_embedded` to also rewrite the vectors of papers that already have one (they are
+    reused, not recomputed), e.g. after a reindex into an index that lacks them.
+    """
+    from scipaper.services import embeddings, vector_index
+    start = time.perf_counter()
+    batch_size = batch_size or settings.ingest_chunk_size
+    model = embeddings.model_name()
+    result = EmbeddingBackfillResult()
+    after = None
+    while True:
+        papers = await crud_async.get_papers_to_embed(db, model, after, batch_size, include_embedded)
+        if not papers:
+            break
+        after = (papers[-1].created_at, papers[-1].id)
+        vectors = await embeddings.embed_papers(papers)
+        if vectors:
+            if settings.vector_index_backend == vector_index.ELASTICSEARCH:
+                embedded = [paper for paper in papers if paper.id in vectors]
+                _, errors = await asyncio.to_thread(elasticsearch.bulk_index_papers, embedded, vectors)
+                result.index_errors += len(errors)
+            else:
+                await asyncio.to_thread(vector_index.add_embeddings, vectors)
+        result.papers += len(papers)
+        result.embedded += len(vectors)
+        if on_batch is not None:
+            await on_batch(result)
+
+    result.duration_ms = int((time.perf_counter() - start) * 1000)
+    logging.info(f"Backfilled embeddings of {result.embedded} of {result.papers} papers in {result.duration_ms}ms "
+                 f"({result.index_errors} index errors)")
+    return result
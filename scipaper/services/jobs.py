@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scipaper import crud_async, models
+from scipaper.database import AsyncSessionLocal
+from scipaper.services import clients
+
+# Job statuses stored in jobs.status
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+RESUMABLE_STATUSES = (FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised at a checkpoint once the job has been cancelled."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def checkpoint(db: AsyncSession, job: models.Job, **payload_updates):
+    """Merges `payload_updates` into the job payload and commits it.
+
+    Also picks up status changes made elsewhere and raises JobCancelled if the job was cancelled.
+    """
+    await crud_async.update_job(db, job, payload={**(job.payload or {}), **payload_updates})
+    if job.status == CANCELLED:
+        raise JobCancelled(str(job.id))
+
+
+async def enqueue(db: AsyncSession, job: models.Job, task) -> models.Job:
+    """Queues the Celery `task` for a job under a task id stored in the job first.
+
+    The worker reads the payload when it starts and writes it back at every checkpoint, so the
+    task id has to be committed before the task can run; otherwise a fast worker would erase it
+    and the job could no longer be revoked.
+    """
+    task_id = str(uuid.uuid4())
+    job = await crud_async.update_job(db, job, payload={**(job.payload or {}), "task_id": task_id})
+    task.apply_async((str(job.id),), task_id=task_id)
+    return job
+
+
+async def run_job(job_id: uuid.UUID, body: Callable[[AsyncSession, models.Job], Awaitable[Any]]):
+    """Runs `body` for a queued or interrupted job and records its lifecycle in the jobs table."""
+    async with AsyncSessionLocal() as db:
+        job = await crud_async.get_job(db, job_id)
+        if job is None:
+            logging.error(f"Job {job_id} not found.")
+            return
+        if job.status not in ACTIVE_STATUSES:
+            logging.info(f"Skipping job {job_id} with status '{job.status}'.")
+            return
+
+        # A job found already 'running' was interrupted (e.g. its worker died) and resumes here
+        await crud_async.update_job(db, job, status=RUNNING, started_at=job.started_at or _now(), error=None)
+        try:
+            await body(db, job)
+        except JobCancelled:
+            logging.info(f"Job {job_id} cancelled.")
+            await crud_async.update_job(db, job, finished_at=_now())
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {e}")
+            await db.rollback()
+            await crud_async.update_job(db, job, status=FAILED, finished_at=_now(), error=str(e))
+            raise
+        else:
+            await crud_async.update_job(db, job, status=COMPLETED, finished_at=_now())
+
+
+def run_async(coro_fn: Callable[..., Awaitable[Any]], *args):
+    """Runs a coroutine from a Celery task on a fresh event loop.
+
+    Pools bound to the loop (every client in services/clients.py) are released afterwards so
+    the next task, on its own loop, starts with fresh connections.
+    """
+    async def main():
+        try:
+            return await coro_fn(*args)
+        finally:
+            await clients.close_all()
+
+    return asyncio.run(main())
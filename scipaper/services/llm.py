@@ -0,0 +1,80 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional
+
+from scipaper.config import settings
+
+OPENAI = "openai"
+SCRIPTED = "scripted"
+
+DEFAULT_SCRIPT = (
+    "# Draft proposal\n\n",
+    "This draft was produced offline by the scripted language model client. ",
+    "Set LLM_BACKEND=openai to generate a real proposal.\n",
+)
+
+
+class LLMClient(ABC):
+    """Streams a chat completion as text fragments, as the model produces them.
+
+    Endpoints receive their client through the `get_llm_client` dependency, so tests replace it
+    with `app.dependency_overrides[get_llm_client] = lambda: ScriptedLLMClient([...])`.
+    """
+    model: str
+
+    @abstractmethod
+    def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Yields the text of the reply to `messages` fragment by fragment."""
+
+
+class OpenAIChatClient(LLMClient):
+    def __init__(self, model: Optional[str] = None, temperature: Optional[float] = None, max_tokens: Optional[int] = None):
+        self.model = model or settings.proposal_model
+        self.temperature = settings.proposal_temperature if temperature is None else temperature
+        self.max_tokens = max_tokens or settings.proposal_max_tokens
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        from scipaper.services.openai_analyzer import get_client
+        response = await get_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class ScriptedLLMClient(LLMClient):
+    """Replays fixed fragments without network access, for tests and offline development.
+
+    The messages of every call are kept in `calls`, so tests can check the prompt.
+    """
+    model = SCRIPTED
+
+    def __init__(self, fragments: Optional[List[str]] = None, delay: float = 0.0):
+        self.fragments = list(fragments if fragments is not None else DEFAULT_SCRIPT)
+        self.delay = delay
+        self.calls: List[List[Dict[str, str]]] = []
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        self.calls.append(messages)
+        for fragment in self.fragments:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield fragment
+
+
+LLM_BACKENDS = {
+    OPENAI: OpenAIChatClient,
+    SCRIPTED: ScriptedLLMClient,
+}
+
+
+def get_llm_client() -> LLMClient:
+    """FastAPI dependency returning the client configured by `llm_backend`."""
+    if settings.llm_backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{settings.llm_backend}'. Choose from {', '.join(LLM_BACKENDS)}.")
+    return LLM_BACKENDS[settings.llm_backend]()
@@ -1,52 +1,248 @@
-from neo4j import GraphDatabase
+from typing import List, Optional, Tuple
+import asyncio
+import itertools
+import re
 from scipaper.config import settings
+from scipaper.models import paper_key
 from scipaper.schemas import Paper
 
+# Lucene query syntax characters, escaped so a topic is matched as plain words
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+
+# Links every pair of co-authors, weighted by the number of papers they share. Recomputing the
+# weight (rather than incrementing it) keeps re-ingesting a paper idempotent.
+COLLABORATION_QUERY = (
+    "UNWIND $rows AS row "
+    "UNWIND row.pairs AS pair "
+    "MATCH (a:Author {name: pair[0]}), (b:Author {name: pair[1]}) "
+    "MERGE (a)-[r:COLLABORATED_WITH]->(b) "
+    "SET r.weight = size([(a)-[:AUTHORED]->(shared:Paper)<-[:AUTHORED]-(b) | shared])"
+)
+
+def coauthor_pairs(authors: List[str]) -> List[List[str]]:
+    """Ordered author pairs of one paper; papers with very long author lists carry no collaboration signal."""
+    if len(authors) > settings.coauthor_max_authors:
+        return []
+    return [sorted(pair) for pair in itertools.combinations(authors, 2)]
+
+def fulltext_query(topic: str) -> str:
+    return _LUCENE_SPECIAL.sub(r"\\\1", topic)
+
 class Neo4jService:
+    """Graph reads and writes over the async Neo4j driver. The driver's connection pool belongs to
+    the event loop it was created on; use get_neo4j_service() to get the one for the running loop."""
+
     def __init__(self, uri, user, password):
-        self._driver = GraphDatabase.driver(uri, auth=(user, password))
+        from neo4j import AsyncGraphDatabase
+        self._driver = AsyncGraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=settings.neo4j_max_connection_pool_size,
+            max_connection_lifetime=settings.neo4j_max_connection_lifetime,
+            connection_acquisition_timeout=settings.neo4j_connection_acquisition_timeout,
+            fetch_size=settings.neo4j_fetch_size,
+        )
+        self._schema_ready = False
 
-    def close(self):
-        self._driver.close()
+    async def close(self):
+        await self._driver.close()
 
-    def add_paper_and_authors(self, paper: Paper):
-        with self._driver.session() as session:
-            session.execute_write(self._create_paper_and_authors, paper)
+    async def verify_connectivity(self):
+        await self._driver.verify_connectivity()
 
-    @staticmethod
-    def _create_paper_and_authors(tx, paper: Paper):
-        if not paper.doi:
+    # Uniqueness constraints are backed by indexes, so MERGE on these keys is an index lookup
+    SCHEMA_STATEMENTS = [
+        "CREATE CONSTRAINT paper_key IF NOT EXISTS FOR (p:Paper) REQUIRE p.key IS UNIQUE",
+        "CREATE CONSTRAINT author_name IF NOT EXISTS FOR (a:Author) REQUIRE a.name IS UNIQUE",
+        "CREATE INDEX paper_doi IF NOT EXISTS FOR (p:Paper) ON (p.doi)",
+        "CREATE INDEX paper_id IF NOT EXISTS FOR (p:Paper) ON (p.id)",
+        "CREATE FULLTEXT INDEX paper_title IF NOT EXISTS FOR (p:Paper) ON EACH [p.title]",
+    ]
+
+    async def ensure_schema(self):
+        """Creates the graph constraints and indexes once per process."""
+        if self._schema_ready:
             return
+        async with self._driver.session() as session:
+            for statement in self.SCHEMA_STATEMENTS:
+                result = await session.run(statement)
+                await result.consume()
+        self._schema_ready = True
 
-        tx.run("MERGE (p:Paper {doi: $doi}) SET p.title = $title",
-               doi=paper.doi, title=paper.title)
-
-        if paper.authors:
-            for author in paper.authors:
-                author_name = author.get('name')
-                if author_name:
-                    tx.run("MERGE (a:Author {name: $name})", name=author_name)
-                    tx.run("MATCH (p:Paper {doi: $doi}), (a:Author {name: $name}) "
-                           "MERGE (a)-[:AUTHORED]->(p)",
-                           doi=paper.doi, name=author_name)
-
-    def get_collaboration_suggestions(self, topic: str):
-        with self._driver.session() as session:
-            result = session.run("MATCH (a:Author)-[:AUTHORED]->(p:Paper) "
-                                 "WHERE toLower(p.title) CONTAINS toLower($topic) "
-                                 "RETURN a.name as author, count(p) as papers "
-                                 "ORDER BY papers DESC LIMIT 10", topic=topic)
-            return [{"author": record["author"], "papers": record["papers"]} for record in result]
-
-# --- Singleton Pattern for Neo4j Service ---
-neo4j_service_instance = None
-
-def get_neo4j_service():
-    global neo4j_service_instance
-    if neo4j_service_instance is None:
-        neo4j_service_instance = Neo4jService(
-            settings.neo4j_uri, 
-            settings.neo4j_username, 
-            settings.neo4j_password
+    async def add_paper_and_authors(self, paper: Paper):
+        await self.add_papers_and_authors([paper])
+
+    async def add_papers_and_authors(self, papers: List[Paper]):
+        """Writes papers and their authors with one UNWIND query per batch of `neo4j_batch_size`.
+
+        Papers are keyed on "source:source_id", so papers without a DOI (most arXiv papers) are
+        written too. COLLABORATED_WITH edges between each paper's co-authors are kept up to date
+        in the same transaction; their weight is the number of papers the two share.
+        """
+        rows = [
+            {
+                "key": paper_key(paper.source, paper.source_id),
+                "id": str(paper.id),
+                "doi": paper.doi,
+                "title": paper.title,
+                "year": paper.year,
+                "authors": list(dict.fromkeys(a.get('name') for a in (paper.authors or []) if a.get('name'))),
+            }
+            for paper in papers
+        ]
+        for row in rows:
+            row["pairs"] = coauthor_pairs(row["authors"])
+        if not rows:
+            return
+        await self.ensure_schema()
+        async with self._driver.session() as session:
+            for start in range(0, len(rows), settings.neo4j_batch_size):
+                await session.execute_write(self._create_papers_and_authors, rows[start:start + settings.neo4j_batch_size])
+
+    @staticmethod
+    async def _create_papers_and_authors(tx, rows: List[dict]):
+        # Papers written before they were keyed on source:source_id only have a DOI; adopt them
+        result = await tx.run("UNWIND $rows AS row "
+                              "WITH row WHERE row.doi IS NOT NULL "
+                              "MATCH (p:Paper {doi: row.doi}) WHERE p.key IS NULL "
+                              "SET p.key = row.key",
+                              rows=rows)
+        await result.consume()
+        result = await tx.run("UNWIND $rows AS row "
+                              "MERGE (p:Paper {key: row.key}) "
+                              "SET p.id = row.id, p.doi = row.doi, p.title = row.title, p.year = row.year "
+                              "WITH p, row "
+                              "UNWIND row.authors AS name "
+                              "MERGE (a:Author {name: name}) "
+                              "MERGE (a)-[:AUTHORED]->(p)",
+                              rows=rows)
+        await result.consume()
+        result = await tx.run(COLLABORATION_QUERY, rows=rows)
+        await result.consume()
+
+    @staticmethod
+    async def _rebuild_collaborations_batch(tx, after: str, batch_size: int):
+        result = await tx.run(
+            "MATCH (p:Paper) WHERE p.key > $after "
+            "WITH p ORDER BY p.key LIMIT $batch_size "
+            "WITH collect(p) AS papers, max(p.key) AS last_key "
+            "CALL { "
+            "  WITH papers "
+            "  UNWIND papers AS p "
+            "  MATCH (a:Author)-[:AUTHORED]->(p)<-[:AUTHORED]-(b:Author) "
+            "  WHERE a.name < b.name AND size([(p)<-[:AUTHORED]-(author:Author) | author]) <= $max_authors "
+            "  WITH DISTINCT a, b "
+            "  MERGE (a)-[r:COLLABORATED_WITH]->(b) "
+            "  SET r.weight = size([(a)-[:AUTHORED]->(shared:Paper)<-[:AUTHORED]-(b) | shared]) "
+            "} "
+            "RETURN last_key, size(papers) AS papers",
+            after=after, batch_size=batch_size, max_authors=settings.coauthor_max_authors,
         )
-    return neo4j_service_instance
\ No newline at end of file
+        return await result.single()
+
+    async def rebuild_collaborations(self, batch_size: int = 1000) -> int:
+        """Recomputes COLLABORATED_WITH edges for every paper in the graph, in batches of papers.
+
+        Only needed once for graphs loaded before the edges were maintained at ingest.
+        """
+        await self.ensure_schema()
+        last_key, total = "", 0
+        async with self._driver.session() as session:
+            while True:
+                record = await session.execute_write(self._rebuild_collaborations_batch, last_key, batch_size)
+                if not record["papers"]:
+                    return total
+                last_key, total = record["last_key"], total + record["papers"]
+
+    @staticmethod
+    async def _score_collaborations_batch(tx, after: str, batch_size: int):
+        result = await tx.run(
+            "MATCH (a:Author) WHERE a.name > $after "
+            "WITH a ORDER BY a.name LIMIT $batch_size "
+            "WITH collect(a) AS authors, max(a.name) AS last_name "
+            "CALL { "
+            "  WITH authors "
+            "  UNWIND authors AS a "
+            "  MATCH (a)-[r:COLLABORATED_WITH]->(b:Author) "
+            "  WITH a, r, b, "
+            "       size([(a)-[:COLLABORATED_WITH]-(c:Author)-[:COLLABORATED_WITH]-(b) | c]) AS common, "
+            "       size([(a)-[:COLLABORATED_WITH]-(n:Author) | n]) AS a_degree, "
+            "       size([(b)-[:COLLABORATED_WITH]-(n:Author) | n]) AS b_degree "
+            "  SET r.common_neighbours = common, "
+            "      r.proximity = r.weight * (common + 1) / sqrt(a_degree * b_degree) "
+            "} "
+            "RETURN last_name, size(authors) AS authors",
+            after=after, batch_size=batch_size,
+        )
+        return await result.single()
+
+    async def score_collaborations(self, batch_size: int = 1000) -> int:
+        """Stores a proximity score on every COLLABORATED_WITH edge, in batches of authors.
+
+        The score is the edge weight times one plus the pair's common co-authors, normalised by
+        the two authors' degrees so prolific hubs do not dominate. Collaborator ranking reads it
+        instead of walking the graph per request; edges written since the last run score 0.
+        """
+        await self.ensure_schema()
+        last_name, total = "", 0
+        async with self._driver.session() as session:
+            while True:
+                record = await session.execute_write(self._score_collaborations_batch, last_name, batch_size)
+                if not record["authors"]:
+                    return total
+                last_name, total = record["last_name"], total + record["authors"]
+
+    async def get_topic_graph(self, topic: str) -> Tuple[List[dict], List[tuple]]:
+        """Finds the authors of the papers best matching `topic` through the full-text index.
+
+        Returns the authors (seeds) with their summed relevance and paper counts, and the
+        co-author edges around them with the proximity stored by score_collaborations(),
+        strongest first.
+        """
+        async with self._driver.session() as session:
+            result = await session.run(
+                "CALL db.index.fulltext.queryNodes('paper_title', $query) YIELD node, score "
+                "WITH node AS p, score LIMIT $paper_limit "
+                "MATCH (a:Author)-[:AUTHORED]->(p) "
+                "RETURN a.name AS author, sum(score) AS relevance, count(p) AS papers "
+                "ORDER BY relevance DESC LIMIT $seed_limit",
+                query=fulltext_query(topic), paper_limit=settings.collaborator_topic_papers,
+                seed_limit=settings.collaborator_seed_authors,
+            )
+            seeds = [record.data() async for record in result]
+            if not seeds:
+                return [], []
+            result = await session.run(
+                "MATCH (a:Author)-[r:COLLABORATED_WITH]-(b:Author) "
+                "WHERE a.name IN $names "
+                "WITH a, b, coalesce(r.proximity, 0.0) AS proximity "
+                "RETURN a.name, b.name, proximity ORDER BY proximity DESC LIMIT $edge_limit",
+                names=[seed["author"] for seed in seeds], edge_limit=settings.collaborator_edge_limit,
+            )
+            edges = [tuple(record.values()) async for record in result]
+        return seeds, edges
+
+_service: Optional[Neo4jService] = None
+_service_loop = None
+
+def get_neo4j_service() -> Neo4jService:
+    """Returns the service for the running event loop, creating it on first use.
+
+    The API creates it at startup and closes it at shutdown; Celery tasks, which each run on a
+    fresh loop, get their own and close it when the task's loop ends (see jobs.run_async).
+    """
+    global _service, _service_loop
+    loop = asyncio.get_running_loop()
+    if _service is None or _service_loop is not loop:
+        _service = Neo4jService(settings.neo4j_uri, settings.neo4j_username, settings.neo4j_password)
+        _service_loop = loop
+    return _service
+
+async def close_neo4j_service():
+    global _service, _service_loop
+    if _service is not None:
+        await _service.close()
+    _service, _service_loop = None, None
+
+async def ping():
+    await get_neo4j_service().verify_connectivity()
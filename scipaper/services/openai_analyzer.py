@@ -1,46 +1,198 @@
-import openai
 from scipaper.config import settings
+from scipaper.services.cache import build_cache
+import asyncio
+import hashlib
 import json
+import logging
+import unicodedata
+from typing import Optional, Tuple
 
-client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
+_client = None
+_client_loop = None
 
-async def analyze_paper(title: str, abstract: str) -> dict:
-    """Analyzes a paper's title and abstract using GPT-4 to extract structured data."""
-    prompt = f"""
-    Analyze the following scientific paper and extract the specified information in JSON format.
+def get_client():
+    """Returns the OpenAI client for the running event loop; the SDK is imported on first use."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        import openai
+        _client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
+        _client_loop = loop
+    return _client
 
-    **Title:** {title}
-    **Abstract:** {abstract}
+async def close_client():
+    global _client, _client_loop
+    if _client is not None:
+        await _client.close()
+    _client, _client_loop = None, None
 
-    **Instructions:**
-    Based on the abstract and title, provide a structured analysis covering the following points.
-    If a section cannot be determined from the text, use an empty list or a null value.
+MODEL = "gpt-4"
+TEMPERATURE = 0.2
+# Bump whenever a prompt below changes so cached analyses from the old prompt are not reused
+PROMPT_VERSION = 1
+FULL_TEXT_PROMPT_VERSION = 1
+
+# List fields of the JSON the prompt asks for
+ANALYSIS_FIELDS = ["findings", "methods", "datasets", "gaps", "limitations", "suggested_experiments"]
+# Rough characters-per-token ratio for English text, used to size full-text chunks
+CHARS_PER_TOKEN = 4
+
+analysis_cache = build_cache(
+    "analysis",
+    settings.analysis_cache_backend,
+    settings.analysis_cache_ttl,
+    settings.analysis_cache_max_entries,
+)
+
+def _normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+def cache_key(title: str, abstract: str, model: str = MODEL, temperature: float = TEMPERATURE,
+              section: Optional[Tuple[int, int]] = None) -> str:
+    """Content address of an analysis: hash of the normalized input, prompt version, model and temperature.
 
-    **JSON Output Structure:**
-    {{
+    Full-text chunks pass their (section, sections) position; they are keyed on the full-text
+    prompt and its version, so they never share entries with abstract analyses.
+    """
+    if section is None:
+        parts = [_normalize(title), _normalize(abstract), PROMPT_VERSION, model, temperature]
+    else:
+        parts = [_normalize(title), _normalize(abstract), "full_text", FULL_TEXT_PROMPT_VERSION, list(section), model, temperature]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+async def get_cached_analysis(title: str, abstract: str):
+    """Returns the cached analysis for this input, or None."""
+    return await analysis_cache.get(cache_key(title, abstract))
+
+async def analyze_paper(title: str, abstract: str, use_cache: bool = True) -> dict:
+    """Analyzes a paper's title and abstract using GPT-4 to extract structured data.
+
+    Results are cached by content, so repeating an analysis of the same text is served from
+    the cache instead of calling the API.
+    """
+    key = cache_key(title, abstract)
+    if use_cache:
+        cached = await get_cached_analysis(title, abstract)
+        if cached is not None:
+            logging.info(f"Analysis cache hit for '{title[:60]}'")
+            return cached
+
+    analysis = await _call_openai(abstract_prompt(title, abstract))
+    await analysis_cache.set(key, analysis)
+    return analysis
+
+OUTPUT_STRUCTURE = """**JSON Output Structure:**
+    {
         "findings": ["List of key findings and results."],
         "methods": ["List of methodologies, techniques, or approaches used."],
         "datasets": ["List of datasets used or created."],
         "gaps": ["List of identified research gaps or open questions."],
         "limitations": ["List of the study's limitations."],
         "suggested_experiments": ["List of potential future experiments or research directions."]
-    }}
+    }
     """
 
+def abstract_prompt(title: str, abstract: str) -> str:
+    return f"""
+    Analyze the following scientific paper and extract the specified information in JSON format.
+
+    **Title:** {title}
+    **Abstract:** {abstract}
+
+    **Instructions:**
+    Based on the abstract and title, provide a structured analysis covering the following points.
+    If a section cannot be determined from the text, use an empty list or a null value.
+
+    {OUTPUT_STRUCTURE}"""
+
+def full_text_prompt(title: str, chunk: str, section: int, sections: int) -> str:
+    return f"""
+    The text below is section {section} of {sections} of the full text of a scientific paper.
+    Extract the specified information in JSON format.
+
+    **Title:** {title}
+    **Section {section} of {sections}:**
+    {chunk}
+
+    **Instructions:**
+    Report only what this section itself states; other sections are analyzed separately and
+    the results merged, so do not guess at content outside it. A section may be part of the
+    introduction, methods, results or references, and may start or end mid-sentence.
+    If a point is not covered by this section, use an empty list.
+
+    {OUTPUT_STRUCTURE}"""
+
+async def _call_openai(prompt: str) -> dict:
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4",
+        response = await get_client().chat.completions.create(
+            model=MODEL,
             messages=[
                 {"role": "system", "content": "You are an expert scientific research assistant. Your goal is to provide structured analysis of academic papers in JSON format."},
                 {"role": "user", "content": prompt}
             ],
             response_format={"type": "json_object"},
-            temperature=0.2,
+            temperature=TEMPERATURE,
             timeout=300  # 5-minute timeout as per requirements
         )
         analysis_content = response.choices[0].message.content
         return json.loads(analysis_content)
     except Exception as e:
-        # In a real application, you'd have more robust logging and error handling
-        print(f"An error occurred during OpenAI API call: {e}")
+        logging.warning(f"An error occurred during OpenAI API call: {e}")
         raise
+
+def split_into_chunks(text: str, max_tokens: int) -> list:
+    """Splits text into chunks of at most ~max_tokens, breaking on paragraph and then line boundaries."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current, size = [], [], 0
+    for paragraph in text.split("\n\n"):
+        pieces = [paragraph] if len(paragraph) <= max_chars else paragraph.split("\n")
+        for piece in pieces:
+            # A single oversized line is hard-split
+            for start in range(0, max(len(piece), 1), max_chars):
+                part = piece[start:start + max_chars]
+                if size + len(part) > max_chars and current:
+                    chunks.append("\n\n".join(current))
+                    current, size = [], 0
+                current.append(part)
+                size += len(part) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+def merge_analyses(analyses: list) -> dict:
+    """Merges per-chunk analyses into one, concatenating each list field without duplicates."""
+    merged = {}
+    for field in ANALYSIS_FIELDS:
+        seen, items = set(), []
+        for analysis in analyses:
+            values = analysis.get(field) or []
+            for item in values if isinstance(values, list) else [values]:
+                key = _normalize(str(item)).lower().rstrip(".")
+                if key and key not in seen:
+                    seen.add(key)
+                    items.append(item)
+        merged[field] = items
+    return merged
+
+async def analyze_full_text(title: str, text: str) -> dict:
+    """Analyzes a full paper by running its token-bounded chunks concurrently and merging the results.
+
+    Each chunk is analyzed with the full-text prompt, which tells the model which section of
+    the paper it is reading, and cached under that prompt's version.
+    """
+    chunks = split_into_chunks(text, settings.analysis_chunk_tokens)
+    semaphore = asyncio.Semaphore(settings.openai_max_concurrency)
+
+    async def analyze_chunk(section, chunk):
+        key = cache_key(title, chunk, section=(section, len(chunks)))
+        cached = await analysis_cache.get(key)
+        if cached is not None:
+            return cached
+        async with semaphore:
+            analysis = await _call_openai(full_text_prompt(title, chunk, section, len(chunks)))
+        await analysis_cache.set(key, analysis)
+        return analysis
+
+    analyses = await asyncio.gather(*(analyze_chunk(section, chunk) for section, chunk in enumerate(chunks, 1)))
+    logging.info(f"Analyzed '{title[:60]}' in {len(chunks)} chunk(s)")
+    return merge_analyses(analyses)
@@ -0,0 +1,180 @@
+import atexit
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, BinaryIO, List, Optional, Tuple
+
+from scipaper.config import settings
+
+PYPDF2 = "pypdf2"
+PDFMINER = "pdfminer"
+
+# Pages PyPDF2 is tried on before committing to it for the whole document
+QUALITY_SAMPLE_PAGES = 3
+# Share of letters, digits, whitespace and common punctuation below which PyPDF2 output is
+# treated as garbled (broken font encodings, missing spaces) and pdfminer is used instead
+MIN_QUALITY = 0.85
+MIN_CHARS_PER_PAGE = 200
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    pages: int
+    extractor: str
+    duration_ms: int = 0
+
+
+def sha256_hex(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+
+def text_quality(text: str) -> float:
+    """Scores extracted text from 0 to 1 by the share of characters that look like real prose."""
+    if not text:
+        return 0.0
+    good = sum(1 for ch in text if ch.isalnum() or ch.isspace() or ch in ".,;:()[]-'\"%/")
+    words = text.split()
+    # Text extracted without spaces collapses into very long "words"
+    spacing = 1.0 if not words or len(text) / len(words) < 12 else 0.5
+    return good / len(text) * spacing
+
+
+def _extract_pages(path: str, extractor: str, start: int, end: int) -> str:
+    """Extracts pages [start, end) of the PDF at `path`. Runs inside a pool worker process."""
+    if extractor == PDFMINER:
+        from pdfminer.high_level import extract_text
+        return extract_text(path, page_numbers=list(range(start, end)))
+
+    import PyPDF2
+    reader = PyPDF2.PdfReader(path)
+    return "\n\n".join(reader.pages[i].extract_text() or "" for i in range(start, end))
+
+
+def _page_count(path: str) -> int:
+    import PyPDF2
+    return len(PyPDF2.PdfReader(path).pages)
+
+
+def count_pages(stream: BinaryIO) -> Optional[int]:
+    """Counts pages by parsing a seekable PDF file object, or returns None when it cannot be parsed.
+
+    Only the cross-reference table and page tree are read, not the page contents.
+    """
+    import PyPDF2
+    position = stream.tell()
+    try:
+        stream.seek(0)
+        return len(PyPDF2.PdfReader(stream).pages)
+    except Exception as e:
+        logging.info(f"Could not count the pages of the PDF: {e}")
+        return None
+    finally:
+        stream.seek(position)
+
+
+def choose_extractor(path: str, pages: int) -> str:
+    """Prefers the faster PyPDF2 unless its output on a sample of pages looks garbled or empty."""
+    sample_end = min(pages, QUALITY_SAMPLE_PAGES)
+    try:
+        sample = _extract_pages(path, PYPDF2, 0, sample_end)
+    except Exception as e:
+        logging.info(f"PyPDF2 failed on sample pages ({e}), using pdfminer")
+        return PDFMINER
+    if len(sample.strip()) < MIN_CHARS_PER_PAGE * sample_end / 2 or text_quality(sample) < MIN_QUALITY:
+        return PDFMINER
+    return PYPDF2
+
+
+# The worker pool: None until first needed, False where no pool can run
+_pool: Any = None
+
+
+def _create_pool():
+    """Starts a billiard pool, or returns False where processes cannot be started.
+
+    Extraction runs in Celery prefork children, which are daemonic: stdlib multiprocessing
+    refuses to start processes from them, but billiard (Celery's fork of it) allows it. Without
+    billiard, a pool is only started outside daemonic processes.
+    """
+    try:
+        import billiard as processes
+    except ImportError:
+        if multiprocessing.current_process().daemon:
+            logging.warning("billiard is not installed and this process is daemonic: extracting PDFs in-process")
+            return False
+        processes = multiprocessing
+    try:
+        pool = processes.Pool(processes=settings.pdf_extraction_workers or os.cpu_count() or 1)
+    except OSError as e:
+        logging.warning(f"PDF extraction pool unavailable ({e!r}): extracting PDFs in-process")
+        return False
+    atexit.register(pool.terminate)
+    return pool
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = _create_pool()
+    return _pool or None
+
+
+def shutdown_pool():
+    global _pool
+    if _pool:
+        _pool.terminate()
+        _pool.join()
+    _pool = None
+
+
+def _page_ranges(pages: int, parts: int) -> List[Tuple[int, int]]:
+    size = -(-pages // parts)
+    return [(start, min(start + size, pages)) for start in range(0, pages, size)]
+
+
+def _extract_parallel(path: str, extractor: str, pages: int) -> str:
+    """Spreads page ranges over the worker pool, or extracts in this process where no pool can run."""
+    pool = _get_pool()
+    if pool is None:
+        return _extract_pages(path, extractor, 0, pages)
+    workers = settings.pdf_extraction_workers or os.cpu_count() or 1
+    results = [pool.apply_async(_extract_pages, (path, extractor, start, end)) for start, end in _page_ranges(pages, workers * 2)]
+    return "\n\n".join(result.get() for result in results)
+
+
+def extract_text(pdf_content: bytes) -> ExtractionResult:
+    """Extracts the full text of a PDF with the best-suited extractor.
+
+    Large documents are split into page ranges that are parsed in parallel worker processes.
+    """
+    start_time = time.perf_counter()
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(pdf_content)
+        path = tmp.name
+    try:
+        pages = _page_count(path)
+        extractor = choose_extractor(path, pages)
+        if pages >= settings.pdf_parallel_min_pages:
+            text = _extract_parallel(path, extractor, pages)
+        else:
+            text = _extract_pages(path, extractor, 0, pages)
+    finally:
+        os.unlink(path)
+
+    duration_ms = int((time.perf_counter() - start_time) * 1000)
+    logging.info(f"Extracted {pages} pages with {extractor} in {duration_ms}ms")
+    return ExtractionResult(text=text, pages=pages, extractor=extractor, duration_ms=duration_ms)
@@ -0,0 +1,169 @@
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, AsyncIterator, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scipaper import crud_async, schemas
+from scipaper.config import settings
+from scipaper.database import AsyncSessionLocal
+from scipaper.services.llm import LLMClient
+
+# Bump whenever the prompt below changes, so stored proposals record which prompt wrote them
+PROMPT_VERSION = 1
+SECTIONS = ["Title", "Summary", "Background and preliminary work", "Specific aims", "Approach",
+            "Expected outcomes and impact", "Fit with the call"]
+# Analysis fields quoted in the prompt, and how many items of each
+ANALYSIS_FIELDS = ["findings", "methods", "gaps", "limitations"]
+MAX_ANALYSIS_ITEMS = 5
+
+SYSTEM_PROMPT = (
+    "You are an experienced grant writer helping a researcher draft a funding proposal. Build on the "
+    "researcher's own work as described, do not invent results or citations, and write in Markdown."
+)
+
+
+@dataclass
+class ProposalContext:
+    """Everything a proposal is drafted from, loaded before the response starts streaming."""
+    user: Any
+    domain: str
+    papers: List[Any]
+    analyses: Dict[uuid.UUID, Any] = field(default_factory=dict)
+    grants: List[Any] = field(default_factory=list)
+    # True when the caller chose the call; otherwise `grants` are the best matches of the papers
+    grant_requested: bool = False
+    instructions: str = ""
+
+    def describe(self) -> dict:
+        return {
+            "user_id": str(self.user.id),
+            "domain": self.domain,
+            "paper_ids": [str(paper.id) for paper in self.papers],
+            "analysis_ids": [str(analysis.id) for analysis in self.analyses.values()],
+            "grant_ids": [str(_grant_id(grant)) for grant in self.grants],
+        }
+
+
+def _grant_id(grant: Any) -> uuid.UUID:
+    # Grant rows, or the grant_id rows of stored paper-to-grant matches
+    return grant.grant_id if hasattr(grant, "grant_id") else grant.id
+
+
+async def build_context(db: AsyncSession, request: schemas.ProposalRequest) -> ProposalContext:
+    """Loads the user, their papers with the latest analysis of each, and the call(s) to write for.
+
+    Raises LookupError when the user or requested grant does not exist, and ValueError when no
+    papers can be found to build on.
+    """
+    user = await crud_async.get_user(db, request.user_id)
+    if user is None:
+        raise LookupError("User not found")
+    if request.paper_ids:
+        found = {paper.id: paper for paper in await crud_async.get_papers_by_ids(db, request.paper_ids[:settings.proposal_max_papers])}
+        papers = [found[paper_id] for paper_id in request.paper_ids if paper_id in found]
+    elif user.name:
+        papers = await crud_async.get_author_papers(db, user.name, settings.proposal_max_papers)
+    else:
+        papers = []
+    if not papers:
+        raise ValueError("No papers to build the proposal on. Pass paper_ids, or set the user's name as it appears on their papers.")
+
+    paper_ids = [paper.id for paper in papers]
+    analyses = {analysis.paper_id: analysis for analysis in await crud_async.get_latest_analyses(db, paper_ids)}
+    if request.grant_id:
+        grant = await crud_async.get_grant(db, request.grant_id)
+        if grant is None:
+            raise LookupError("Grant not found")
+        grants = [grant]
+    else:
+        grants = await crud_async.get_papers_grant_matches(db, paper_ids, date.today(), settings.proposal_max_grants)
+    return ProposalContext(user=user, domain=" ".join(request.domain.split()), papers=papers, analyses=analyses,
+                           grants=grants, grant_requested=request.grant_id is not None, instructions=(request.instructions or "").strip())
+
+
+def _paper_block(paper: Any, analysis: Any) -> str:
+    lines = [f"- {paper.title} ({paper.year or 'n.d.'}{', ' + paper.journal if paper.journal else ''})"]
+    if paper.abstract:
+        abstract = " ".join(paper.abstract.split())
+        if len(abstract) > settings.proposal_abstract_chars:
+            abstract = abstract[:settings.proposal_abstract_chars].rsplit(" ", 1)[0] + " ..."
+        lines.append(f"  Abstract: {abstract}")
+    if analysis is not None:
+        for name in ANALYSIS_FIELDS:
+            items = getattr(analysis, name) or []
+            if isinstance(items, list) and items:
+                lines.append(f"  {name.capitalize()}: " + "; ".join(str(item) for item in items[:MAX_ANALYSIS_ITEMS]))
+    return "\n".join(lines)
+
+
+def _grant_block(grant: Any) -> str:
+    details = [detail for detail in (grant.agency, f"deadline {grant.deadline.isoformat()}" if grant.deadline else None) if detail]
+    line = f"- {grant.title}" + (f" ({', '.join(details)})" if details else "")
+    return line + (f"\n  Topics: {', '.join(grant.tags)}" if grant.tags else "")
+
+
+def build_messages(context: ProposalContext) -> List[Dict[str, str]]:
+    researcher = context.user.name or context.user.email
+    if context.user.affiliation:
+        researcher += f", {context.user.affiliation}"
+    parts = [
+        f"Draft a research funding proposal in the domain of \"{context.domain}\" for {researcher}.",
+        "The researcher's papers, with findings and open questions from their analyses:\n"
+        + "\n".join(_paper_block(paper, context.analyses.get(paper.id)) for paper in context.papers),
+    ]
+    if context.grants:
+        target = "The call to write for:" if context.grant_requested else "Open calls that match this work; write for the best fit and name it:"
+        parts.append(target + "\n" + "\n".join(_grant_block(grant) for grant in context.grants))
+    parts.append("Use these sections, as Markdown headings: " + ", ".join(SECTIONS) + ".")
+    if context.instructions:
+        parts.append(f"Additional instructions from the researcher: {context.instructions}")
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "\n\n".join(parts)}]
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_proposal(context: ProposalContext, llm: LLMClient) -> AsyncIterator[str]:
+    """Streams a proposal as server-sent events and stores it once complete.
+
+    Events: `context` (the papers, analyses and grants used) as soon as the stream opens, one
+    `token` per fragment the model produces, then `done` with the stored proposal's id, or
+    `error`. A draft whose client disconnects or whose model call fails is not stored. The
+    proposal is saved on its own session, since the request's may be closed by then.
+    """
+    start = time.perf_counter()
+    yield _event("context", context.describe())
+    fragments, first_token_ms = [], None
+    try:
+        async for fragment in llm.stream(build_messages(context)):
+            if first_token_ms is None:
+                first_token_ms = int((time.perf_counter() - start) * 1000)
+            fragments.append(fragment)
+            yield _event("token", {"text": fragment})
+    except Exception as e:
+        logging.error(f"Proposal generation for user {context.user.id} failed: {e}")
+        yield _event("error", {"detail": str(e)})
+        return
+
+    duration_ms = int((time.perf_counter() - start) * 1000)
+    content = {
+        "text": "".join(fragments),
+        "model": llm.model,
+        "prompt_version": PROMPT_VERSION,
+        "context": context.describe(),
+        "first_token_ms": first_token_ms,
+        "duration_ms": duration_ms,
+    }
+    async with AsyncSessionLocal() as session:
+        proposal = await crud_async.create_proposal(session, schemas.ProposalCreate(
+            user_id=context.user.id, domain=context.domain, content=content,
+        ))
+    logging.info(f"Generated proposal {proposal.id} for user {context.user.id} in {duration_ms}ms "
+                 f"(first token after {first_token_ms}ms)")
+    yield _event("done", {"proposal_id": str(proposal.id), "first_token_ms": first_token_ms, "duration_ms": duration_ms})
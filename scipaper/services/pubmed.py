@@ -1,47 +1,185 @@
-import httpx
-from typing import List, Dict, Any
+from typing import AsyncIterator, BinaryIO, Iterator, List, Dict, Any, Optional, Union
+import logging
 import xml.etree.ElementTree as ET
 
-BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+from scipaper.config import settings
+from scipaper.services.harvest import HarvestPage, iter_xml_elements
+from scipaper.services.http_client import get_client
+
+def _params(**params) -> Dict[str, Any]:
+    """Adds the NCBI API key, when configured, to E-utilities parameters."""
+    if settings.ncbi_api_key:
+        params["api_key"] = settings.ncbi_api_key
+    return params
+
+# MEDLINE <Language> codes (ISO 639-2) of the most common languages, mapped to the ISO 639-1
+# codes that papers from other sources use; anything else is kept as is
+LANGUAGES = {
+    "eng": "en", "fre": "fr", "ger": "de", "spa": "es", "ita": "it", "por": "pt", "rus": "ru",
+    "chi": "zh", "jpn": "ja", "kor": "ko", "dut": "nl", "pol": "pl", "tur": "tr", "swe": "sv",
+}
+
+def _text(element: Optional[ET.Element]) -> str:
+    """All text inside an element, including inline markup such as <i> or <sup>, whitespace-collapsed."""
+    if element is None:
+        return ""
+    return " ".join("".join(element.itertext()).split())
+
+def _abstract(article: ET.Element) -> str:
+    """Joins the <AbstractText> sections, prefixing structured sections with their label."""
+    sections = []
+    for section in article.iterfind('MedlineCitation/Article/Abstract/AbstractText'):
+        text = _text(section)
+        label = section.get('Label')
+        if text:
+            sections.append(f"{label}: {text}" if label else text)
+    return "\n".join(sections)
+
+def _authors(article: ET.Element) -> List[Dict[str, Any]]:
+    authors = []
+    for author in article.iterfind('MedlineCitation/Article/AuthorList/Author'):
+        if author.get('ValidYN') == 'N':
+            continue
+        name = _text(author.find('CollectiveName')) or " ".join(
+            part for part in (_text(author.find('ForeName')) or _text(author.find('Initials')), _text(author.find('LastName'))) if part
+        )
+        if not name:
+            continue
+        entry = {"name": name}
+        affiliations = [_text(affiliation) for affiliation in author.iterfind('AffiliationInfo/Affiliation')]
+        if any(affiliations):
+            entry["affiliations"] = [affiliation for affiliation in affiliations if affiliation]
+        for identifier in author.iterfind('Identifier'):
+            if identifier.get('Source') == 'ORCID' and identifier.text:
+                entry["orcid"] = identifier.text.strip().rsplit('/', 1)[-1]
+        authors.append(entry)
+    return authors
+
+def _year(article: ET.Element) -> Optional[int]:
+    """Issue publication year, falling back to MedlineDate ("1998 Dec-1999 Jan") and the electronic date."""
+    pub_date = article.find('MedlineCitation/Article/Journal/JournalIssue/PubDate')
+    candidates = []
+    if pub_date is not None:
+        candidates += [_text(pub_date.find('Year')), _text(pub_date.find('MedlineDate'))[:4]]
+    candidates.append(_text(article.find('MedlineCitation/Article/ArticleDate/Year')))
+    for candidate in candidates:
+        if candidate.isdigit():
+            return int(candidate)
+    return None
+
+def _doi(article: ET.Element) -> Optional[str]:
+    for article_id in article.iterfind('PubmedData/ArticleIdList/ArticleId'):
+        if article_id.get('IdType') == 'doi' and article_id.text:
+            return article_id.text.strip()
+    for location in article.iterfind('MedlineCitation/Article/ELocationID'):
+        if location.get('EIdType') == 'doi' and location.text:
+            return location.text.strip()
+    return None
+
+def _parse_article(article: ET.Element) -> Dict[str, Any]:
+    """Converts one <PubmedArticle> into an article dict."""
+    pmid = _text(article.find('MedlineCitation/PMID'))
+    journal = article.find('MedlineCitation/Article/Journal')
+    language = _text(article.find('MedlineCitation/Article/Language')).lower()
+    return {
+        "source": "pubmed",
+        "source_id": pmid,
+        "title": _text(article.find('MedlineCitation/Article/ArticleTitle')) or "No title found",
+        "abstract": _abstract(article),
+        "authors": _authors(article),
+        "journal": (_text(journal.find('Title')) or _text(journal.find('ISOAbbreviation'))) if journal is not None else None,
+        "year": _year(article),
+        "doi": _doi(article),
+        "language": LANGUAGES.get(language, language) or None,
+        "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else None,
+        "mesh_terms": [
+            _text(descriptor) for descriptor in article.iterfind('MedlineCitation/MeshHeadingList/MeshHeading/DescriptorName')
+        ],
+    }
+
+def parse_pubmed_xml(source: Union[str, BinaryIO]) -> Iterator[Dict[str, Any]]:
+    """Parses a saved efetch response (a path or binary file) one <PubmedArticle> at a time.
+
+    The blocking counterpart of the streaming parser used for live requests: every article is
+    cleared from the tree once parsed, so memory stays flat however many records the file has.
+    """
+    root = None
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        if element.tag == 'PubmedArticle':
+            yield _parse_article(element)
+            root.clear()
+
+async def _esearch(query: str, retmax: int) -> Dict[str, Any]:
+    """Runs an esearch on the history server and returns the `esearchresult` object."""
+    params = _params(
+        db="pubmed",
+        term=query,
+        retmax=retmax,
+        usehistory="y",
+        retmode="json"
+    )
+    response = await get_client("pubmed").get("esearch.fcgi", params=params)
+    return response.json()["esearchresult"]
+
+async def _efetch(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """POSTs an efetch request and parses the streamed XML one article at a time."""
+    articles = []
+    async with get_client("pubmed").stream("POST", "efetch.fcgi", data=_params(db="pubmed", retmode="xml", **data)) as response:
+        async for element in iter_xml_elements(response, 'PubmedArticle'):
+            articles.append(_parse_article(element))
+    return articles
 
 async def search_pubmed(query: str, max_results: int = 10) -> List[str]:
     """Search PubMed for a given query and return a list of article IDs."""
-    async with httpx.AsyncClient() as client:
-        params = {
-            "db": "pubmed",
-            "term": query,
-            "retmax": max_results,
-            "usehistory": "y",
-            "retmode": "json"
-        }
-        response = await client.get(f"{BASE_URL}esearch.fcgi", params=params)
-        response.raise_for_status()
-        data = response.json()
-        return data["esearchresult"]["idlist"]
+    result = await _esearch(query, max_results)
+    return result["idlist"]
 
 async def fetch_pubmed_articles(article_ids: List[str]) -> List[Dict[str, Any]]:
     """Fetch the details of a list of PubMed articles by their IDs."""
-    async with httpx.AsyncClient() as client:
-        params = {
-            "db": "pubmed",
-            "id": ",".join(article_ids),
-            "retmode": "xml"
-        }
-        response = await client.get(f"{BASE_URL}efetch.fcgi", params=params)
-        response.raise_for_status()
-        
-        root = ET.fromstring(response.content)
-        articles = []
-        for article in root.findall('.//PubmedArticle'):
-            title_element = article.find('.//ArticleTitle')
-            title = title_element.text if title_element is not None else "No title found"
-            
-            pmid_element = article.find('.//PMID')
-            pmid = pmid_element.text if pmid_element is not None else ""
-
-            articles.append({
-                "source": "pubmed",
-                "source_id": pmid,
-                "title": title,
-            })
-        return articles
+    if not article_ids:
+        return []
+    return await _efetch({"id": ",".join(article_ids)})
+
+async def harvest_pubmed(query: str, max_results: Optional[int] = None, page_size: Optional[int] = None,
+                         start: int = 0, webenv: Optional[str] = None, query_key: Optional[str] = None) -> AsyncIterator[HarvestPage]:
+    """Pages through PubMed results via the history server, yielding one parsed page at a time.
+
+    A single esearch stores the result set as WebEnv/QueryKey; each page is then fetched with
+    efetch using retstart/retmax. Pass `start`, `webenv` and `query_key` to resume a harvest.
+    The harvest ends once `start` reaches the result count; an empty page before that is
+    skipped, or taken as an expired session when resuming.
+    """
+    page_size = page_size or settings.harvest_page_size
+    total = None
+    fresh_session = webenv is None or query_key is None
+    if fresh_session:
+        result = await _esearch(query, retmax=0)
+        webenv, query_key, total = result["webenv"], result["querykey"], int(result["count"])
+
+    while (max_results is None or start < max_results) and (total is None or start < total):
+        retmax = page_size if max_results is None else min(page_size, max_results - start)
+        articles = await _efetch({"WebEnv": webenv, "query_key": query_key, "retstart": start, "retmax": retmax})
+        # Offsets count records in the result set, not parsed articles: PubmedBookArticle records
+        # are skipped by the parser, so a page can hold fewer articles than it covers
+        next_start = start + retmax if total is None else min(start + retmax, total)
+
+        if not articles:
+            if fresh_session:
+                # A page of book records only; the result set goes on
+                logging.info(f"PubMed page {start}-{next_start} for '{query}' had no journal articles.")
+                start = next_start
+                continue
+            # History sessions expire after a few hours; start a new one and carry on from `start`
+            logging.info(f"PubMed history session for '{query}' returned no results at {start}, starting a new one.")
+            result = await _esearch(query, retmax=0)
+            webenv, query_key, total = result["webenv"], result["querykey"], int(result["count"])
+            fresh_session = True
+            continue
+
+        yield HarvestPage(articles=articles, start=start, next_start=next_start, total=total,
+                          webenv=webenv, query_key=query_key)
+        start = next_start
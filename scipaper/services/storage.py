@@ -0,0 +1,182 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from scipaper.config import settings
+
+# Supabase's resumable (TUS) endpoint requires every chunk but the last to be exactly 6 MiB
+TUS_CHUNK_SIZE = 6 * 1024 * 1024
+TUS_MAX_RETRIES = 5
+
+# Page objects in an uncompressed PDF; "/Type /Pages" (the page tree) must not match, so the
+# character after the name is part of the match and a marker at a chunk edge waits for it
+_PAGE_PATTERN = re.compile(rb"/Type\s*/Page[^a-zA-Z]")
+# Bytes kept between chunks so a marker split across a chunk boundary is still found
+_PAGE_PATTERN_OVERLAP = 16
+
+
+class PdfStreamInspector:
+    """Hashes an upload and counts its visible page objects while the bytes stream past."""
+
+    def __init__(self):
+        self._sha256 = hashlib.sha256()
+        self._tail = b""
+        self.size = 0
+        self.page_markers = 0
+
+    def feed(self, chunk: bytes):
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+        window = self._tail + chunk
+        # Only count matches that end inside the new bytes, so none is counted twice
+        self.page_markers += sum(1 for m in _PAGE_PATTERN.finditer(window) if m.end() > len(self._tail))
+        self._tail = window[-_PAGE_PATTERN_OVERLAP:]
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def pages(self) -> Optional[int]:
+        """Page count from the page objects seen in the raw bytes.
+
+        None when no page object is visible, which is the case for most PDFs written since
+        PDF 1.5: their page objects sit inside compressed object streams. Callers then need a
+        parser's count (see pdf_extraction.count_pages).
+        """
+        return self.page_markers or None
+
+
+class StorageBackend(ABC):
+    """Stores uploaded files. Uploads consume an async stream of chunks and never hold the whole file."""
+
+    @abstractmethod
+    async def upload(self, path: str, chunks: AsyncIterator[bytes], size: int, content_type: str):
+        """Stores `size` bytes read from `chunks` at `path`."""
+
+    @abstractmethod
+    async def download(self, path: str) -> bytes:
+        """Returns the contents of the file stored at `path`."""
+
+
+class LocalStorage(StorageBackend):
+    """Filesystem storage under `root`, for development and offline tests."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, path: str) -> Path:
+        full_path = (self.root / path).resolve()
+        if self.root.resolve() not in full_path.parents:
+            raise ValueError(f"Invalid storage path '{path}'")
+        return full_path
+
+    async def upload(self, path: str, chunks: AsyncIterator[bytes], size: int, content_type: str):
+        full_path = self._path(path)
+        await asyncio.to_thread(full_path.parent.mkdir, parents=True, exist_ok=True)
+        partial = full_path.with_suffix(full_path.suffix + ".part")
+        handle = await asyncio.to_thread(open, partial, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(handle.write, chunk)
+        finally:
+            await asyncio.to_thread(handle.close)
+        await asyncio.to_thread(os.replace, partial, full_path)
+
+    async def download(self, path: str) -> bytes:
+        return await asyncio.to_thread(self._path(path).read_bytes)
+
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage. Uploads use the resumable TUS protocol in fixed-size chunks."""
+
+    def __init__(self, url: str, service_key: str, bucket: str):
+        self.url = url.rstrip("/")
+        self.service_key = service_key
+        self.bucket = bucket
+        self._client = None
+
+    def _storage_client(self):
+        if self._client is None:
+            from supabase import create_client
+            self._client = create_client(self.url, self.service_key)
+        return self._client
+
+    def _headers(self, **extra) -> dict:
+        return {"Authorization": f"Bearer {self.service_key}", "apikey": self.service_key, "Tus-Resumable": "1.0.0", **extra}
+
+    @staticmethod
+    def _metadata(**values) -> str:
+        return ",".join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in values.items())
+
+    async def _send_chunk(self, client: httpx.AsyncClient, location: str, chunk: bytes, offset: int) -> int:
+        """PATCHes one chunk, resuming from the server's offset after a failed attempt."""
+        sent = 0
+        for attempt in range(TUS_MAX_RETRIES + 1):
+            try:
+                response = await client.patch(location, content=chunk[sent:], headers=self._headers(**{
+                    "Upload-Offset": str(offset + sent),
+                    "Content-Type": "application/offset+octet-stream",
+                }))
+                response.raise_for_status()
+                return int(response.headers["Upload-Offset"])
+            except httpx.HTTPError as e:
+                if attempt == TUS_MAX_RETRIES:
+                    raise
+                logging.warning(f"Upload chunk at offset {offset + sent} failed ({e!r}), resuming")
+                await asyncio.sleep(2 ** attempt)
+                head = await client.head(location, headers=self._headers())
+                head.raise_for_status()
+                sent = int(head.headers["Upload-Offset"]) - offset
+                if sent >= len(chunk):
+                    return offset + len(chunk)
+
+    async def upload(self, path: str, chunks: AsyncIterator[bytes], size: int, content_type: str):
+        async with httpx.AsyncClient(timeout=settings.http_timeout) as client:
+            response = await client.post(
+                f"{self.url}/storage/v1/upload/resumable",
+                headers=self._headers(**{
+                    "Upload-Length": str(size),
+                    "Upload-Metadata": self._metadata(bucketName=self.bucket, objectName=path, contentType=content_type or "application/octet-stream"),
+                    "x-upsert": "false",
+                }),
+            )
+            response.raise_for_status()
+            location = response.headers["Location"]
+
+            offset, buffer = 0, bytearray()
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                while len(buffer) >= TUS_CHUNK_SIZE:
+                    offset = await self._send_chunk(client, location, bytes(buffer[:TUS_CHUNK_SIZE]), offset)
+                    del buffer[:TUS_CHUNK_SIZE]
+            if buffer:
+                offset = await self._send_chunk(client, location, bytes(buffer), offset)
+
+    async def download(self, path: str) -> bytes:
+        # The storage SDK is synchronous; keep it off the event loop
+        return await asyncio.to_thread(self._storage_client().storage.from_(self.bucket).download, path)
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Returns the configured storage backend, creating it on first use."""
+    global _storage
+    if _storage is None:
+        if settings.storage_backend == "local":
+            _storage = LocalStorage(settings.local_storage_dir)
+        elif settings.storage_backend == "supabase":
+            _storage = SupabaseStorage(settings.supabase_url, settings.supabase_service_key, settings.storage_bucket)
+        else:
+            raise ValueError(f"Unknown storage backend '{settings.storage_backend}'. Choose from 'supabase' or 'local'.")
+    return _storage
@@ -0,0 +1,279 @@
+import asyncio
+import heapq
+import logging
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scipaper import crud, crud_async, models, schemas
+from scipaper.config import settings
+from scipaper.services.cache import build_cache
+
+COMPLETED = "completed"
+
+# Words that describe the structure of an abstract rather than its subject, on top of the
+# usual English stop words (structured PubMed abstracts are prefixed with their section label)
+SCIENTIFIC_STOP_WORDS = {
+    "abstract", "aim", "aims", "analysis", "approach", "background", "based", "conclusion", "conclusions",
+    "data", "design", "findings", "introduction", "method", "methods", "objective", "objectives", "paper",
+    "propose", "proposed", "purpose", "result", "results", "show", "shown", "shows", "studies", "study",
+    "use", "used", "using",
+}
+# Words of two or more characters that start with a letter, so numbers and units are skipped
+TOKEN_PATTERN = r"(?u)\b[^\W\d_][\w-]+\b"
+NGRAM_RANGE = (1, 2)
+# Extra weight of bursting and emerging terms when ranking a domain's representative papers
+TREND_BOOST = 2.0
+
+trend_cache = build_cache("trends", settings.trend_cache_backend, settings.trend_cache_ttl, 256)
+
+
+def normalize_domain(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def paper_text(paper: Any) -> str:
+    return "\n".join(part for part in (paper.title, paper.abstract, " ".join(paper.mesh_terms or [])) if part)
+
+
+def _vectorizer(vocabulary: Optional[Sequence[str]] = None):
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, CountVectorizer
+    return CountVectorizer(
+        binary=True,
+        ngram_range=NGRAM_RANGE,
+        token_pattern=TOKEN_PATTERN,
+        stop_words=sorted(ENGLISH_STOP_WORDS | SCIENTIFIC_STOP_WORDS),
+        vocabulary=vocabulary,
+        dtype=np.int32,
+    )
+
+
+def count_terms(papers: Sequence[Any]) -> Dict[Tuple[str, int], int]:
+    """Counts the papers mentioning each term, per (term, year), plus each year's paper total.
+
+    The whole batch is one sparse paper x term matrix; a (year x paper) indicator product turns
+    it into per-year counts. Papers without a year have no place in a time series and are skipped.
+    """
+    from scipy.sparse import csr_matrix
+
+    dated = [paper for paper in papers if paper.year]
+    if not dated:
+        return {}
+    years, year_rows = np.unique([paper.year for paper in dated], return_inverse=True)
+    counts = {(crud.TERM_TOTAL, int(year)): int(total) for year, total in zip(years, np.bincount(year_rows))}
+
+    vectorizer = _vectorizer()
+    try:
+        documents = vectorizer.fit_transform([paper_text(paper) for paper in dated])
+    except ValueError:
+        # Nothing but stop words in the whole batch
+        return counts
+    by_year = csr_matrix((np.ones(len(dated), dtype=np.int32), (year_rows, np.arange(len(dated)))), shape=(len(years), len(dated)))
+    matrix = (by_year @ documents).tocoo()
+    terms = vectorizer.get_feature_names_out()
+    counts.update({(str(terms[col]), int(years[row])): int(value) for row, col, value in zip(matrix.row, matrix.col, matrix.data)})
+    return counts
+
+
+def _term_list(indices, terms: Sequence[str], **columns: np.ndarray) -> List[dict]:
+    return [{"term": terms[i], **{name: round(values[i].item(), 6) for name, values in columns.items()}} for i in indices]
+
+
+def score_trends(rows: Sequence[Any]) -> Tuple[dict, List[str], np.ndarray, np.ndarray]:
+    """Turns stored (term, year, papers) counts into the domain's trends.
+
+    Returns (trends, terms, idf, profile): the JSON stored in `domain_trends.trends`, and the
+    vocabulary, IDF weights and term profile used to rank the domain's papers.
+    """
+    totals = {row.year: row.papers for row in rows if row.term == crud.TERM_TOTAL}
+    years = np.array(sorted(totals))
+    term_rows = [row for row in rows if row.term != crud.TERM_TOTAL and row.year in totals]
+    trends = {"papers": int(sum(totals.values())), "years": years.tolist(), "papers_per_year": [totals[year] for year in years.tolist()],
+              "top_terms": {}, "bursts": [], "emerging": [], "series": {}}
+    terms = sorted({row.term for row in term_rows})
+    if not terms:
+        return trends, [], np.empty(0), np.empty(0)
+
+    term_index = {term: i for i, term in enumerate(terms)}
+    year_index = {int(year): i for i, year in enumerate(years)}
+    counts = np.zeros((len(terms), len(years)))
+    counts[[term_index[row.term] for row in term_rows], [year_index[row.year] for row in term_rows]] = [row.papers for row in term_rows]
+    year_totals = np.array([totals[year] for year in years.tolist()], dtype=float)
+    total = year_totals.sum()
+
+    papers = counts.sum(axis=1)
+    idf = np.log((1 + total) / (1 + papers)) + 1
+    # Share of each year's papers that mention the term, so growth of the field itself is not a trend
+    shares = counts / np.maximum(year_totals, 1)
+    tfidf = shares * idf[:, None]
+    limit = settings.trend_top_terms
+    significant = counts[:, -1] >= settings.trend_min_papers
+
+    for column in range(max(0, len(years) - settings.trend_recent_years), len(years)):
+        order = [i for i in np.argsort(-tfidf[:, column])[:limit] if counts[i, column]]
+        trends["top_terms"][str(years[column])] = _term_list(order, terms, score=tfidf[:, column], papers=counts[:, column].astype(int))
+
+    # Bursts: the latest year's share against the baseline years before it, as a z-score. The
+    # binomial sampling noise of the latest share keeps rare terms from bursting by chance.
+    baseline = shares[:, max(0, len(years) - 1 - settings.trend_baseline_years):-1]
+    if baseline.shape[1] >= 2:
+        mean, std = baseline.mean(axis=1), baseline.std(axis=1)
+        expected = np.clip(mean, 1 / year_totals[-1], 1 - 1 / year_totals[-1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = (shares[:, -1] - mean) / np.sqrt(std ** 2 + expected * (1 - expected) / year_totals[-1])
+        candidates = np.flatnonzero(significant & (z >= settings.trend_burst_z))
+        order = candidates[np.argsort(-z[candidates])][:limit]
+        trends["bursts"] = _term_list(order, terms, z=z, papers=counts[:, -1].astype(int), share=shares[:, -1], baseline_share=mean)
+
+    # Emerging: the steepest least-squares growth in share over the recent years, favouring specific terms
+    window = shares[:, -settings.trend_recent_years:]
+    if window.shape[1] >= 3:
+        x = years[-window.shape[1]:].astype(float)
+        x -= x.mean()
+        slope = window @ x / (x @ x)
+        candidates = np.flatnonzero(significant & (slope > 0))
+        order = candidates[np.argsort(-(slope * idf)[candidates])][:limit]
+        trends["emerging"] = _term_list(order, terms, growth_per_year=slope, papers=counts[:, -1].astype(int), share=shares[:, -1])
+
+    trending = list(dict.fromkeys(entry["term"] for entry in trends["bursts"] + trends["emerging"]))
+    overall = [terms[i] for i in np.argsort(-tfidf[:, -settings.trend_recent_years:].sum(axis=1))[:limit]]
+    trends["series"] = {term: np.round(shares[term_index[term]], 6).tolist() for term in list(dict.fromkeys(trending + overall))[:2 * limit]}
+
+    profile = papers / total * idf
+    profile[np.array([term_index[term] for term in trending], dtype=int)] *= TREND_BOOST
+    return trends, terms, idf, profile
+
+
+def rank_papers(papers: Sequence[Any], terms: Sequence[str], idf: np.ndarray, profile: np.ndarray) -> List[dict]:
+    """Scores papers by the cosine similarity of their TF-IDF vector to the domain's term profile."""
+    if not papers or not len(terms):
+        return []
+    from scipy.sparse import diags
+    from sklearn.preprocessing import normalize
+
+    documents = normalize(_vectorizer(vocabulary=terms).transform([paper_text(paper) for paper in papers]) @ diags(idf))
+    scores = documents @ (profile / np.linalg.norm(profile))
+    return [
+        {"paper_id": str(paper.id), "title": paper.title, "year": paper.year, "journal": paper.journal, "score": round(float(score), 6)}
+        for paper, score in zip(papers, scores) if score > 0
+    ]
+
+
+def _best(papers) -> List[dict]:
+    return heapq.nlargest(settings.trend_top_papers, papers, key=lambda paper: paper["score"])
+
+
+def trend_payload(trend: models.DomainTrend) -> dict:
+    return {
+        "id": str(trend.id),
+        "domain_id": str(trend.domain_id),
+        "status": trend.status,
+        "duration_ms": trend.duration_ms,
+        "trends": trend.trends,
+        "top_papers": trend.top_papers,
+        "funding": trend.funding,
+        "created_at": trend.created_at.isoformat(),
+    }
+
+
+def _keyset(value: Optional[dict]) -> Optional[Tuple[datetime, uuid.UUID]]:
+    return (datetime.fromisoformat(value["created_at"]), uuid.UUID(value["paper_id"])) if value else None
+
+
+async def update_domain_trends(db: AsyncSession, name: str,
+                               on_batch: Optional[Callable[[int], Awaitable[Any]]] = None) -> models.DomainTrend:
+    """Brings a domain's term counts up to date and stores a new `domain_trends` row computed from them.
+
+    Only papers ingested since the last run are read: their per-(term, year) counts are added
+    to `domain_term_counts` batch by batch, each batch committed with the domain's (created_at,
+    id) watermark so an interrupted run resumes where it stopped. Trends are then scored from
+    the stored counts alone, and the new papers compete with the previous top papers.
+    """
+    start = time.perf_counter()
+    name = normalize_domain(name)
+    domain = await crud_async.get_or_create_domain(db, name)
+    domain_id = domain.id
+    previous = await crud_async.get_latest_domain_trend(db, domain_id)
+    ranked_through = _keyset((previous.trends or {}).get("through")) if previous is not None else None
+    previous_top = [uuid.UUID(paper["paper_id"]) for paper in (previous.top_papers or [])] if previous is not None else []
+    until = datetime.now(timezone.utc) - timedelta(seconds=settings.trend_ingest_lag_seconds)
+
+    # 1. Add the counts of new papers
+    watermark = (domain.last_paper_created_at, domain.last_paper_id)
+    counted = 0
+    while True:
+        after = watermark if watermark[1] is not None else None
+        papers = await crud_async.get_domain_papers(db, name, after, until, settings.trend_batch_size)
+        if not papers:
+            break
+        counts = await asyncio.to_thread(count_terms, papers)
+        rows = [{"domain_id": domain_id, "term": term, "year": year, "papers": n} for (term, year), n in counts.items()]
+        through = (papers[-1].created_at, papers[-1].id)
+        if not await crud_async.add_domain_term_counts(db, domain_id, rows, watermark, through):
+            raise RuntimeError(f"Trends of domain '{name}' are being updated by another run.")
+        watermark = through
+        counted += len(papers)
+        if on_batch is not None:
+            await on_batch(counted)
+
+    # 2. Score trends from the stored counts
+    counts = await crud_async.get_domain_term_counts(db, domain_id, settings.trend_min_papers)
+    trends, terms, idf, profile = await asyncio.to_thread(score_trends, counts)
+
+    # 3. Rank the previous top papers and every paper since the last completed run
+    candidates = await crud_async.get_papers_by_ids(db, previous_top) if previous_top else []
+    top = {paper["paper_id"]: paper for paper in await asyncio.to_thread(rank_papers, candidates, terms, idf, profile)}
+    after = ranked_through
+    while True:
+        papers = await crud_async.get_domain_papers(db, name, after, until, settings.trend_batch_size)
+        if not papers:
+            break
+        top.update((paper["paper_id"], paper) for paper in await asyncio.to_thread(rank_papers, papers, terms, idf, profile))
+        top = {paper["paper_id"]: paper for paper in _best(top.values())}
+        after = (papers[-1].created_at, papers[-1].id)
+
+    # 4. Open grant calls closest to the domain's term profile
+    from scipaper.services import grant_matching
+    grants = await crud_async.get_open_grants(db, date.today())
+    funding = await asyncio.to_thread(grant_matching.match_domain, grants, terms, profile)
+
+    if watermark[1] is not None:
+        trends["through"] = {"created_at": watermark[0].isoformat(), "paper_id": str(watermark[1])}
+    trends["new_papers"] = counted
+    trend = await crud_async.create_domain_trend(db, schemas.DomainTrendCreate(
+        domain_id=domain_id,
+        status=COMPLETED,
+        duration_ms=int((time.perf_counter() - start) * 1000),
+        trends=trends,
+        top_papers=_best(top.values()),
+        funding=funding,
+    ))
+    await trend_cache.set(name, trend_payload(trend))
+    logging.info(f"Updated trends of '{name}' in {trend.duration_ms}ms: {counted} new papers, "
+                 f"{len(terms)} terms over {trends['papers']} papers")
+    return trend
+
+
+async def get_domain_trends(db: AsyncSession, name: str) -> Optional[dict]:
+    """The latest computed trends of a domain, or None if they have never been computed.
+
+    Refreshes run in Celery workers, whose cache writes a per-process cache never sees; so a cached
+    payload is only served while it is still the newest row, checked with one indexed lookup.
+    """
+    name = normalize_domain(name)
+    cached = await trend_cache.get(name)
+    if cached is not None:
+        latest = await crud_async.get_latest_domain_trend_time(db, name)
+        if latest is not None and datetime.fromisoformat(cached["created_at"]) >= latest:
+            return cached
+    domain = await crud_async.get_domain_by_name(db, name)
+    trend = await crud_async.get_latest_domain_trend(db, domain.id) if domain is not None else None
+    if trend is None:
+        return None
+    payload = trend_payload(trend)
+    await trend_cache.set(name, payload)
+    return payload
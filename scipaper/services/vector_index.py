@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from scipaper.config import settings
+
+ELASTICSEARCH = "elasticsearch"
+LOCAL = "local"
+
+
+@contextmanager
+def _exclusive_file_lock(path: Path):
+    """Holds an exclusive lock on `path` across processes (flock on POSIX, msvcrt on Windows)."""
+    with open(path, "a+b") as handle:
+        try:
+            import fcntl
+        except ImportError:
+            import msvcrt
+            handle.seek(0)
+            while True:
+                try:
+                    # LK_LOCK retries for about ten seconds before raising; keep waiting
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+class LocalVectorIndex:
+    """Paper embeddings in a memory-mapped float32 matrix on disk, searched by cosine similarity.
+
+    Rows are only ever appended or overwritten in place, so adds are incremental and the matrix
+    is paged in by the OS rather than loaded. The scan is exact; it suits offline tests and
+    collections up to a few hundred thousand papers.
+
+    The API and the Celery workers all write to it: adds hold a lock file across processes and
+    re-read ids.json under it, and searches reload when another process has replaced ids.json.
+    """
+
+    def __init__(self, directory: str, dimensions: int):
+        self.directory = Path(directory)
+        self.dimensions = dimensions
+        self._vectors_path = self.directory / "vectors.f32"
+        self._ids_path = self.directory / "ids.json"
+        self._lock_path = self.directory / "index.lock"
+        self._lock = threading.Lock()
+        # (inode, mtime, size) of the ids.json last loaded, to notice other processes' writes
+        self._ids_version: Optional[Tuple[int, int, int]] = None
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._load()
+
+    def _stored_version(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self._ids_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        version = self._stored_version()
+        ids = []
+        if version is not None:
+            meta = json.loads(self._ids_path.read_text())
+            if meta["dimensions"] != self.dimensions:
+                raise ValueError(f"Vector index at '{self.directory}' has {meta['dimensions']} dimensions, expected {self.dimensions}")
+            ids = meta["ids"]
+        self._ids, self._ids_version = ids, version
+        self._positions = {paper_id: position for position, paper_id in enumerate(self._ids)}
+        self._open()
+
+    def _reload_if_changed(self):
+        if self._stored_version() != self._ids_version:
+            with self._lock:
+                if self._stored_version() != self._ids_version:
+                    self._load()
+
+    def _open(self, mode: str = "r") -> Optional[np.memmap]:
+        # Only the rows listed in ids.json count, so a crash between the two writes is harmless
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(len(self._ids), self.dimensions)) if self._ids else None
+        return self._matrix
+
+    def __len__(self) -> int:
+        self._reload_if_changed()
+        return len(self._ids)
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        """Adds or replaces the vectors of the given papers."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, _exclusive_file_lock(self._lock_path):
+            # Another process may have added papers since this one last looked
+            self._load()
+            updates, appended = {}, {}
+            for paper_id, vector in zip(map(str, ids), vectors):
+                if paper_id in self._positions:
+                    updates[self._positions[paper_id]] = vector
+                else:
+                    appended[paper_id] = vector
+
+            if updates:
+                matrix = self._open("r+")
+                positions = list(updates)
+                matrix[positions] = np.stack([updates[position] for position in positions])
+                matrix.flush()
+            if appended:
+                # Drop any rows left past the end by an interrupted add before appending
+                with open(self._vectors_path, "ab") as handle:
+                    handle.truncate(len(self._ids) * self.dimensions * 4)
+                    handle.write(np.stack(list(appended.values())).tobytes())
+                for paper_id in appended:
+                    self._positions[paper_id] = len(self._ids)
+                    self._ids.append(paper_id)
+                tmp_path = self._ids_path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps({"dimensions": self.dimensions, "ids": self._ids}))
+                os.replace(tmp_path, self._ids_path)
+                self._ids_version = self._stored_version()
+            self._open()
+
+    def search(self, vector: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """Returns up to k (paper_id, similarity) pairs, most similar first."""
+        self._reload_if_changed()
+        matrix, ids = self._matrix, self._ids
+        if matrix is None or k <= 0:
+            return []
+        scores = matrix @ np.asarray(vector, dtype=np.float32)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[position], float(scores[position])) for position in top]
+
+
+_local_index: Optional[LocalVectorIndex] = None
+
+
+def get_local_index() -> LocalVectorIndex:
+    global _local_index
+    if _local_index is None:
+        _local_index = LocalVectorIndex(settings.local_vector_index_dir, settings.embedding_dimensions)
+    return _local_index
+
+
+def add_embeddings(vectors: Dict[uuid.UUID, np.ndarray]):
+    """Adds freshly ingested embeddings to the local index. With the Elasticsearch backend the
+    vectors travel inside the indexed documents instead, so there is nothing to do here."""
+    if settings.vector_index_backend == LOCAL and vectors:
+        get_local_index().add(list(vectors), np.stack(list(vectors.values())))
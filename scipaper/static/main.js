@@ -71,8 +71,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
         searchResults.innerHTML = '<p>🔍 Searching...</p>';
         try {
-            const papers = await apiFetch(`/api/v1/search/?query=${encodeURIComponent(query)}`);
-            renderSearchResults(papers);
+            const data = await apiFetch(`/api/v1/search/?query=${encodeURIComponent(query)}`);
+            renderSearchResults(data.hits);
         } catch (error) {
             searchResults.innerHTML = `<p>❌ Error: ${error.message}</p>`;
         }
@@ -134,6 +134,16 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    async function handlePaperSelect(paperId) {
+        paperDetailsContainer.innerHTML = '<p>Loading paper...</p>';
+        try {
+            const paper = await apiFetch(`/api/v1/papers/${paperId}`);
+            renderPaperDetails(paper);
+        } catch (error) {
+            paperDetailsContainer.innerHTML = `<p>❌ Error: ${error.message}</p>`;
+        }
+    }
+
     // --- Render Functions ---
     function renderSearchResults(papers) {
         if (papers.length === 0) {
@@ -145,7 +155,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const li = document.createElement('li');
             li.textContent = paper.title;
             li.dataset.id = paper.id;
-            li.addEventListener('click', () => renderPaperDetails(paper));
+            li.addEventListener('click', () => handlePaperSelect(paper.id));
             ul.appendChild(li);
         });
         searchResults.innerHTML = '';
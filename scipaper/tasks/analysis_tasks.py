@@ -1,49 +1,131 @@
 from scipaper.celery_worker import celery_app
-from scipaper.services import openai_analyzer
-from scipaper import crud, schemas
-from scipaper.database import SessionLocal
-from supabase import create_client, Client
-from scipaper.config import settings
-import PyPDF2
-import io
-
-# Initialize Supabase client
-supabase: Client = create_client(settings.supabase_url, settings.supabase_service_key)
-
-@celery_app.task
-def analyze_pdf_task(paper_id: str, storage_path: str):
-    """A Celery task to download, parse, and analyze a PDF from Supabase Storage."""
-    db = SessionLocal()
-    try:
-        # 1. Download the PDF from Supabase Storage
-        response = supabase.storage.from_("paper_files").download(storage_path)
-        pdf_content = response
-
-        # 2. Parse the full text of the PDF
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-        full_text = ""
-        for page in pdf_reader.pages:
-            full_text += page.extract_text()
-
-        # 3. Send the text to OpenAI for analysis
-        # (We'll use the existing analyzer which works on abstracts, but for a real
-        # implementation, you might create a new, more detailed prompt)
-        db_paper = crud.get_paper(db, paper_id=paper_id)
+from scipaper.services import analysis_scheduler, dedup, elasticsearch, jobs, openai_analyzer, pdf_extraction, storage
+from scipaper import crud_async, schemas
+from scipaper.database import AsyncSessionLocal
+import asyncio
+import logging
+import time
+import uuid
+
+# Statuses of full-text analyses; NO_TEXT marks PDFs without extractable text (e.g. scans)
+COMPLETED_FULL_TEXT = "completed_full_text"
+NO_TEXT = "no_text"
+
+async def _load_full_text(db, storage_path: str):
+    """Returns (text, page_count) for a stored PDF, using the extracted-text cache when possible.
+
+    A file whose SHA-256 is already known and cached is neither downloaded nor parsed again.
+    """
+    db_paper_file = await crud_async.get_paper_file_by_path(db, storage_path)
+    if db_paper_file is not None and db_paper_file.sha256:
+        cached = await crud_async.get_paper_file_text(db, db_paper_file.sha256)
+        if cached is not None:
+            logging.info(f"Using cached text for {storage_path} ({cached.pages} pages, {cached.extractor})")
+            return pdf_extraction.decompress_text(cached.text_gz), cached.pages
+
+    pdf_content = await storage.get_storage().download(storage_path)
+    sha256 = pdf_extraction.sha256_hex(pdf_content)
+    cached = await crud_async.get_paper_file_text(db, sha256)
+    if cached is not None:
+        text, page_count = pdf_extraction.decompress_text(cached.text_gz), cached.pages
+    else:
+        extraction = await asyncio.to_thread(pdf_extraction.extract_text, pdf_content)
+        text, page_count = extraction.text, extraction.pages
+        await crud_async.create_paper_file_text(db, sha256, extraction.extractor, page_count, pdf_extraction.compress_text(text))
+
+    if db_paper_file is not None:
+        await crud_async.update_paper_file(db, db_paper_file, pages=page_count, sha256=sha256)
+    return text, page_count
+
+async def _analyze_pdf(paper_id: uuid.UUID, storage_path: str):
+    start_time = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        db_paper = await crud_async.get_paper(db, paper_id=paper_id)
         if not db_paper:
             raise Exception(f"Paper with id {paper_id} not found.")
 
-        analysis_data = openai_analyzer.analyze_paper(db_paper.title, full_text)
+        # 1. Get the PDF's full text, from the extracted-text cache or by downloading and parsing it
+        full_text, page_count = await _load_full_text(db, storage_path)
+        if not (full_text or "").strip():
+            # Scanned or image-only PDFs: record that there was nothing to analyze instead of
+            # sending empty chunks to the model and the plagiarism check
+            duration_ms = int((time.perf_counter() - start_time) * 1000)
+            await crud_async.create_analysis(db=db, analysis=schemas.AnalysisCreate(
+                paper_id=paper_id, status=NO_TEXT, duration_ms=duration_ms,
+            ))
+            logging.warning(f"PDF {storage_path} ({page_count} pages) has no extractable text; skipped its analysis")
+            return NO_TEXT, page_count, duration_ms
+
+        # 2. Analyze the text chunk by chunk, concurrently, and merge the results
+        analysis_data = await openai_analyzer.analyze_full_text(db_paper.title, full_text)
+
+        # 3. Compare the full text against every other indexed full text
+        plagiarism = await dedup.plagiarism_report(db, paper_id, full_text, kind=dedup.FULL_TEXT)
 
         # 4. Save the results to the database
+        duration_ms = int((time.perf_counter() - start_time) * 1000)
         analysis_in = schemas.AnalysisCreate(
             paper_id=paper_id,
-            status="completed_full_text",
-            duration_ms=0, # You could calculate this for more detailed logging
+            status=COMPLETED_FULL_TEXT,
+            duration_ms=duration_ms,
+            plagiarism=plagiarism,
             **analysis_data
         )
-        crud.create_analysis(db=db, analysis=analysis_in)
+        await crud_async.create_analysis(db=db, analysis=analysis_in)
+        logging.info(f"Analyzed PDF {storage_path} ({page_count} pages) in {duration_ms}ms")
+        return COMPLETED_FULL_TEXT, page_count, duration_ms
+
+# Full-text analyses of long PDFs can take many minutes; acknowledge only once done so a
+# crashed worker's task is redelivered, and stop runaway tasks well before the hard limit.
+@celery_app.task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=30 * 60, time_limit=35 * 60)
+def analyze_pdf_task(paper_id: str, storage_path: str):
+    """A Celery task to download, parse, and analyze a PDF from file storage."""
+    analysis_status, page_count, duration_ms = jobs.run_async(_analyze_pdf, uuid.UUID(paper_id), storage_path)
+    return {"status": "success", "paper_id": paper_id, "analysis_status": analysis_status, "pages": page_count,
+            "duration_ms": duration_ms}
+
+async def _analyze_batch(db, job):
+    """Analyses the job's papers concurrently and stores the results in bulk as they finish.
+
+    Each flush inserts its analyses and records their papers in the job's `analyzed` list in one
+    transaction, so a redelivered or resumed job skips them instead of storing them twice.
+    """
+    payload = job.payload
+    paper_ids = payload.get("paper_ids")
+    if not paper_ids and payload.get("query"):
+        paper_ids = await elasticsearch.search_paper_ids(payload["query"], payload.get("limit", 100))
+        await jobs.checkpoint(db, job, paper_ids=paper_ids)
+
+    analyzed = set(payload.get("analyzed", []))
+    pending_ids = [uuid.UUID(str(paper_id)) for paper_id in paper_ids or [] if str(paper_id) not in analyzed]
+    papers = await crud_async.get_papers_by_ids(db, pending_ids)
+    abstracts = {paper.id: paper.abstract for paper in papers}
+    # Analyses stored before a resume; failed and skipped papers are tried again, so only these carry over
+    previous = {name: payload.get(name, 0) for name in ("completed", "cached")}
+    if analyzed:
+        logging.info(f"Job {job.id} resumes with {len(papers)} papers left, {len(analyzed)} already analyzed")
+
+    async def flush(analyses, progress):
+        reports = await dedup.plagiarism_reports(db, dedup.ABSTRACT, {a.paper_id: abstracts.get(a.paper_id) for a in analyses})
+        for analysis in analyses:
+            analysis.plagiarism = reports.get(analysis.paper_id)
+        analyzed.update(str(analysis.paper_id) for analysis in analyses)
+        await crud_async.bulk_create_analyses(db, analyses, commit=False)
+        await jobs.checkpoint(
+            db, job,
+            total=len(paper_ids or []),
+            analyzed=sorted(analyzed),
+            completed=previous["completed"] + progress.completed,
+            cached=previous["cached"] + progress.cached,
+            failed=progress.failed,
+            skipped=progress.skipped,
+            errors=(payload.get("errors", []) + progress.errors)[-20:],
+        )
 
-    finally:
-        db.close()
+    await analysis_scheduler.analyze_papers(papers, flush)
 
-    return {"status": "success", "paper_id": paper_id}
+@celery_app.task(acks_late=True)
+def analyze_batch_task(job_id: str):
+    """A Celery task that runs a batch analysis job."""
+    jobs.run_async(jobs.run_job, uuid.UUID(job_id), _analyze_batch)
+    return {"status": "success", "job_id": job_id}
@@ -0,0 +1,22 @@
+from scipaper.celery_worker import celery_app
+from scipaper.services import grant_matching, jobs
+from dataclasses import asdict
+import uuid
+
+async def _match_grants(db, job):
+    """Updates the paper-to-grant matches, checkpointing the run's progress after each batch of new papers."""
+    async def save_checkpoint(result: grant_matching.GrantMatchResult):
+        await jobs.checkpoint(db, job, **asdict(result))
+
+    # A redelivered rebuild must not start over again: the watermarks already record its progress
+    rebuild = job.payload.get("rebuild", False) and "method" not in job.payload
+    result = await grant_matching.update_grant_matches(db, rebuild=rebuild, on_batch=save_checkpoint)
+    await jobs.checkpoint(db, job, **asdict(result))
+
+# Matches are committed batch by batch with the matcher's watermark, so a redelivered task
+# carries on from the last committed batch.
+@celery_app.task(acks_late=True)
+def match_grants_task(job_id: str):
+    """A Celery task that matches the papers and grant calls added since the last run."""
+    jobs.run_async(jobs.run_job, uuid.UUID(job_id), _match_grants)
+    return {"status": "success", "job_id": job_id}
@@ -0,0 +1,38 @@
+from scipaper.celery_worker import celery_app
+from scipaper.services import ingestion, jobs
+from scipaper.services.harvest import HarvestPage
+import logging
+import uuid
+
+# Cursor fields each source's harvest generator accepts to resume
+RESUME_FIELDS = ("start", "webenv", "query_key")
+
+async def _harvest(db, job):
+    """Harvests the job's query page by page, checkpointing the cursor after each committed page."""
+    payload = job.payload
+    cursor = payload.get("cursor") or {}
+    resume = {name: cursor[name] for name in RESUME_FIELDS if cursor.get(name) is not None}
+    if resume:
+        logging.info(f"Resuming harvest job {job.id} from {cursor}")
+
+    async def save_checkpoint(page: HarvestPage):
+        await jobs.checkpoint(
+            db, job,
+            cursor={
+                "start": page.next_start,
+                "webenv": page.webenv,
+                "query_key": page.query_key,
+                "last_source_id": page.articles[-1].get("source_id"),
+            },
+            total=page.total,
+            ingested=(job.payload or {}).get("ingested", 0) + len(page.articles),
+        )
+
+    pages = ingestion.harvest(payload["source"], payload["query"], payload.get("max_results"), payload.get("page_size"), **resume)
+    await ingestion.ingest_stream(db, pages, chunk_size=payload.get("chunk_size"), collect_papers=False, on_page=save_checkpoint)
+
+@celery_app.task(acks_late=True, reject_on_worker_lost=True)
+def harvest_task(job_id: str):
+    """A Celery task that runs (or resumes) a checkpointed harvest job."""
+    jobs.run_async(jobs.run_job, uuid.UUID(job_id), _harvest)
+    return {"status": "success", "job_id": job_id}
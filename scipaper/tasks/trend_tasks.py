@@ -0,0 +1,19 @@
+from scipaper.celery_worker import celery_app
+from scipaper.services import jobs, trends
+import uuid
+
+async def _compute_trends(db, job):
+    """Updates one domain's trends, checkpointing the number of new papers counted after each batch."""
+    async def save_checkpoint(counted: int):
+        await jobs.checkpoint(db, job, counted=counted)
+
+    trend = await trends.update_domain_trends(db, job.payload["domain"], on_batch=save_checkpoint)
+    await jobs.checkpoint(db, job, trend_id=str(trend.id), counted=trend.trends["new_papers"])
+
+# Counts are committed batch by batch with the domain's watermark, so a redelivered task
+# carries on from the last committed batch.
+@celery_app.task(acks_late=True)
+def compute_trends_task(job_id: str):
+    """A Celery task that recomputes a domain's trends from the papers ingested since its last run."""
+    jobs.run_async(jobs.run_job, uuid.UUID(job_id), _compute_trends)
+    return {"status": "success", "job_id": job_id}
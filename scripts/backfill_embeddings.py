@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Allow running as `python scripts/backfill_embeddings.py` from the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scipaper.database import AsyncSessionLocal, async_engine
+from scipaper.services import ingestion
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Embeds stored papers that have no embedding from the current model "
+                                                 "and writes them to the active vector backend.")
+    parser.add_argument("--batch-size", type=int, help="Papers embedded and indexed per batch (default: ingest_chunk_size)")
+    parser.add_argument("--all", action="store_true", dest="include_embedded",
+                        help="Rewrite the vectors of every paper, e.g. after reindexing; stored embeddings are reused")
+    args = parser.parse_args()
+
+    async def progress(result: ingestion.EmbeddingBackfillResult):
+        print(f"Embedded {result.embedded} of {result.papers} papers...")
+
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await ingestion.backfill_embeddings(db, args.batch_size, args.include_embedded, on_batch=progress)
+        print(f"Backfill complete: {result.embedded} of {result.papers} papers embedded and indexed, "
+              f"{result.index_errors} index errors, in {result.duration_ms}ms.")
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# Allow running as `python scripts/benchmark_pubmed_parser.py` from the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scipaper.services.pubmed import parse_pubmed_xml
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "pubmed_efetch.xml"
+
+
+def build_response(fixture: Path, copies: int) -> str:
+    """Writes an efetch-sized response by repeating the fixture's articles `copies` times."""
+    articles = [ET.tostring(article) for article in ET.parse(fixture).getroot().iter("PubmedArticle")]
+    handle = tempfile.NamedTemporaryFile("wb", suffix=".xml", delete=False)
+    with handle:
+        handle.write(b'<?xml version="1.0" ?>\n<PubmedArticleSet>\n')
+        for _ in range(copies):
+            handle.writelines(articles)
+        handle.write(b"</PubmedArticleSet>\n")
+    return handle.name
+
+
+def parse(path: str) -> int:
+    return sum(1 for _ in parse_pubmed_xml(path))
+
+
+def peak_memory_mb(func, *args) -> float:
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures PubMed efetch XML parsing throughput and memory.")
+    parser.add_argument("--fixture", type=Path, default=FIXTURE, help="Saved efetch response to replicate")
+    parser.add_argument("--copies", type=int, default=2000, help="Times to repeat the fixture's articles (default: 2000)")
+    parser.add_argument("--runs", type=int, default=5, help="Timed parses (default: 5)")
+    args = parser.parse_args()
+
+    path = build_response(args.fixture, args.copies)
+    try:
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        timings, records = [], 0
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            records = parse(path)
+            timings.append(time.perf_counter() - start)
+
+        median = statistics.median(timings)
+        print(f"{records} records, {size_mb:.1f} MB of XML")
+        print(f"median {median * 1000:.0f}ms, {records / median:,.0f} records/s, {size_mb / median:.1f} MB/s")
+        # Whole-tree parsing for comparison: its memory grows with the response, the streaming parser's does not
+        print(f"peak memory: streaming {peak_memory_mb(parse, path):.1f} MB, whole tree {peak_memory_mb(ET.parse, path):.1f} MB")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Allow running as `python scripts/harvest_grants.py` from the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scipaper.database import AsyncSessionLocal, async_engine
+from scipaper.services import grants
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk-upserts grant calls from a local JSON, JSON Lines or CSV feed.")
+    parser.add_argument("path", type=Path, help="Feed file, e.g. scripts/fixtures/grants_feed.csv")
+    parser.add_argument("--name", help="Source name stored with each call (default: the file name without extension)")
+    parser.add_argument("--batch-size", type=int, help="Calls per upsert statement (default: grant_batch_size)")
+    args = parser.parse_args()
+
+    path = args.path.resolve()
+    source = grants.LocalFeedSource(path.name, name=args.name, root=str(path.parent))
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await grants.harvest_grants(db, source, batch_size=args.batch_size)
+        print(f"{result.fetched} calls read from '{result.source}': {result.upserted} new or changed, "
+              f"{result.skipped} skipped, in {result.duration_ms}ms.")
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Allow running as `python scripts/rebuild_coauthor_graph.py` from the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scipaper.services import neo4j
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Refreshes the proximity scores collaborator suggestions are ranked by; "
+                                                 "run it periodically, e.g. nightly.")
+    parser.add_argument("--edges", action="store_true",
+                        help="First backfill COLLABORATED_WITH edges for papers loaded before they were maintained at ingest")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Papers or authors per write transaction")
+    args = parser.parse_args()
+
+    try:
+        service = neo4j.get_neo4j_service()
+        if args.edges:
+            papers = await service.rebuild_collaborations(args.batch_size)
+            print(f"Rebuilt co-author edges for {papers} papers.")
+        authors = await service.score_collaborations(args.batch_size)
+        print(f"Scored co-author edges of {authors} authors.")
+    finally:
+        await neo4j.close_neo4j_service()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
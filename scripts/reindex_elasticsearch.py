@@ -0,0 +1,28 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Allow running as `python scripts/reindex_elasticsearch.py` from the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scipaper.services import elasticsearch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the papers index from the current template and swap the aliases to it.")
+    parser.add_argument("--version", type=int,
+                        help="Version of the new index (default: one past the highest existing version, "
+                             f"and at least {elasticsearch.INDEX_VERSION})")
+    parser.add_argument("--delete-old", action="store_true",
+                        help="Delete the previous index once the aliases point to the new one")
+    parser.add_argument("--poll-interval", type=float, default=5.0,
+                        help="Seconds between reindex progress checks")
+    args = parser.parse_args()
+
+    version = args.version if args.version is not None else elasticsearch.next_index_version()
+    new_index = elasticsearch.reindex(version, delete_old=args.delete_old, poll_interval=args.poll_interval)
+    print(f"Reindex complete. Searches now read from '{new_index}'.")
+
+
+if __name__ == "__main__":
+    main()
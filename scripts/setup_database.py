@@ -43,6 +43,48 @@ CREATE TABLE IF NOT EXISTS paper_files (
     created_at timestamptz DEFAULT now()
 );
 
+ALTER TABLE papers ADD COLUMN IF NOT EXISTS mesh_terms text[];
+
+ALTER TABLE paper_files ADD COLUMN IF NOT EXISTS sha256 text;
+
+-- Extracted PDF text, zlib-compressed and keyed by the file's SHA-256
+CREATE TABLE IF NOT EXISTS paper_file_texts (
+    sha256 text PRIMARY KEY,
+    extractor text,
+    pages int,
+    text_gz bytea,
+    created_at timestamptz DEFAULT now()
+);
+
+-- Paper embeddings for semantic search, reused while the text and model are unchanged
+CREATE TABLE IF NOT EXISTS paper_embeddings (
+    paper_id uuid PRIMARY KEY REFERENCES papers(id) ON DELETE CASCADE,
+    model text,
+    content_hash text,
+    vector bytea,
+    created_at timestamptz DEFAULT now()
+);
+
+-- MinHash signatures of abstracts and full texts, with the cross-source paper each duplicates
+CREATE TABLE IF NOT EXISTS paper_signatures (
+    paper_id uuid REFERENCES papers(id) ON DELETE CASCADE,
+    kind text,
+    signature bytea,
+    duplicate_of uuid REFERENCES papers(id) ON DELETE SET NULL,
+    similarity double precision,
+    created_at timestamptz DEFAULT now(),
+    PRIMARY KEY (paper_id, kind)
+);
+
+-- LSH band index over the signatures: the primary key serves bucket lookups
+CREATE TABLE IF NOT EXISTS paper_lsh_bands (
+    kind text,
+    band int,
+    bucket bigint,
+    paper_id uuid REFERENCES papers(id) ON DELETE CASCADE,
+    PRIMARY KEY (kind, band, bucket, paper_id)
+);
+
 CREATE TABLE IF NOT EXISTS analyses (
     id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
     paper_id uuid REFERENCES papers(id) ON DELETE CASCADE,
@@ -63,6 +105,19 @@ CREATE TABLE IF NOT EXISTS domains (
     name text UNIQUE
 );
 
+ALTER TABLE domains ADD COLUMN IF NOT EXISTS last_paper_created_at timestamptz;
+ALTER TABLE domains ADD COLUMN IF NOT EXISTS last_paper_id uuid;
+
+-- Papers per (term, year) within each domain, updated incrementally by the trend engine.
+-- The '*' term counts all of the domain's papers that year.
+CREATE TABLE IF NOT EXISTS domain_term_counts (
+    domain_id uuid REFERENCES domains(id) ON DELETE CASCADE,
+    term text,
+    year int,
+    papers int,
+    PRIMARY KEY (domain_id, term, year)
+);
+
 CREATE TABLE IF NOT EXISTS domain_trends (
     id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
     domain_id uuid REFERENCES domains(id) ON DELETE CASCADE,
@@ -96,6 +151,26 @@ CREATE TABLE IF NOT EXISTS grants (
     created_at timestamptz DEFAULT now()
 );
 
+ALTER TABLE grants ADD COLUMN IF NOT EXISTS updated_at timestamptz DEFAULT now();
+
+-- Progress of the paper-to-grant matcher, per vector space
+CREATE TABLE IF NOT EXISTS grant_matchers (
+    method text PRIMARY KEY,
+    last_paper_created_at timestamptz,
+    last_paper_id uuid,
+    last_grant_updated_at timestamptz,
+    last_grant_id uuid
+);
+
+-- The best-matching grant calls of each paper, kept up to date by the grant matcher
+CREATE TABLE IF NOT EXISTS paper_grant_matches (
+    paper_id uuid REFERENCES papers(id) ON DELETE CASCADE,
+    grant_id uuid REFERENCES grants(id) ON DELETE CASCADE,
+    score double precision,
+    created_at timestamptz DEFAULT now(),
+    PRIMARY KEY (paper_id, grant_id)
+);
+
 CREATE TABLE IF NOT EXISTS proposals (
     id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
     user_id uuid REFERENCES users(id) ON DELETE SET NULL,
@@ -105,12 +180,102 @@ CREATE TABLE IF NOT EXISTS proposals (
 );
 """
 
+# Papers ingested before the unique indexes existed may be duplicated; keep the oldest copy.
+# Each natural key is deduplicated in turn: the later copies are collected in paper_duplicates
+# with the paper they duplicate, which inherits their rows before they are deleted.
+PAPER_NATURAL_KEYS = {
+    "source id": ("source, source_id", "source IS NOT NULL AND source_id IS NOT NULL"),
+    "DOI": ("doi", "doi IS NOT NULL"),
+}
+
+FIND_DUPLICATE_PAPERS_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS paper_duplicates (duplicate_id uuid PRIMARY KEY, keeper_id uuid) ON COMMIT DROP;
+TRUNCATE paper_duplicates;
+INSERT INTO paper_duplicates
+SELECT id, keeper_id FROM (
+    SELECT id, first_value(id) OVER (PARTITION BY {key} ORDER BY created_at, id) AS keeper_id
+    FROM papers WHERE {condition}
+) copies
+WHERE id <> keeper_id;
+"""
+
+# Analyses and files move to the kept paper. Rows keyed by paper are copied over unless the kept
+# paper already has one, and go with the duplicate when it is deleted.
+MERGE_DUPLICATE_PAPERS_SQL = """
+UPDATE analyses SET paper_id = d.keeper_id FROM paper_duplicates d WHERE analyses.paper_id = d.duplicate_id;
+UPDATE paper_files SET paper_id = d.keeper_id FROM paper_duplicates d WHERE paper_files.paper_id = d.duplicate_id;
+
+INSERT INTO paper_embeddings (paper_id, model, content_hash, vector, created_at)
+SELECT d.keeper_id, e.model, e.content_hash, e.vector, e.created_at
+FROM paper_embeddings e JOIN paper_duplicates d ON d.duplicate_id = e.paper_id
+ON CONFLICT (paper_id) DO NOTHING;
+
+INSERT INTO paper_signatures (paper_id, kind, signature, duplicate_of, similarity, created_at)
+SELECT d.keeper_id, s.kind, s.signature, s.duplicate_of, s.similarity, s.created_at
+FROM paper_signatures s JOIN paper_duplicates d ON d.duplicate_id = s.paper_id
+ON CONFLICT (paper_id, kind) DO NOTHING;
+
+UPDATE paper_signatures SET duplicate_of = d.keeper_id FROM paper_duplicates d WHERE paper_signatures.duplicate_of = d.duplicate_id;
+UPDATE paper_signatures SET duplicate_of = NULL, similarity = NULL WHERE duplicate_of = paper_id;
+
+INSERT INTO paper_lsh_bands (kind, band, bucket, paper_id)
+SELECT b.kind, b.band, b.bucket, d.keeper_id
+FROM paper_lsh_bands b JOIN paper_duplicates d ON d.duplicate_id = b.paper_id
+ON CONFLICT DO NOTHING;
+
+INSERT INTO paper_grant_matches (paper_id, grant_id, score, created_at)
+SELECT d.keeper_id, m.grant_id, m.score, m.created_at
+FROM paper_grant_matches m JOIN paper_duplicates d ON d.duplicate_id = m.paper_id
+ON CONFLICT (paper_id, grant_id) DO NOTHING;
+
+DELETE FROM papers USING paper_duplicates d WHERE papers.id = d.duplicate_id;
+"""
+
+# Grants are upserted on (source, call_id) since the unique index below; keep the oldest copy.
+DEDUPLICATE_GRANTS_SQL = """
+DELETE FROM grants a USING grants b
+WHERE a.source = b.source AND a.call_id = b.call_id
+  AND (a.created_at, a.id) > (b.created_at, b.id);
+"""
+
+# SQL statements to create indexes
+CREATE_INDEXES_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS papers_source_source_id_key ON papers (source, source_id);
+CREATE UNIQUE INDEX IF NOT EXISTS papers_doi_key ON papers (doi) WHERE doi IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_paper_files_sha256 ON paper_files (sha256);
+CREATE INDEX IF NOT EXISTS ix_paper_lsh_bands_paper_id ON paper_lsh_bands (paper_id);
+-- Keyset pagination of the list endpoints: ORDER BY created_at DESC, id DESC is a backward scan
+CREATE INDEX IF NOT EXISTS ix_users_created_at_id ON users (created_at, id);
+CREATE INDEX IF NOT EXISTS ix_papers_created_at_id ON papers (created_at, id);
+CREATE INDEX IF NOT EXISTS ix_grants_created_at_id ON grants (created_at, id);
+-- Open-call queries: tag overlap/containment through GIN, deadline ranges and ordering through the B-tree
+CREATE UNIQUE INDEX IF NOT EXISTS grants_source_call_id_key ON grants (source, call_id);
+CREATE INDEX IF NOT EXISTS ix_grants_tags ON grants USING gin (tags);
+CREATE INDEX IF NOT EXISTS ix_grants_deadline_id ON grants (deadline, id);
+-- Grant matching: calls changed since the last run, and cascading deletes of a grant's matches
+CREATE INDEX IF NOT EXISTS ix_grants_updated_at_id ON grants (updated_at, id);
+CREATE INDEX IF NOT EXISTS ix_paper_grant_matches_grant_id ON paper_grant_matches (grant_id);
+CREATE INDEX IF NOT EXISTS ix_domain_trends_domain_id_created_at ON domain_trends (domain_id, created_at);
+"""
+
+def deduplicate_papers(cur):
+    """Merges papers that share a natural key into their oldest copy, reporting how many were merged."""
+    for name, (key, condition) in PAPER_NATURAL_KEYS.items():
+        cur.execute(FIND_DUPLICATE_PAPERS_SQL.format(key=key, condition=condition))
+        duplicates = cur.execute("SELECT count(*) FROM paper_duplicates").fetchone()[0]
+        if duplicates:
+            cur.execute(MERGE_DUPLICATE_PAPERS_SQL)
+            print(f"Merged {duplicates} papers duplicating another paper's {name} into the oldest copy.")
+
 def setup_database():
-    """Connects to the database and creates the tables."""
+    """Connects to the database and creates the tables and indexes."""
     try:
         with psycopg.connect(DB_URL) as conn:
             with conn.cursor() as cur:
                 cur.execute(CREATE_TABLES_SQL)
+                deduplicate_papers(cur)
+                cur.execute(DEDUPLICATE_GRANTS_SQL)
+                cur.execute(CREATE_INDEXES_SQL)
                 conn.commit()
         print("Database tables created successfully!")
     except Exception as e:
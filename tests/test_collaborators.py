@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from scipaper.services import collaborators
+
+
+def seed(author: str, relevance: float, papers: int = 1) -> dict:
+    return {"author": author, "relevance": relevance, "papers": papers}
+
+
+def test_seeds_spread_their_relevance_over_proximity():
+    seeds = [seed("Ada", 3.0, papers=2), seed("Bob", 1.0)]
+    edges = [("Ada", "Cy", 3.0), ("Ada", "Di", 1.0), ("Bob", "Di", 2.0)]
+
+    ranked = collaborators.rank_collaborators(seeds, edges, limit=10)
+
+    scores = {row["author"]: row["score"] for row in ranked}
+    assert scores["Cy"] == pytest.approx(0.85 * 0.75 * 0.75, abs=1e-6)
+    assert scores["Di"] == pytest.approx(0.85 * (0.75 * 0.25 + 0.25), abs=1e-6)
+    assert scores["Ada"] == pytest.approx(0.15 * 0.75, abs=1e-6)
+    assert [row["author"] for row in ranked] == ["Cy", "Di", "Ada", "Bob"]
+    assert ranked[2]["papers"] == 2 and ranked[0]["papers"] == 0
+
+
+def test_edges_between_seeds_count_once_and_unscored_edges_spread_nothing():
+    seeds = [seed("Ada", 1.0), seed("Bob", 1.0)]
+    edges = [("Ada", "Bob", 1.0), ("Bob", "Ada", 1.0), ("Ada", "Cy", 0.0)]
+
+    ranked = collaborators.rank_collaborators(seeds, edges, limit=2)
+
+    assert [row["author"] for row in ranked] == ["Ada", "Bob"]
+    assert ranked[0]["score"] == pytest.approx(0.5, abs=1e-6)
+
+
+def test_suggestions_are_cached_per_topic(monkeypatch, memory_cache):
+    calls = []
+
+    class Graph:
+        async def get_topic_graph(self, topic):
+            calls.append(topic)
+            return [seed("Ada", 1.0)], [("Ada", "Cy", 1.0)]
+
+    monkeypatch.setattr(collaborators.neo4j, "get_neo4j_service", Graph)
+    monkeypatch.setattr(collaborators, "collaborator_cache", memory_cache)
+
+    first = asyncio.run(collaborators.suggest_collaborators("Graph  Learning", 5))
+    second = asyncio.run(collaborators.suggest_collaborators("graph learning", 5))
+
+    assert calls == ["Graph  Learning"]
+    assert first == second and [row["author"] for row in first] == ["Cy", "Ada"]
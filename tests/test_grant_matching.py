@@ -0,0 +1,37 @@
+import uuid
+import warnings
+from types import SimpleNamespace
+
+import numpy as np
+
+from scipaper.services import grant_matching
+
+
+def grant(title: str, tags=()) -> SimpleNamespace:
+    return SimpleNamespace(id=uuid.uuid4(), title=title, tags=list(tags), agency="NSF", url=None, deadline=None)
+
+
+def test_terms_hash_to_the_features_of_matching_text():
+    term_features = grant_matching.vectorize_terms(["graph neural", "protein"]).indices
+    text_features = grant_matching.vectorize(["Graph neural protein"]).indices
+
+    assert set(term_features) <= set(text_features)
+
+
+def test_term_vectorizer_sets_no_unused_tokenizer_options():
+    # sklearn checks for unused options on fit (and, in some versions, on every transform)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        grant_matching._term_vectorizer().fit_transform(["graph neural"])
+
+
+def test_match_domain_ranks_calls_without_vectorizer_warnings():
+    grants = [grant("Protein folding at scale"), grant("Graph neural networks for chemistry", ["graph neural"]), grant("Ocean data")]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = grant_matching.match_domain(grants, ["graph neural", "protein"], np.array([2.0, 1.0]))
+
+    assert result["open_calls"] == 2
+    assert [call["title"] for call in result["calls"]] == ["Graph neural networks for chemistry", "Protein folding at scale"]
+    assert result["calls"][0]["matched_terms"] == ["graph neural"]
@@ -0,0 +1,195 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from scipaper.config import settings
+from scipaper.services import http_client
+
+
+class VirtualClock:
+    """Stands in for the client's clock and sleeps, so waits are measured without taking time."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += max(0.0, seconds)
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = VirtualClock()
+    monkeypatch.setattr(http_client, "time", clock)
+    monkeypatch.setattr(http_client, "asyncio", SimpleNamespace(sleep=clock.sleep, Lock=asyncio.Lock))
+    # No jitter, so backoff delays are exact
+    monkeypatch.setattr(http_client, "random", SimpleNamespace(uniform=lambda low, high: 0.0))
+    return clock
+
+
+def stub(clock: VirtualClock, responses: list):
+    """A client whose requests are answered in turn by `responses`; returns it and the request times."""
+    times = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        times.append(clock.now)
+        response = responses[min(len(times), len(responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def make(**options) -> http_client.RateLimitedClient:
+        options = {"requests_per_second": 100.0, "max_retries": 3, "backoff_base": 1.0, **options}
+        return http_client.RateLimitedClient("stub", "http://stub.test", http2=False,
+                                             transport=httpx.MockTransport(handler), **options)
+    return make, times
+
+
+def test_429_waits_for_retry_after(clock):
+    make, times = stub(clock, [httpx.Response(429, headers={"Retry-After": "7"}), httpx.Response(200, text="ok")])
+
+    async def run():
+        client = make()
+        try:
+            response = await client.get("/esearch")
+            # Every caller sharing the source was held back for the Retry-After window too
+            return response, client.bucket._blocked_until
+        finally:
+            await client.aclose()
+
+    response, blocked_until = asyncio.run(run())
+    assert response.status_code == 200 and response.text == "ok"
+    assert len(times) == 2
+    assert times[1] - times[0] == pytest.approx(7.0)
+    assert blocked_until == pytest.approx(times[0] + 7.0)
+
+
+def test_retry_after_as_http_date(clock):
+    retry_at = datetime.fromtimestamp(clock.now, timezone.utc) + timedelta(seconds=30)
+    response = httpx.Response(503, headers={"Retry-After": format_datetime(retry_at, usegmt=True)})
+    assert http_client._retry_after_seconds(response) == pytest.approx(30.0, abs=1.0)
+    assert http_client._retry_after_seconds(httpx.Response(503, headers={"Retry-After": "soon"})) is None
+
+
+def test_5xx_backs_off_exponentially(clock):
+    make, times = stub(clock, [httpx.Response(503), httpx.Response(502), httpx.Response(200)])
+
+    async def run():
+        client = make()
+        try:
+            return await client.get("/efetch")
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()).status_code == 200
+    assert len(times) == 3
+    assert [b - a for a, b in zip(times, times[1:])] == pytest.approx([1.0, 2.0], abs=0.02)
+
+
+def test_gives_up_after_max_retries(clock):
+    make, times = stub(clock, [httpx.Response(500)])
+
+    async def run():
+        client = make(max_retries=2)
+        try:
+            await client.get("/efetch")
+        finally:
+            await client.aclose()
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
+    assert len(times) == 3
+
+
+def test_non_retryable_error_is_raised_at_once(clock):
+    make, times = stub(clock, [httpx.Response(404)])
+
+    async def run():
+        client = make()
+        try:
+            await client.get("/missing")
+        finally:
+            await client.aclose()
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
+    assert len(times) == 1
+
+
+def test_transport_errors_are_retried(clock):
+    make, times = stub(clock, [httpx.ConnectError("refused"), httpx.Response(200)])
+
+    async def run():
+        client = make()
+        try:
+            return await client.get("/esearch")
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()).status_code == 200
+    assert len(times) == 2
+
+
+def test_requests_are_spaced_by_the_source_rate(clock):
+    make, times = stub(clock, [httpx.Response(200)])
+
+    async def run():
+        client = make(requests_per_second=4.0, burst=1.0)
+        try:
+            await asyncio.gather(*(client.get(f"/page/{i}") for i in range(9)))
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert len(times) == 9
+    assert [b - a for a, b in zip(times, times[1:])] == pytest.approx([0.25] * 8)
+    assert (len(times) - 1) / (times[-1] - times[0]) == pytest.approx(4.0)
+
+
+def test_burst_is_served_at_once_then_rate_limited(clock):
+    make, times = stub(clock, [httpx.Response(200)])
+
+    async def run():
+        client = make(requests_per_second=2.0, burst=3.0)
+        try:
+            await asyncio.gather(*(client.get("/") for _ in range(5)))
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert [t - times[0] for t in times] == pytest.approx([0.0, 0.0, 0.0, 0.5, 1.0])
+
+
+@pytest.mark.parametrize("api_key, rate", [("", 3.0), ("key", 10.0)])
+def test_pubmed_rate_follows_the_ncbi_api_key(monkeypatch, api_key, rate):
+    monkeypatch.setattr(settings, "pubmed_requests_per_second", 0.0)
+    monkeypatch.setattr(settings, "ncbi_api_key", api_key)
+    monkeypatch.setattr(settings, "http2_enabled", False)
+    client = http_client.CLIENT_FACTORIES["pubmed"]()
+    try:
+        assert client.bucket.rate == rate
+    finally:
+        asyncio.run(client.aclose())
+
+
+def test_arxiv_rate_comes_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "arxiv_requests_per_second", 1 / 3)
+    monkeypatch.setattr(settings, "http2_enabled", False)
+    client = http_client.CLIENT_FACTORIES["arxiv"]()
+    try:
+        assert client.bucket.rate == pytest.approx(1 / 3)
+        assert client.bucket.capacity == 1.0
+    finally:
+        asyncio.run(client.aclose())
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+import pytest
+
+from scipaper.services import openai_analyzer
+
+
+@pytest.fixture
+def prompts(monkeypatch, memory_cache):
+    """Records the prompts sent to the model; each answer lists the prompt's first 'Section' line."""
+    sent = []
+
+    async def call_openai(prompt):
+        sent.append(prompt)
+        return {"findings": [line.strip() for line in prompt.splitlines() if line.strip().startswith("**Section")]}
+
+    monkeypatch.setattr(openai_analyzer, "_call_openai", call_openai)
+    monkeypatch.setattr(openai_analyzer, "analysis_cache", memory_cache)
+    monkeypatch.setattr(openai_analyzer.settings, "analysis_chunk_tokens", 6)
+    return sent
+
+
+def test_full_text_chunks_use_the_section_prompt(prompts):
+    text = "First paragraph here.\n\nSecond paragraph here."
+
+    analysis = asyncio.run(openai_analyzer.analyze_full_text("Title", text))
+
+    assert len(prompts) == 2
+    assert all("of the full text of a scientific paper" in prompt for prompt in prompts)
+    assert not any("Based on the abstract and title" in prompt for prompt in prompts)
+    assert analysis["findings"] == ["**Section 1 of 2:**", "**Section 2 of 2:**"]
+
+
+def test_chunk_analyses_are_cached_apart_from_abstract_analyses(prompts):
+    asyncio.run(openai_analyzer.analyze_paper("Title", "Same text."))
+    asyncio.run(openai_analyzer.analyze_full_text("Title", "Same text."))
+    asyncio.run(openai_analyzer.analyze_full_text("Title", "Same text."))
+
+    assert len(prompts) == 2
+    assert "**Abstract:** Same text." in prompts[0] and "Section 1 of 1" in prompts[1]
+    assert openai_analyzer.cache_key("Title", "Same text.") != openai_analyzer.cache_key("Title", "Same text.", section=(1, 1))
+
+
+def test_api_errors_are_logged_as_warnings(monkeypatch, caplog):
+    class Completions:
+        async def create(self, **kwargs):
+            raise RuntimeError("rate limited")
+
+    class Client:
+        chat = type("Chat", (), {"completions": Completions()})()
+
+    monkeypatch.setattr(openai_analyzer, "get_client", Client)
+
+    with caplog.at_level(logging.WARNING), pytest.raises(RuntimeError):
+        asyncio.run(openai_analyzer._call_openai("prompt"))
+    assert "rate limited" in caplog.text
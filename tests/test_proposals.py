@@ -0,0 +1,122 @@
+import json
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from scipaper import crud_async
+from scipaper.api.endpoints import proposals as proposals_endpoint
+from scipaper.services import llm, proposals
+
+USER = SimpleNamespace(id=uuid.uuid4(), name="Ada Lovelace", email="ada@example.org", affiliation="UCL")
+PAPER = SimpleNamespace(id=uuid.uuid4(), title="Spatial transcriptomics of tumours", year=2024, journal="Nature",
+                        abstract="We map the tumour microenvironment.")
+ANALYSIS = SimpleNamespace(id=uuid.uuid4(), paper_id=PAPER.id, findings=["Immune cells cluster at the margin"],
+                           methods=["Visium"], gaps=["No longitudinal data"], limitations=[])
+GRANT = SimpleNamespace(grant_id=uuid.uuid4(), title="Cancer atlas call", agency="NIH", url=None,
+                        deadline=date(2030, 1, 1), tags=["cancer"], score=0.5)
+
+
+class FailingLLMClient(llm.LLMClient):
+    model = "failing"
+
+    async def stream(self, messages):
+        yield "# Title\n"
+        raise RuntimeError("rate limited")
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    """Stubs the queries behind the endpoint and returns the list proposals are stored in."""
+    saved = []
+
+    async def get_user(db, user_id):
+        return USER if user_id == USER.id else None
+
+    async def get_author_papers(db, name, limit):
+        return [PAPER]
+
+    async def get_latest_analyses(db, paper_ids):
+        return [ANALYSIS]
+
+    async def get_papers_grant_matches(db, paper_ids, today, limit):
+        return [GRANT]
+
+    async def create_proposal(db, proposal):
+        saved.append(proposal)
+        return SimpleNamespace(id=uuid.uuid4())
+
+    monkeypatch.setattr(crud_async, "get_user", get_user)
+    monkeypatch.setattr(crud_async, "get_author_papers", get_author_papers)
+    monkeypatch.setattr(crud_async, "get_latest_analyses", get_latest_analyses)
+    monkeypatch.setattr(crud_async, "get_papers_grant_matches", get_papers_grant_matches)
+    monkeypatch.setattr(crud_async, "create_proposal", create_proposal)
+    monkeypatch.setattr(proposals, "AsyncSessionLocal", FakeSession)
+    return saved
+
+
+@pytest.fixture
+def make_client(api_client):
+    return lambda client: api_client(proposals_endpoint.router, "/proposals", {llm.get_llm_client: lambda: client})
+
+
+def read_events(response) -> list:
+    """Parses a server-sent event stream into (event, data) pairs."""
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_generate_streams_events_and_stores_proposal(stored, make_client):
+    scripted = llm.ScriptedLLMClient(["# Title\n", "Mapping ", "tumours"])
+    response = make_client(scripted).post("/proposals/generate", json={"user_id": str(USER.id), "domain": "spatial  omics"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = read_events(response)
+    assert [name for name, _ in events] == ["context", "token", "token", "token", "done"]
+    context = events[0][1]
+    assert context["paper_ids"] == [str(PAPER.id)]
+    assert context["analysis_ids"] == [str(ANALYSIS.id)]
+    assert context["grant_ids"] == [str(GRANT.grant_id)]
+    assert "".join(data["text"] for name, data in events if name == "token") == "# Title\nMapping tumours"
+
+    assert len(stored) == 1
+    proposal = stored[0]
+    assert proposal.user_id == USER.id
+    assert proposal.domain == "spatial omics"
+    assert proposal.content["text"] == "# Title\nMapping tumours"
+    assert proposal.content["model"] == llm.SCRIPTED
+    assert proposal.content["prompt_version"] == proposals.PROMPT_VERSION
+    assert proposal.content["context"] == context
+
+    # The prompt is built from the papers, their analyses and the matched call
+    prompt = scripted.calls[0][-1]["content"]
+    assert PAPER.title in prompt and ANALYSIS.findings[0] in prompt and GRANT.title in prompt
+
+
+def test_generate_sends_error_and_stores_nothing_when_stream_fails(stored, make_client):
+    response = make_client(FailingLLMClient()).post("/proposals/generate", json={"user_id": str(USER.id), "domain": "oncology"})
+
+    assert response.status_code == 200
+    events = read_events(response)
+    assert [name for name, _ in events] == ["context", "token", "error"]
+    assert events[-1][1]["detail"] == "rate limited"
+    assert stored == []
+
+
+def test_generate_unknown_user_is_404(stored, make_client):
+    response = make_client(llm.ScriptedLLMClient()).post("/proposals/generate", json={"user_id": str(uuid.uuid4()), "domain": "oncology"})
+
+    assert response.status_code == 404
+    assert stored == []
@@ -0,0 +1,56 @@
+import asyncio
+
+from scipaper.services import pubmed
+
+
+def harvest(monkeypatch, pages: dict, count: int, **kwargs):
+    """Runs harvest_pubmed against canned efetch pages keyed by retstart; returns pages and requests."""
+    requests, searches = [], []
+
+    async def esearch(query, retmax):
+        searches.append(query)
+        return {"webenv": f"env{len(searches)}", "querykey": "1", "count": str(count)}
+
+    async def efetch(data):
+        requests.append((data["retstart"], data["retmax"], data["WebEnv"]))
+        return [{"source_id": str(pmid)} for pmid in pages.get(data["retstart"], [])]
+
+    monkeypatch.setattr(pubmed, "_esearch", esearch)
+    monkeypatch.setattr(pubmed, "_efetch", efetch)
+
+    async def collect():
+        return [page async for page in pubmed.harvest_pubmed("crispr", **kwargs)]
+
+    return asyncio.run(collect()), requests, searches
+
+
+def test_pages_advance_by_retmax_when_book_records_are_dropped(monkeypatch):
+    # 3 of the first page's records are PubmedBookArticle and parse to nothing
+    pages, requests, _ = harvest(monkeypatch, {0: [1, 2], 5: [6, 7, 8, 9, 10], 10: [11, 12]}, count=12, page_size=5)
+
+    assert [start for start, _, _ in requests] == [0, 5, 10]
+    assert [(page.start, page.next_start) for page in pages] == [(0, 5), (5, 10), (10, 12)]
+    assert pages[-1].total == 12
+
+
+def test_a_page_of_book_records_only_does_not_end_the_harvest(monkeypatch):
+    pages, requests, searches = harvest(monkeypatch, {0: [1, 2, 3], 6: [7]}, count=7, page_size=3)
+
+    assert [start for start, _, _ in requests] == [0, 3, 6]
+    assert [page.next_start for page in pages] == [3, 7]
+    assert len(searches) == 1
+
+
+def test_max_results_caps_the_last_page(monkeypatch):
+    pages, requests, _ = harvest(monkeypatch, {0: [1, 2, 3, 4], 4: [5, 6]}, count=100, page_size=4, max_results=6)
+
+    assert [(start, retmax) for start, retmax, _ in requests] == [(0, 4), (4, 2)]
+    assert pages[-1].next_start == 6
+
+
+def test_resumed_harvest_restarts_an_expired_session(monkeypatch):
+    pages, requests, searches = harvest(monkeypatch, {}, count=10, page_size=5,
+                                        start=5, webenv="expired", query_key="1")
+
+    assert requests == [(5, 5, "expired"), (5, 5, "env1")]
+    assert pages == [] and searches == ["crispr"]
@@ -0,0 +1,114 @@
+import hashlib
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from scipaper import crud_async
+from scipaper.api.endpoints import files
+from scipaper.config import settings
+from scipaper.services import storage
+from scipaper.tasks import analysis_tasks
+
+PAPER_ID = uuid.uuid4()
+
+
+def make_pdf(pages: int, page_type: bytes = b"/Page") -> bytes:
+    """A minimal PDF with `pages` empty pages. `page_type` spells the pages' /Type name, so a test
+    can hide the page objects from a byte scan (e.g. /P#61ge, which a parser reads as /Page)."""
+    kids = " ".join(f"{3 + i} 0 R" for i in range(pages))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode(),
+        *(b"<< /Type " + page_type + b" /Parent 2 0 R /MediaBox [0 0 612 792] >>" for _ in range(pages)),
+    ]
+    pdf, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(pdf)
+
+
+@pytest.fixture
+def upload(monkeypatch, tmp_path, api_client):
+    """Posts a PDF to the upload endpoint with local storage under tmp_path; returns the post
+    function, the recorded paper_files rows and the queued analyses."""
+    recorded, queued = [], []
+
+    async def get_paper(db, paper_id):
+        return SimpleNamespace(id=paper_id) if paper_id == PAPER_ID else None
+
+    async def create_paper_file(db, paper_file):
+        recorded.append(paper_file)
+        return paper_file
+
+    monkeypatch.setattr(crud_async, "get_paper", get_paper)
+    monkeypatch.setattr(crud_async, "create_paper_file", create_paper_file)
+    monkeypatch.setattr(analysis_tasks.analyze_pdf_task, "delay", lambda *args: queued.append(args))
+    monkeypatch.setattr(storage, "_storage", storage.LocalStorage(str(tmp_path)))
+    # Small reads, so page markers straddle chunk boundaries
+    monkeypatch.setattr(settings, "upload_read_size", 37)
+
+    client = api_client(files.router, "/papers")
+
+    def post(content: bytes, paper_id: uuid.UUID = PAPER_ID):
+        return client.post(f"/papers/{paper_id}/upload-pdf", files={"file": ("paper.pdf", content, "application/pdf")})
+    return post, recorded, queued
+
+
+def test_upload_streams_pdf_to_local_storage(upload, tmp_path):
+    post, recorded, queued = upload
+    content = make_pdf(3)
+
+    response = post(content)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["pages"] == 3
+    stored = tmp_path / body["storage_path"]
+    assert stored.read_bytes() == content
+    assert not stored.with_suffix(".pdf.part").exists()
+    assert len(recorded) == 1
+    assert recorded[0].sha256 == hashlib.sha256(content).hexdigest()
+    assert recorded[0].pages == 3
+    assert recorded[0].storage_path == body["storage_path"]
+    assert queued == [(str(PAPER_ID), body["storage_path"])]
+
+
+def test_upload_counts_pages_hidden_from_the_byte_scan(upload):
+    post, recorded, _ = upload
+    content = make_pdf(4, page_type=b"/P#61ge")
+    inspector = storage.PdfStreamInspector()
+    inspector.feed(content)
+    assert inspector.pages is None
+
+    response = post(content)
+
+    assert response.status_code == 200
+    assert response.json()["pages"] == 4
+    assert recorded[0].pages == 4
+
+
+def test_upload_of_unknown_paper_is_404(upload):
+    post, recorded, _ = upload
+    assert post(make_pdf(1), paper_id=uuid.uuid4()).status_code == 404
+    assert recorded == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 16, 4096])
+def test_inspector_counts_pages_across_chunk_boundaries(chunk_size):
+    content = make_pdf(5)
+    inspector = storage.PdfStreamInspector()
+    for start in range(0, len(content), chunk_size):
+        inspector.feed(content[start:start + chunk_size])
+    assert inspector.pages == 5
+    assert inspector.size == len(content)
+    assert inspector.sha256 == hashlib.sha256(content).hexdigest()
+
+
+def test_local_storage_rejects_paths_outside_its_root(tmp_path):
+    with pytest.raises(ValueError):
+        storage.LocalStorage(str(tmp_path))._path("../escape.pdf")
@@ -0,0 +1,63 @@
+import threading
+import uuid
+
+import numpy as np
+import pytest
+
+from scipaper.services.vector_index import LocalVectorIndex
+
+DIMENSIONS = 8
+
+
+def unit_vectors(count: int, seed: int) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, DIMENSIONS)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_writers_with_stale_state_keep_each_others_rows(tmp_path):
+    # Two instances stand in for the API and a worker process, each with its own view of the index
+    api, worker = LocalVectorIndex(str(tmp_path), DIMENSIONS), LocalVectorIndex(str(tmp_path), DIMENSIONS)
+    api_ids, worker_ids = [str(uuid.uuid4()) for _ in range(3)], [str(uuid.uuid4()) for _ in range(4)]
+    api_vectors, worker_vectors = unit_vectors(3, 1), unit_vectors(4, 2)
+
+    api.add(api_ids, api_vectors)
+    worker.add(worker_ids, worker_vectors)
+
+    reopened = LocalVectorIndex(str(tmp_path), DIMENSIONS)
+    assert len(reopened) == 7
+    for paper_id, vector in zip(api_ids + worker_ids, np.vstack([api_vectors, worker_vectors])):
+        assert reopened.search(vector, 1)[0] == (paper_id, pytest.approx(1.0, abs=1e-5))
+
+
+def test_search_sees_rows_added_by_another_writer(tmp_path):
+    reader, writer = LocalVectorIndex(str(tmp_path), DIMENSIONS), LocalVectorIndex(str(tmp_path), DIMENSIONS)
+    assert reader.search(unit_vectors(1, 3)[0], 5) == []
+
+    paper_id, vector = str(uuid.uuid4()), unit_vectors(1, 4)
+    writer.add([paper_id], vector)
+
+    assert reader.search(vector[0], 1)[0][0] == paper_id
+
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    writers = [LocalVectorIndex(str(tmp_path), DIMENSIONS) for _ in range(4)]
+    added = {}
+
+    def write(index: LocalVectorIndex, seed: int):
+        for batch in range(10):
+            ids = [str(uuid.uuid4()) for _ in range(5)]
+            vectors = unit_vectors(5, seed * 100 + batch)
+            index.add(ids, vectors)
+            added.update(zip(ids, vectors))
+
+    threads = [threading.Thread(target=write, args=(index, seed)) for seed, index in enumerate(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reopened = LocalVectorIndex(str(tmp_path), DIMENSIONS)
+    assert len(reopened) == len(added) == 200
+    for paper_id, vector in list(added.items())[::17]:
+        assert reopened.search(vector, 1)[0][0] == paper_id
+